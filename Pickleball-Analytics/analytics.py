@@ -22,7 +22,13 @@ Key APIs
   update_zones_from_keypoints(...): learn geometry from homography-projected keypoints
 - update_counters(frame_idx, projected_players, ball_proj): per-frame analytics update
 - panel_*(): return panel images sized to (w, h) for composition
-- save_outputs(): placeholder for future persistence
+- snapshot(): frozen copy of the panel-relevant state for off-thread rendering
+- render_cache: when True, the kitchen panel's zone layer is drawn once per
+  zone geometry and reused (see render_cache.py), and the heatmap panels are
+  rendered incrementally around new stamps (see heatmap.py)
+- heat_render_every: re-render a changing heatmap panel every Nth frame
+- heatmap_bytes(kind, ext): cached encoded heatmap and its ETag (live API)
+- save_outputs(out_dir): final player/ball heatmap PNGs
 
 Inputs
 ------
@@ -39,10 +45,15 @@ Assumptions
 """
 
 
+import copy
+
 import numpy as np
 import cv2
 from collections import defaultdict
 
+from heatmap import HEATMAP_RENDER_EVERY, DirtyRegions, HeatLayer, HeatParams
+from render_cache import LayerCache
+
 class Analytics:
     def __init__(self, filters):
         self.filters = filters
@@ -77,6 +88,7 @@ class Analytics:
         # Render controls (adaptive overrides will tweak these)
         self.clip_percentiles = (2.0, 98.0)
         self.gamma = 0.8  # <1 brightens midtones
+        self.heat_render_every = HEATMAP_RENDER_EVERY  # incremental panels only
 
         # Overlay alpha
         self.heat_alpha_player = 0.60
@@ -115,6 +127,14 @@ class Analytics:
             "backcourt_bottom": None,  # np.ndarray of shape (4,2)
 }
 
+        # Static panel layers reused while the court geometry is unchanged
+        self.render_cache = True
+        self._kitchen_layer = LayerCache()
+        self._player_layer = None            # HeatLayer per accumulator (set_canvas_size)
+        self._ball_layer = None
+        self._player_dirty = DirtyRegions()  # stamped since the layer last looked, and version
+        self._ball_dirty = DirtyRegions()
+
     # ---------- context ----------
     def set_canvas_size(self, width, height):
         self.canvas_w, self.canvas_h = width, height
@@ -122,6 +142,8 @@ class Analytics:
             self.player_heat_accum = np.zeros((900, 400), dtype=np.float32)
         if self.filters.get("ball_heatmap"):
             self.ball_heat_accum = np.zeros((900, 400), dtype=np.float32)
+        self._player_layer, self._ball_layer = HeatLayer("player"), HeatLayer("ball")
+        self._player_dirty, self._ball_dirty = DirtyRegions(), DirtyRegions()
 
         self._player_kernel = self._make_gaussian_kernel(self.stamp_radius_player, self.stamp_sigma_player)
         self._ball_kernel   = self._make_gaussian_kernel(self.stamp_radius_ball,   self.stamp_sigma_ball)
@@ -159,6 +181,27 @@ class Analytics:
         self.clip_percentiles = (float(lo), float(hi))
 
 
+    def snapshot(self):
+        """
+        Return a copy that panel_*() can render from on another thread while this
+        instance keeps receiving updates.  Mutable per-frame state is copied;
+        everything else (kernels, tunables, replaced-not-mutated arrays) is shared.
+        Heatmap regions stamped since the previous snapshot move to this one, so
+        the shared HeatLayers re-blur each stamp from the snapshot containing it.
+        """
+        snap = copy.copy(self)
+        if self.player_heat_accum is not None:
+            snap.player_heat_accum = self.player_heat_accum.copy()
+        if self.ball_heat_accum is not None:
+            snap.ball_heat_accum = self.ball_heat_accum.copy()
+        snap.zone_counts = defaultdict(int, self.zone_counts)
+        snap.players_in_kitchen = set(self.players_in_kitchen)
+        snap._rallies = list(self._rallies)
+        snap._zone_polys = dict(self._zone_polys)
+        self._player_dirty = DirtyRegions(self._player_dirty.version)
+        self._ball_dirty = DirtyRegions(self._ball_dirty.version)
+        return snap
+
     # ---------- per-frame updates ----------
     def update_counters(self, frame_idx, projected_players, ball_proj):
         # Zone usage counts (based on mid-band kitchen)
@@ -176,11 +219,13 @@ class Analytics:
         if self.player_heat_accum is not None:
             for pt in projected_players or []:
                 x, y = map(int, pt)
-                self._stamp(self.player_heat_accum, x, y, self._player_kernel, self.increment_per_hit_player)
+                self._stamp(self.player_heat_accum, x, y, self._player_kernel, self.increment_per_hit_player,
+                            self._player_dirty)
 
         if self.ball_heat_accum is not None and ball_proj is not None:
             x, y = map(int, ball_proj)
-            self._stamp(self.ball_heat_accum, x, y, self._ball_kernel, self.increment_per_hit_ball)
+            self._stamp(self.ball_heat_accum, x, y, self._ball_kernel, self.increment_per_hit_ball,
+                        self._ball_dirty)
 
         # --- Rally state update ---
         self._elapsed_frames += 1
@@ -213,10 +258,12 @@ class Analytics:
 
     # ---------- panel renderers ----------
     def panel_player_heatmap(self, panel_size, bird_reference=None):
-        return self._render_heatmap_panel(self.player_heat_accum, panel_size, "Player heatmap", bird_reference, self.heat_alpha_player)
+        return self._render_heatmap_panel(self.player_heat_accum, panel_size, "Player heatmap", bird_reference,
+                                          self.heat_alpha_player, self._player_layer, self._player_dirty)
 
     def panel_ball_heatmap(self, panel_size, bird_reference=None):
-        return self._render_heatmap_panel(self.ball_heat_accum, panel_size, "Ball heatmap", bird_reference, self.heat_alpha_ball)
+        return self._render_heatmap_panel(self.ball_heat_accum, panel_size, "Ball heatmap", bird_reference,
+                                          self.heat_alpha_ball, self._ball_layer, self._ball_dirty)
 
     def panel_kitchen_intrusion(self, projected_players, panel_size):
         """
@@ -226,7 +273,6 @@ class Analytics:
         Also lists who is currently in the kitchen (this frame).
         """
         w, h = panel_size
-        img = np.zeros((h, w, 3), dtype=np.uint8)
 
         # scale from bird canvas -> panel
         sx = w / max(self.canvas_w or 1, 1)
@@ -236,16 +282,14 @@ class Analytics:
         top_poly    = self._scale_poly(self._zone_polys.get("backcourt_top"), sx, sy)
         kitchen_poly= self._scale_poly(self._zone_polys.get("kitchen"), sx, sy)
         bot_poly    = self._scale_poly(self._zone_polys.get("backcourt_bottom"), sx, sy)
+        polys = (top_poly, kitchen_poly, bot_poly)
 
-        if top_poly is not None and kitchen_poly is not None and bot_poly is not None:
-            cv2.fillPoly(img, [top_poly],     (45, 45, 45))   # darker gray
-            cv2.fillPoly(img, [kitchen_poly], (0, 0, 200))  # bluish tint for kitchen
-            cv2.fillPoly(img, [bot_poly],     (45, 45, 45))
+        if self.render_cache:
+            # Zone fills only change with the (integer) panel geometry
+            key = (w, h, self.canvas_h, tuple(None if p is None else p.tobytes() for p in polys))
+            img = self._kitchen_layer.get(key, lambda: self._draw_kitchen_zones(w, h, sy, polys)).copy()
         else:
-            # fallback: scaled mid-band if polygons aren't available yet
-            y_kitchen_min = int((300 / 880.0) * (self.canvas_h or 0) * sy)
-            y_kitchen_max = int((580 / 880.0) * (self.canvas_h or 0) * sy)
-            cv2.rectangle(img, (0, y_kitchen_min), (w, y_kitchen_max), (60, 60, 60), -1)
+            img = self._draw_kitchen_zones(w, h, sy, polys)
 
         # --- Draw players & labels; mark who is in kitchen for this frame ---
         current_in = []
@@ -273,6 +317,20 @@ class Analytics:
 
         return img
 
+    def _draw_kitchen_zones(self, w, h, sy, polys):
+        img = np.zeros((h, w, 3), dtype=np.uint8)
+        top_poly, kitchen_poly, bot_poly = polys
+        if top_poly is not None and kitchen_poly is not None and bot_poly is not None:
+            cv2.fillPoly(img, [top_poly],     (45, 45, 45))   # darker gray
+            cv2.fillPoly(img, [kitchen_poly], (0, 0, 200))  # bluish tint for kitchen
+            cv2.fillPoly(img, [bot_poly],     (45, 45, 45))
+        else:
+            # fallback: scaled mid-band if polygons aren't available yet
+            y_kitchen_min = int((300 / 880.0) * (self.canvas_h or 0) * sy)
+            y_kitchen_max = int((580 / 880.0) * (self.canvas_h or 0) * sy)
+            cv2.rectangle(img, (0, y_kitchen_min), (w, y_kitchen_max), (60, 60, 60), -1)
+        return img
+
 
     def panel_rally_tempo(self, panel_size):
         """
@@ -342,7 +400,8 @@ class Analytics:
         return img
 
     # ---------- helpers ----------
-    def _render_heatmap_panel(self, accum, panel_size, title, bird_reference=None, alpha=0.55):
+    def _render_heatmap_panel(self, accum, panel_size, title, bird_reference=None, alpha=0.55,
+                              layer=None, dirty=None):
         w, h = panel_size
         out = np.zeros((h, w, 3), dtype=np.uint8)
 
@@ -352,16 +411,20 @@ class Analytics:
             return out
 
         k = self.blur_kernel if self.blur_kernel % 2 == 1 else self.blur_kernel + 1
-        blurred = cv2.GaussianBlur(accum, (k, k), 0) if k > 1 else accum
+        if self.render_cache and layer is not None:
+            layer.render_every = self.heat_render_every
+            color = layer.panel(accum, dirty, self._heat_params(), (w, h)).copy()
+        else:
+            blurred = cv2.GaussianBlur(accum, (k, k), 0) if k > 1 else accum
 
-        heat8 = self._to_uint8_with_auto_contrast(blurred)
+            heat8 = self._to_uint8_with_auto_contrast(blurred)
 
-        if self.gamma and self.gamma != 1.0:
-            f = (heat8.astype(np.float32) / 255.0) ** (1.0 / self.gamma)
-            heat8 = np.clip(f * 255.0, 0, 255).astype(np.uint8)
+            if self.gamma and self.gamma != 1.0:
+                f = (heat8.astype(np.float32) / 255.0) ** (1.0 / self.gamma)
+                heat8 = np.clip(f * 255.0, 0, 255).astype(np.uint8)
 
-        color = cv2.applyColorMap(heat8, cv2.COLORMAP_JET)
-        color = cv2.resize(color, (w, h), interpolation=cv2.INTER_LINEAR)
+            color = cv2.applyColorMap(heat8, cv2.COLORMAP_JET)
+            color = cv2.resize(color, (w, h), interpolation=cv2.INTER_LINEAR)
 
         if bird_reference is not None:
             bird_resized = cv2.resize(bird_reference, (w, h), interpolation=cv2.INTER_AREA)
@@ -374,6 +437,18 @@ class Analytics:
                     cv2.FONT_HERSHEY_SIMPLEX, 0.6, (230,230,230), 2, cv2.LINE_AA)
         return color
 
+    def _heat_params(self):
+        k = self.blur_kernel if self.blur_kernel % 2 == 1 else self.blur_kernel + 1
+        return HeatParams(k, tuple(self.clip_percentiles), self.gamma)
+
+    def _heat_source(self, kind):
+        """(accum, layer, dirty) of the 'player' or 'ball' heatmap."""
+        if kind == "player":
+            return self.player_heat_accum, self._player_layer, self._player_dirty
+        if kind == "ball":
+            return self.ball_heat_accum, self._ball_layer, self._ball_dirty
+        raise ValueError(f"unknown heatmap {kind!r}")
+
     def _to_uint8_with_auto_contrast(self, arr: np.ndarray) -> np.ndarray:
         nz = arr[arr > 0]
         if nz.size == 0:
@@ -395,7 +470,7 @@ class Analytics:
         kernel /= kernel.sum() + 1e-12
         return kernel.astype(np.float32)
 
-    def _stamp(self, accum: np.ndarray, x: int, y: int, kernel: np.ndarray, weight: float):
+    def _stamp(self, accum: np.ndarray, x: int, y: int, kernel: np.ndarray, weight: float, dirty=None):
         h, w = accum.shape
         if not (0 <= x < w and 0 <= y < h):
             return
@@ -405,6 +480,8 @@ class Analytics:
         kx0 = r - (x - x0); ky0 = r - (y - y0)
         kx1 = kx0 + (x1 - x0); ky1 = ky0 + (y1 - y0)
         accum[y0:y1, x0:x1] += kernel[ky0:ky1, kx0:kx1] * weight
+        if dirty is not None:
+            dirty.add(y0, y1, x0, x1)
 
     # ---------- zones ----------
     def _get_zone(self, pt):
@@ -598,31 +675,30 @@ class Analytics:
             return obj.item()
         return obj
 
+    def heatmap_bytes(self, kind, ext=".jpg"):
+        """
+        (bytes, etag) of the 'player' or 'ball' heatmap encoded as `ext`, or
+        (None, None) if that heatmap is off.  Encoded once per accumulator
+        version, from the same colored image the panels use.
+        """
+        accum, layer, dirty = self._heat_source(kind)
+        if accum is None or layer is None:
+            return None, None
+        return layer.encoded(accum, dirty, self._heat_params(), ext)
+
     def save_outputs(self, out_dir=None):
         if not out_dir:
             return
 
         # Save heatmaps as raw images on a dark background
-        if self.player_heat_accum is not None:
-            heat8_p = self._to_uint8_with_auto_contrast(cv2.GaussianBlur(self.player_heat_accum, (15, 15), 0))
-            color_p = cv2.applyColorMap(heat8_p, cv2.COLORMAP_JET)
-            cv2.imwrite(f"{out_dir}/player_heatmap.png", color_p)
-
-        if self.ball_heat_accum is not None:
-            heat8_b = self._to_uint8_with_auto_contrast(cv2.GaussianBlur(self.ball_heat_accum, (15, 15), 0))
-            color_b = cv2.applyColorMap(heat8_b, cv2.COLORMAP_JET)
-            cv2.imwrite(f"{out_dir}/ball_heatmap.png", color_b)
+        for kind in ("player", "ball"):
+            png, _ = self.heatmap_bytes(kind, ".png")
+            if png is not None:
+                with open(f"{out_dir}/{kind}_heatmap.png", "wb") as f:
+                    f.write(png)
 
     def get_player_heatmap_bytes(self):
-        if self.player_heat_accum is None: return None
-        heat8 = self._to_uint8_with_auto_contrast(cv2.GaussianBlur(self.player_heat_accum, (15, 15), 0))
-        color = cv2.applyColorMap(heat8, cv2.COLORMAP_JET)
-        ret, buf = cv2.imencode('.jpg', color)
-        return buf.tobytes() if ret else None
-        
+        return self.heatmap_bytes("player")[0]
+
     def get_ball_heatmap_bytes(self):
-        if self.ball_heat_accum is None: return None
-        heat8 = self._to_uint8_with_auto_contrast(cv2.GaussianBlur(self.ball_heat_accum, (15, 15), 0))
-        color = cv2.applyColorMap(heat8, cv2.COLORMAP_JET)
-        ret, buf = cv2.imencode('.jpg', color)
-        return buf.tobytes() if ret else None
+        return self.heatmap_bytes("ball")[0]
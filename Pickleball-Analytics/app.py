@@ -1,10 +1,21 @@
+import json
 import os
+import sys
+import time
 import uuid
-import threading
-from fastapi import FastAPI, UploadFile, File, BackgroundTasks, HTTPException
+from typing import Optional
+from fastapi import FastAPI, UploadFile, File, BackgroundTasks, HTTPException, Header
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
-from process_video import VideoProcessor
+# Light imports only: OpenCV, numpy, ultralytics/torch and pandas come in with
+# process_video on the first job (or the background model preload), so the
+# server binds and answers /api/health right away
+from model_registry import registry
+from live_preview import PREVIEW_FPS, PREVIEW_MAX_WIDTH, LivePreview
+from stream_broadcast import FrameBroadcaster
+from stats_push import STATS_EMIT_HZ, StatsPublisher
+from job_store import JobStore
+from job_scheduler import JOB_WORKERS, JobScheduler
 
 app = FastAPI(title="Pickleball Analytics API")
 
@@ -16,17 +27,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory job store
-# Structure: { job_id: {"status": "processing"|"completed"|"failed", "progress": float, "result": dict|None, "error": str|None} }
-jobs = {}
+# Persistent job store: status/progress/result/error in SQLite, live stats and
+# heatmap blobs in bounded memory (see job_store.py)
+# Job fields: status "queued"|"processing"|"completed"|"failed"|"cancelled", progress float, result dict|None, error str|None
+jobs = JobStore()
+# Live preview encoder, its async fan-out and the stats push per job (in-process objects, not stored)
+previews = {}
+broadcasters = {}
+publishers = {}
 
 UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+STARTED_AT = time.time()
 
-def process_video_task(job_id: str, video_path: str):
+def process_video_task(job_id: str, video_path: str, reduced_decode: bool, cancelled):
+    """
+    Runs on a JobScheduler worker.  The models come from the registry, one
+    warmed-up set per worker thread, kept from one job to the next;
+    `cancelled` is set by /api/cancel.  The main view is rendered at the
+    preview width (and, with reduced_decode, decoded at no more than it needs).
+    """
     try:
+        jobs.update(job_id, status="processing")
+        from process_video import VideoProcessor
+        from detection_cache import DetectionCache
+
         def progress_cb(val):
-            jobs[job_id]["progress"] = val
+            jobs.update(job_id, progress=val)
 
         filters = {
             "player_heatmap": True,
@@ -34,71 +61,127 @@ def process_video_task(job_id: str, video_path: str):
             "ball_heatmap": True,
             "kitchen_detection": True,
         }
-        processor = VideoProcessor(video_path, filters)
-        
-        # Generator for streaming
-        for frame, stats in processor.process_video_stream(progress_callback=progress_cb):
-            import cv2
-            ret, buffer = cv2.imencode('.jpg', frame)
-            if ret:
-                jobs[job_id]["latest_frame"] = buffer.tobytes()
-            jobs[job_id]["latest_stats"] = stats
-            
-            # Export heatmaps periodically
+        processor = VideoProcessor(video_path, filters, reduced_decode=reduced_decode)
+        preview = previews[job_id]
+        cache_key = None
+
+        # Generator for streaming; the preview encodes on its own thread, only while watched
+        stream = processor.process_video_stream(progress_callback=progress_cb, max_width=preview.max_width)
+        for frame, stats in stream:
+            if cancelled.is_set():
+                break
+            preview.publish(frame)
+            jobs.set_live(job_id, stats)
+            if cache_key is None:
+                cache_key = DetectionCache.key_report(video_path)
+                jobs.update(job_id, cache_key=cache_key)
+
+            # Export heatmaps periodically (encoded once per heatmap version, with an ETag)
             frame_idx = stats.get("operational", {}).get("current_frame", 0)
             if frame_idx % 30 == 0:
-                jobs[job_id]["player_heatmap"] = processor.analytics.get_player_heatmap_bytes()
-                jobs[job_id]["ball_heatmap"] = processor.analytics.get_ball_heatmap_bytes()
-            
-        jobs[job_id]["status"] = "completed"
-        jobs[job_id]["progress"] = 1.0
-        
+                for kind in ("player", "ball"):
+                    img_bytes, etag = processor.analytics.heatmap_bytes(kind)
+                    jobs.put_blob(job_id, f"{kind}_heatmap", img_bytes, etag)
+        stream.close()  # persists the detections so far when stopped early
+
+        if cancelled.is_set():
+            jobs.update(job_id, metrics=processor.metrics, status="cancelled")
+        else:
+            jobs.update(job_id, metrics=processor.metrics, cache_key=DetectionCache.key_report(video_path),
+                        status="completed", progress=1.0)
+
     except Exception as e:
-        jobs[job_id]["status"] = "failed"
-        jobs[job_id]["error"] = str(e)
+        jobs.update(job_id, status="failed", error=str(e))
         print(f"Job {job_id} failed: {e}")
+    finally:
+        release_job(job_id)
+
+def release_job(job_id: str):
+    jobs.finish(job_id)
+    # Connected viewers keep their references until their streams end
+    previews.pop(job_id).close()
+    publishers.pop(job_id).close_threadsafe()
+    broadcasters.pop(job_id, None)
+
+# Bounded worker pool: jobs beyond JOB_WORKERS wait in a priority queue
+scheduler = JobScheduler(process_video_task, workers=JOB_WORKERS)
+
+@app.on_event("startup")
+def warm_models():
+    # One warmed-up model set per worker, built in the background so the
+    # server answers right away and the first job does not pay for it
+    registry.preload(JOB_WORKERS)
+
+@app.get("/api/health")
+async def health():
+    """Liveness/readiness; never waits for (or imports) the processing stack."""
+    models = registry.stats()
+    return {
+        "status": "ok",
+        "uptime_s": round(time.time() - STARTED_AT, 1),
+        "models_ready": models["sets"] > 0,
+        "processing_stack_loaded": "process_video" in sys.modules,
+        "models": models,
+        "scheduler": scheduler.stats(),
+    }
 
 @app.post("/api/upload")
-async def upload_video(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+async def upload_video(background_tasks: BackgroundTasks, file: UploadFile = File(...),
+                       preview_fps: int = PREVIEW_FPS, preview_width: int = PREVIEW_MAX_WIDTH,
+                       stats_hz: float = STATS_EMIT_HZ, priority: int = 0, reduced_decode: bool = False):
     job_id = str(uuid.uuid4())
     file_path = os.path.join(UPLOAD_DIR, f"{job_id}_{file.filename}")
     
     with open(file_path, "wb") as f:
         f.write(await file.read())
         
-    jobs[job_id] = {
-        "status": "processing",
-        "progress": 0.0,
-        "result": None,
-        "error": None,
-        "latest_frame": None,
-        "latest_stats": None,
-        "player_heatmap": None,
-        "ball_heatmap": None
-    }
-    
-    # Run long-running process in a thread so we don't block asyncio loop
-    threading.Thread(target=process_video_task, args=(job_id, file_path), daemon=True).start()
+    jobs.create(job_id, status="queued", progress=0.0, video_path=file_path)
     
-    return {"job_id": job_id, "message": "Video uploaded and processing started."}
+    previews[job_id] = LivePreview(fps=preview_fps, max_width=preview_width)
+    broadcasters[job_id] = FrameBroadcaster()
+    previews[job_id].add_listener(broadcasters[job_id].listener)
+    publishers[job_id] = StatsPublisher(lambda: live_stats_doc(job_id), emit_hz=stats_hz)
+
+    # Runs on a scheduler worker thread so we don't block the asyncio loop
+    position = scheduler.submit(job_id, file_path, reduced_decode, priority=priority)
+
+    return {"job_id": job_id, "queue_position": position, "message": "Video uploaded and queued for processing."}
+
+@app.post("/api/cancel/{job_id}")
+async def cancel_job(job_id: str):
+    if job_id not in jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    state = scheduler.cancel(job_id)
+    if state is None:
+        raise HTTPException(status_code=409, detail="Job is not queued or running")
+    if state == "queued":
+        # Never started: nothing else will finish it
+        jobs.update(job_id, status="cancelled")
+        release_job(job_id)
+    # A running job stops at its next frame and then reports "cancelled"
+    return {"job_id": job_id, "status": "cancelled" if state == "queued" else "cancelling"}
 
 @app.get("/api/status/{job_id}")
 async def get_status(job_id: str):
     if job_id not in jobs:
         raise HTTPException(status_code=404, detail="Job not found")
-    return jobs[job_id]
+    job = jobs.get(job_id)
+    job["memory_bytes"] = jobs.memory_usage(job_id)
+    job["queue_position"] = scheduler.position(job_id)
+    job["scheduler"] = scheduler.stats()
+    job["models"] = registry.stats()
+    return job
 
 @app.get("/api/results/{job_id}")
 async def get_results(job_id: str):
     if job_id not in jobs:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = jobs[job_id]
+    job = jobs.get(job_id)
     if job["status"] != "completed":
         raise HTTPException(status_code=400, detail="Job is not completed yet")
         
     # Return the parsed JSON stats plus URLs for assets
-    import json
     stats_path = job["result"].get("stats_path")
     if stats_path and os.path.exists(stats_path):
         with open(stats_path, "r") as f:
@@ -121,7 +204,7 @@ async def get_asset(job_id: str, asset_type: str):
     if job_id not in jobs:
         raise HTTPException(status_code=404, detail="Job not found")
         
-    job = jobs[job_id]
+    job = jobs.get(job_id)
     if job["status"] != "completed":
         raise HTTPException(status_code=400, detail="Job is not completed yet")
         
@@ -148,44 +231,85 @@ async def get_asset(job_id: str, asset_type: str):
 async def video_stream(job_id: str):
     if job_id not in jobs:
         raise HTTPException(status_code=404, detail="Job not found")
+    if job_id not in previews:
+        raise HTTPException(status_code=404, detail="Job is not running")
+
+    preview, broadcaster = previews[job_id], broadcasters[job_id]
 
-    def frame_generator():
-        import time
-        while jobs[job_id]["status"] == "processing":
-            frame = jobs[job_id].get("latest_frame")
-            if frame:
+    # Runs on the event loop: each viewer awaits the next encoded frame and
+    # skips to the newest one if it falls behind (see stream_broadcast.py)
+    async def frame_generator():
+        with preview.viewer():
+            async for _, frame in broadcaster.frames():
                 yield (b'--frame\r\n'
                        b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-            time.sleep(0.03)
 
     from fastapi.responses import StreamingResponse
     return StreamingResponse(frame_generator(), media_type="multipart/x-mixed-replace; boundary=frame")
 
+def live_stats_doc(job_id: str) -> dict:
+    job = jobs.get(job_id)
+    return {
+        "status": job["status"],
+        "progress": job["progress"],
+        "stats": job["latest_stats"],
+        "preview": previews[job_id].stats() if job_id in previews else None,
+        "stream": broadcasters[job_id].stats() if job_id in broadcasters else None,
+    }
+
 @app.get("/api/live_stats/{job_id}")
 async def get_live_stats(job_id: str):
     if job_id not in jobs:
         raise HTTPException(status_code=404, detail="Job not found")
-    return {
-        "status": jobs[job_id]["status"],
-        "progress": jobs[job_id]["progress"],
-        "stats": jobs[job_id]["latest_stats"]
-    }
+    return live_stats_doc(job_id)
+
+@app.get("/api/live_stats/{job_id}/events")
+async def live_stats_events(job_id: str):
+    """
+    Server-Sent Events: a "snapshot" event with the /api/live_stats document,
+    then JSON merge-patch "patch" events at most stats_hz times per second,
+    and "end" when the job finishes (see stats_push.py).
+    """
+    if job_id not in jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    publisher = publishers.get(job_id)
+    if publisher is not None:
+        events = publisher.events()
+    else:
+        # Finished job: its final state, then the end of the stream
+        doc = json.dumps(live_stats_doc(job_id), separators=(",", ":"))
+
+        async def events():
+            yield f"event: snapshot\ndata: {doc}\n\nevent: end\ndata: {{}}\n\n".encode()
+        events = events()
+
+    from fastapi.responses import StreamingResponse
+    return StreamingResponse(events, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 from fastapi.responses import Response
 
 @app.get("/api/live_heatmap/{asset_type}/{job_id}")
-async def get_live_heatmap(asset_type: str, job_id: str):
+async def get_live_heatmap(asset_type: str, job_id: str, if_none_match: Optional[str] = Header(None)):
     if job_id not in jobs:
         raise HTTPException(status_code=404, detail="Job not found")
         
     if asset_type not in ["player", "ball"]:
         raise HTTPException(status_code=400, detail="Invalid heatmap type")
         
-    img_bytes = jobs[job_id].get(f"{asset_type}_heatmap")
+    img_bytes, etag = jobs.get_blob(job_id, f"{asset_type}_heatmap")
     if not img_bytes:
         raise HTTPException(status_code=404, detail="Heatmap not yet generated")
-        
-    return Response(content=img_bytes, media_type="image/jpeg")
+
+    # Clients revalidate with If-None-Match; an unchanged heatmap costs nothing
+    headers = {"Cache-Control": "no-cache"}
+    if etag:
+        headers["ETag"] = etag
+        if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+
+    return Response(content=img_bytes, media_type="image/jpeg", headers=headers)
 
 if __name__ == "__main__":
     import uvicorn
@@ -9,6 +9,12 @@ the ball center into bird’s-eye coordinates using a homography.
 What it does
 ------------
 - detect_frame(frame): YOLO inference → {1: [x1, y1, x2, y2]} if ball found
+- detect_frames(frames, views): one batched YOLO call → one ball dict per frame;
+  with `imgsz` set, runs on the frames resized to it (shared through
+  letterbox.FrameViews with other models of that size) and maps boxes back
+- detect_frames_roi(frames): ROI mode — while the ball is tracked, detect on a
+  small window around its predicted position and map the box back; switch to
+  full-frame search after ROI_MAX_MISSES consecutive misses
 - interpolate_ball_positions(list_of_dicts): fills gaps across frames (NaN interpolation)
 - draw_bbox(frame, bbox): annotate main view
 - project_ball(bbox, H): perspectiveTransform of bbox center with homography H
@@ -31,12 +37,25 @@ Assumptions
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
-import pandas as pd
+
+import projection
+from letterbox import FrameViews, scale_box
+
+# ROI mode: square search window (px, also the inference size) around the predicted ball
+ROI_SIZE = 320
+# Consecutive ROI misses before falling back to full-frame search
+ROI_MAX_MISSES = 3
+# A ball last seen more than this many frames ago is not used for prediction
+ROI_MAX_GAP = 10
 
 class BallTracker:
-    def __init__(self, model_path):
-        self.model = YOLO(model_path)
+    def __init__(self, model_path, model=None, imgsz=None):
+        # An already loaded YOLO model (e.g. reused across API jobs) skips loading the weights
+        if model is None:
+            from ultralytics import YOLO  # heavy (torch); imported only when actually loading
+            model = YOLO(model_path)
+        self.model = model
+        self.imgsz = imgsz  # full-frame inference size; None = the model's default
 
         # Bounce detection state
         self._y_history = []           # recent y-center values
@@ -62,9 +81,118 @@ class BallTracker:
         self._speed_mph = 0.0             # current speed in estimated mph
         self._max_speed_mph = 0.0         # peak speed in estimated mph
 
+        # ROI detection state (image coords)
+        self._roi_track = []              # last two (frame_id, (cx, cy)) detections
+        self._roi_misses = 0              # consecutive ROI misses
+        self._roi_next_id = 0             # frame id assumed when none is given
+        self.roi_stats = {"roi_frames": 0, "roi_hits": 0, "full_frames": 0, "fallbacks": 0}
+
     def detect_frame(self, frame):
         """Detect ball in a single frame, return dict with bbox if found"""
-        results = self.model.predict(frame, conf=0.15)[0]
+        return self._predict_full([frame])[0]
+
+    def detect_frames(self, frames, views=None):
+        """
+        Detect ball in a batch of frames with a single predict call.
+        Returns one ball dict per frame, in input order.  views: FrameViews of
+        these frames, to share their resized copies with other models.
+        """
+        if not frames:
+            return []
+        return self._predict_full(frames, views)
+
+    def _predict_full(self, frames, views=None, idx=None):
+        """Full-frame ball dicts in frame pixels; idx: positions of `frames` in `views`."""
+        if self.imgsz is None:
+            return [self._ball_dict(r) for r in self.model.predict(list(frames), conf=0.15)]
+        images, scales = (views or FrameViews(frames)).resized(self.imgsz, idx if views else None)
+        results = self.model.predict(images, conf=0.15, imgsz=self.imgsz)
+        out = []
+        for r, scale in zip(results, scales):
+            det = self._ball_dict(r)
+            out.append({1: scale_box(det[1], scale)} if 1 in det else det)
+        return out
+
+    def detect_frames_roi(self, frames, frame_ids=None, views=None):
+        """
+        ROI variant of detect_frames.  frame_ids: the frames' indices in the
+        video (default: consecutive after the previous call), used to
+        extrapolate the ball position across gaps.
+
+        Frames with a predicted ball position are cropped to a ROI_SIZE window
+        around it and detected in one batched call at imgsz=ROI_SIZE; the rest
+        (and every frame after ROI_MAX_MISSES consecutive misses) go through
+        one full-frame batched call.  Returns one ball dict per frame.
+        """
+        if not frames:
+            return []
+        if frame_ids is None:
+            frame_ids = range(self._roi_next_id, self._roi_next_id + len(frames))
+        frame_ids = list(frame_ids)
+        self._roi_next_id = frame_ids[-1] + 1
+
+        out = [None] * len(frames)
+        windows = [self._roi_window(frame.shape, fid) for frame, fid in zip(frames, frame_ids)]
+        roi_idx = [i for i, w in enumerate(windows) if w is not None]
+        if roi_idx:
+            crops = [frames[i][windows[i][1]:windows[i][3], windows[i][0]:windows[i][2]] for i in roi_idx]
+            results = self.model.predict(crops, conf=0.15, imgsz=ROI_SIZE)
+            for i, r in zip(roi_idx, results):
+                if self._roi_misses >= ROI_MAX_MISSES:
+                    break  # lost: this and later frames go full-frame
+                det = self._ball_dict(r)
+                self.roi_stats["roi_frames"] += 1
+                if 1 in det:
+                    x0, y0 = windows[i][:2]
+                    x1, y1, x2, y2 = det[1]
+                    det = {1: [x1 + x0, y1 + y0, x2 + x0, y2 + y0]}
+                    self.roi_stats["roi_hits"] += 1
+                    self._roi_observe(frame_ids[i], det)
+                else:
+                    self._roi_misses += 1
+                    if self._roi_misses >= ROI_MAX_MISSES:
+                        self.roi_stats["fallbacks"] += 1
+                        self._roi_track = []
+                        continue  # re-run this frame full-frame
+                out[i] = det
+
+        full_idx = [i for i in range(len(frames)) if out[i] is None]
+        if full_idx:
+            dets = self._predict_full([frames[i] for i in full_idx], views, full_idx)
+            for i, det in zip(full_idx, dets):
+                out[i] = det
+                self.roi_stats["full_frames"] += 1
+                self._roi_observe(frame_ids[i], out[i])
+        return out
+
+    def _roi_window(self, shape, frame_id):
+        """(x0, y0, x1, y1) search window around the predicted center, or None to search the full frame."""
+        if not self._roi_track or self._roi_misses >= ROI_MAX_MISSES:
+            return None
+        f1, (cx, cy) = self._roi_track[-1]
+        if frame_id - f1 > ROI_MAX_GAP:
+            return None
+        if len(self._roi_track) == 2:
+            f0, (px, py) = self._roi_track[0]
+            steps = (frame_id - f1) / (f1 - f0)
+            cx, cy = cx + (cx - px) * steps, cy + (cy - py) * steps
+
+        h, w = shape[:2]
+        size_w, size_h = min(ROI_SIZE, w), min(ROI_SIZE, h)
+        # Shift (not shrink) the window to stay inside the frame, so every crop has the same size
+        x0 = int(round(min(max(cx - size_w / 2, 0), w - size_w)))
+        y0 = int(round(min(max(cy - size_h / 2, 0), h - size_h)))
+        return x0, y0, x0 + size_w, y0 + size_h
+
+    def _roi_observe(self, frame_id, ball_dict):
+        if 1 not in ball_dict:
+            return
+        x1, y1, x2, y2 = ball_dict[1]
+        self._roi_track = (self._roi_track + [(frame_id, ((x1 + x2) / 2, (y1 + y2) / 2))])[-2:]
+        self._roi_misses = 0
+
+    @staticmethod
+    def _ball_dict(results):
         ball_dict = {}
         for box in results.boxes:
             bbox = box.xyxy.tolist()[0]
@@ -165,6 +293,8 @@ class BallTracker:
         Given list of dicts per frame, interpolate missing detections (NaNs).
         Returns list of dicts with interpolated bboxes.
         """
+        import pandas as pd  # only needed here; kept out of module import time
+
         # Extract bbox coords into dataframe, fill missing with NaN
         data = []
         for d in ball_positions:
@@ -188,21 +318,20 @@ class BallTracker:
 
     def project_ball(self, bbox, H):
         """Project the ball center to bird's eye view"""
-        x1, y1, x2, y2 = bbox
-        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
-        point = np.array([[[cx, cy]]], dtype=np.float32)
-        proj = cv2.perspectiveTransform(point, H)[0][0]
-        return tuple(proj)
+        return tuple(projection.project_points(projection.ball_center(bbox), H)[0])
 
-    def process_and_project(self, ball_dict, frame, H):
+    def process_and_project(self, ball_dict, frame, H, projected=None):
         """
-        Convenience method: draw bbox on frame and return projected point (if available)
+        Convenience method: draw bbox on frame and return projected point (if available).
+        Pass frame=None to skip drawing (headless analytics), and `projected`
+        when the caller already projected the ball center.
         """
         if 1 in ball_dict:
             bbox = ball_dict[1]
-            self.draw_bbox(frame, bbox)
+            if frame is not None:
+                self.draw_bbox(frame, bbox)
             if H is not None:
-                proj = self.project_ball(bbox, H)
+                proj = self.project_ball(bbox, H) if projected is None else projected
                 return bbox, proj
             return bbox, None
         return None, None
@@ -0,0 +1,1032 @@
+"""
+Benchmarks
+
+Purpose
+-------
+Command-line benchmarks for tuning the pipeline per host.  Each subcommand
+prints a small table; checks that compare against a reference run exit with a
+non-zero status when the outputs diverge.
+
+Usage
+-----
+    python benchmark.py shards match.mp4 --workers 1 2 4 8
+    python benchmark.py headless match.mp4
+    python benchmark.py schedule match.mp4 --player-stride 1 2 3 5 --ball-idle-stride 6
+    python benchmark.py roi match.mp4 --frames 900
+    python benchmark.py projection --frames 9000
+    python benchmark.py render match.mp4
+    python benchmark.py heatmap --frames 1800 --every 1 3 5
+    python benchmark.py stream --viewers 500 --slow 0.1
+    python benchmark.py stream --url http://127.0.0.1:8000/api/stream/<job_id> --viewers 200
+    python benchmark.py jobs match.mp4 --jobs 24 --frames 60 --workers 1 2 4
+    python benchmark.py imports app main process_video --budget-ms 500
+    python benchmark.py backends match.mp4 --backends torch onnx openvino --threads 4 --frames 300
+    python benchmark.py imgsz match.mp4 --sizes 480 640 960 1280 --frames 300
+    python benchmark.py decode match.mp4 --mode headless
+
+Subcommands
+-----------
+- shards: sharded ball/player detection throughput for each worker count,
+  speedup vs the first count, and equality of the merged detections with that
+  first run (the court pass of a real run is not part of it)
+- headless: frames/s of the analytics-only mode vs the full composite render,
+  and equality of their stats.json
+- schedule: inferences skipped by each detection schedule and the divergence
+  of its analytics from full-rate processing, replayed from the detection
+  cache (filled first if needed) so no configuration decodes the video
+- roi: per-frame ball detection latency of ROI mode vs full-frame search, and
+  ROI recall against the full-frame detections
+- projection: per-point perspectiveTransform calls vs one vectorized call per
+  frame vs bulk projection of a cached video (synthetic detections, no models)
+- render: per-frame render-stage time with the static court layer cache off
+  and on (detections replayed from the cache), layer cache hit rates, and the
+  mean pixel difference between the two composite videos
+- heatmap: per-frame analytics-grid render time with full heatmap redraws vs
+  incremental heatmap panels at each render cadence, and their pixel
+  difference from the full redraw (synthetic random-walk play, no models)
+- stream: load test of the live MJPEG fan-out; in process (LivePreview +
+  FrameBroadcaster fed synthetic frames, a fraction of viewers deliberately
+  slow) it reports per-viewer fps, frames dropped by slow viewers and
+  publish-to-viewer latency; with --url it opens that many HTTP clients on a
+  running API and reports the frames each one received
+- jobs: load test of the API job scheduler; submits a burst of short clips
+  (cut from the video, each a different excerpt so none hits the detection
+  cache) as headless analytics jobs, once with a thread and fresh models per
+  job (the old API behaviour) and once per worker count through JobScheduler,
+  and reports throughput, p50/p95 job latency (submit to done) and model sets loaded
+- imports: cold import time of each entry module in a fresh interpreter
+  (python -X importtime, best of --repeat), its slowest imports, and which
+  heavy stacks it pulls in; exits non-zero when an entry point (app, main)
+  imports a heavy stack or a module exceeds --budget-ms
+- backends: per-model inference time of each inference backend (PyTorch,
+  exported ONNX Runtime / OpenVINO) on the same decoded frames, speedup over
+  PyTorch and parity with its detections: ball recall within --tolerance px,
+  player boxes matched at IoU >= 0.5, mean court keypoint error; exits non-zero
+  when a backend falls back to PyTorch or its parity is below --min-parity
+- imgsz: inference size sweep; for each size and detector, per-frame latency
+  and agreement with the detections at the reference size (largest by
+  default): ball recall, player boxes matched, court keypoints found and
+  their error; plus the shared resize cost per frame, to pick per-camera
+  sizes for VideoProcessor(imgsz=...)
+- decode: decode layer configurations (plain capture on the processing
+  thread, prefetch thread, prefetch + reused buffers, reduced-resolution
+  decode), each detecting from scratch: decode time and fps apart from
+  detection fps, end-to-end fps, and the outputs vs the plain capture
+  (identical stats.json required, except for reduced decode, whose analytics
+  divergence is reported); exits non-zero when an exact configuration differs
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(PROJECT_DIR, "models")
+
+
+# ------------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------------
+def _print_table(header, rows):
+    widths = [max(len(str(x)) for x in col) for col in zip(header, *rows)]
+    fmt = "  ".join(f"{{:>{w}}}" for w in widths)
+    print(fmt.format(*header))
+    for row in rows:
+        print(fmt.format(*row))
+
+
+def _same_array(a, b):
+    if a is None or b is None:
+        return a is None and b is None
+    return np.array_equal(np.asarray(a), np.asarray(b))
+
+
+def entries_equal(a, b):
+    """True if two per-frame detection lists (DetectionCache format) are identical."""
+    if len(a) != len(b):
+        return False
+    for ea, eb in zip(a, b):
+        if not (_same_array(ea["court"]["keypoints"], eb["court"]["keypoints"])
+                and _same_array(ea["court"]["homography"], eb["court"]["homography"])):
+            return False
+        if list(ea["players"]["boxes"]) != list(eb["players"]["boxes"]):
+            return False
+        if list(ea["players"]["confs"]) != list(eb["players"]["confs"]):
+            return False
+        if ea["ball"]["bbox_dict"] != eb["ball"]["bbox_dict"]:
+            return False
+    return True
+
+
+def _frame_count(video_path):
+    import cv2
+
+    cap = cv2.VideoCapture(video_path)
+    try:
+        return int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+
+
+# ------------------------------------------------------------------
+# Subcommands
+# ------------------------------------------------------------------
+def bench_shards(args):
+    import sharding
+
+    total = _frame_count(args.video)
+    if args.frames:
+        total = min(total, args.frames)
+    model_paths = {
+        "ball": os.path.join(MODELS_DIR, "ball_tracking.pt"),
+        "player": os.path.join(MODELS_DIR, "player_tracking.pt"),
+    }
+
+    rows, reference, base_fps, ok = [], None, None, True
+    for workers in args.workers:
+        t0 = time.perf_counter()
+        entries, stats = sharding.detect_video(
+            args.video, total, model_paths,
+            workers=workers, batch_size=args.batch_size, to_eof=not args.frames,
+        )
+        elapsed = time.perf_counter() - t0
+        fps = len(entries) / elapsed if elapsed > 0 else 0.0
+        if reference is None:
+            reference, base_fps = entries, fps
+        match = entries_equal(reference, entries)
+        ok &= match
+        rows.append((workers, stats["shards"], len(entries), f"{elapsed:.1f}",
+                     f"{fps:.1f}", f"{fps / base_fps:.2f}x" if base_fps else "-",
+                     "yes" if match else "NO"))
+
+    _print_table(("workers", "shards", "frames", "time_s", "fps", "speedup", "matches"), rows)
+    return 0 if ok else 1
+
+
+def bench_headless(args):
+    import json
+    from process_video import VideoProcessor
+
+    if not args.cold:
+        # Warm the detection cache so both modes replay the same detections
+        # and the comparison isolates rendering/encoding cost
+        VideoProcessor(args.video, {}).process_analytics()
+
+    rows, outputs = [], {}
+    for mode in ("composite", "headless"):
+        vp = VideoProcessor(args.video, {})
+        result = vp.process_video() if mode == "composite" else vp.process_analytics()
+        with open(result["stats_path"]) as f:
+            outputs[mode] = json.load(f)
+        m = result["metrics"]
+        rows.append((mode, m["frames"], f"{m['elapsed_s']:.1f}", f"{m['fps']:.1f}"))
+
+    base_fps = float(rows[0][3])
+    rows = [r + (f"{float(r[3]) / base_fps:.2f}x" if base_fps else "-",) for r in rows]
+    _print_table(("mode", "frames", "time_s", "fps", "speedup"), rows)
+    match = outputs["composite"] == outputs["headless"]
+    print(f"stats.json identical: {'yes' if match else 'NO'}")
+    return 0 if match else 1
+
+
+def bench_schedule(args):
+    from detection_cache import DetectionCache
+    from detection_scheduler import analytics_divergence
+    from process_video import VideoProcessor
+
+    if not DetectionCache.has_cache(args.video):
+        VideoProcessor(args.video, {}).process_analytics()
+
+    ref = VideoProcessor(args.video, {})
+    ref.replay_analytics(save_outputs=False)
+
+    rows = []
+    for player_stride in args.player_stride:
+        for ball_idle_stride in args.ball_idle_stride:
+            vp = VideoProcessor(args.video, {}, player_stride=player_stride, ball_idle_stride=ball_idle_stride)
+            vp.replay_analytics(save_outputs=False)
+            sched = vp.metrics.get("schedule", {"player_skipped": 0, "ball_skipped": 0, "skipped_pct": 0.0})
+            div = analytics_divergence((ref.analytics, ref.score_tracker), (vp.analytics, vp.score_tracker))
+            rallies = div["rallies"]
+            rows.append((
+                player_stride, ball_idle_stride,
+                sched["player_skipped"], sched["ball_skipped"], f"{sched['skipped_pct']:.1f}",
+                f"{div.get('player_heat', 0.0):.4f}", f"{div.get('ball_heat', 0.0):.4f}",
+                f"{div['zone_counts']:.4f}",
+                f"{rallies['candidate']}/{rallies['reference']}", f"{rallies['mean_abs_diff_frames']:.1f}",
+                "yes" if div["score_match"] else "NO",
+            ))
+
+    _print_table(("p_stride", "b_idle", "p_skip", "b_skip", "skip_%", "player_tv", "ball_tv",
+                  "zones_tv", "rallies", "rally_diff", "score"), rows)
+    return 0
+
+
+def bench_roi(args):
+    import cv2
+    from ball_tracker import BallTracker
+
+    model_path = os.path.join(MODELS_DIR, "ball_tracking.pt")
+    full, roi = BallTracker(model_path), BallTracker(model_path)
+
+    cap = cv2.VideoCapture(args.video)
+    full_ms, roi_ms = [], []
+    ref_hits = matched = extra = 0
+    try:
+        while not args.frames or len(full_ms) < args.frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            t0 = time.perf_counter()
+            ref = full.detect_frames([frame])[0]
+            t1 = time.perf_counter()
+            det = roi.detect_frames_roi([frame])[0]
+            t2 = time.perf_counter()
+            full_ms.append((t1 - t0) * 1000)
+            roi_ms.append((t2 - t1) * 1000)
+
+            if 1 in ref:
+                ref_hits += 1
+                if 1 in det and _center_dist(ref[1], det[1]) <= args.tolerance:
+                    matched += 1
+            elif 1 in det:
+                extra += 1
+    finally:
+        cap.release()
+
+    if not full_ms:
+        print("No frames decoded")
+        return 1
+    s = roi.roi_stats
+    rows = [
+        ("full", len(full_ms), f"{np.mean(full_ms):.2f}", f"{np.percentile(full_ms, 95):.2f}", "-", "-"),
+        ("roi", len(roi_ms), f"{np.mean(roi_ms):.2f}", f"{np.percentile(roi_ms, 95):.2f}",
+         f"{matched / ref_hits:.3f}" if ref_hits else "-",
+         f"{s['roi_frames'] / len(roi_ms):.2f}"),
+    ]
+    _print_table(("mode", "frames", "mean_ms", "p95_ms", "recall", "roi_share"), rows)
+    print(f"ROI hits {s['roi_hits']}/{s['roi_frames']}, full-frame searches {s['full_frames']}, "
+          f"fallbacks {s['fallbacks']}, detections without a full-frame match {extra}")
+    return 0
+
+
+def _center_dist(a, b):
+    return float(np.hypot((a[0] + a[2] - b[0] - b[2]) / 2, (a[1] + a[3] - b[1] - b[3]) / 2))
+
+
+def bench_projection(args):
+    import tempfile
+
+    import cv2
+    import projection
+    from detection_cache import CachedDetections, DetectionCache, _ColumnarWriter
+
+    rng = np.random.default_rng(0)
+    H = np.array([[1.1, 0.2, -40.0], [0.05, 1.6, -90.0], [0.0002, 0.0011, 1.0]])
+    kps = rng.uniform(0, 720, size=(12, 2)).astype(np.float32)
+    entries = []
+    for _ in range(args.frames):
+        xy = rng.uniform(0, 1200, size=(args.players, 2))
+        boxes = np.hstack([xy, xy + rng.uniform(40, 200, size=(args.players, 2))]).astype(np.float32).tolist()
+        ball = {}
+        if rng.random() < 0.7:
+            bx = rng.uniform(0, 1200, size=2)
+            ball = {1: np.float32(np.concatenate([bx, bx + 12])).tolist()}
+        entries.append(DetectionCache.make_entry(kps, H, boxes, [0.9] * args.players, ball))
+
+    def per_point(e):
+        players = []
+        for x1, y1, x2, y2 in e["players"]["boxes"]:
+            pt = np.array([[[(x1 + x2) / 2, y2]]], dtype=np.float32)
+            players.append(tuple(cv2.perspectiveTransform(pt, H)[0][0]))
+        ball = None
+        if 1 in e["ball"]["bbox_dict"]:
+            x1, y1, x2, y2 = e["ball"]["bbox_dict"][1]
+            pt = np.array([[[(x1 + x2) / 2, (y1 + y2) / 2]]], dtype=np.float32)
+            ball = tuple(cv2.perspectiveTransform(pt, H)[0][0])
+        pts = np.array(e["court"]["keypoints"], dtype=np.float32).reshape(-1, 1, 2)
+        return projection.FrameProjection(players, ball, cv2.perspectiveTransform(pts, H).reshape(-1, 2))
+
+    def vectorized(e):
+        return projection.project_frame(H, e["players"]["boxes"], e["ball"]["bbox_dict"].get(1),
+                                        e["court"]["keypoints"])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = _ColumnarWriter(tmp)
+        writer.append(entries)
+        cached = CachedDetections(tmp, writer.counts())
+
+        results, rows = {}, []
+        for name, run in (
+            ("per_point", lambda: [per_point(e) for e in entries]),
+            ("per_frame", lambda: [vectorized(e) for e in entries]),
+            ("bulk", lambda: (lambda b: [b.frame(i) for i in range(len(cached))])(projection.project_cached(cached))),
+        ):
+            t0 = time.perf_counter()
+            results[name] = run()
+            elapsed = time.perf_counter() - t0
+            rows.append([name, args.frames, f"{elapsed * 1e6 / args.frames:.1f}", elapsed])
+
+    base = rows[0][3]
+    for row in rows:
+        row[3] = f"{base / row[3]:.1f}x" if row[3] > 0 else "-"
+    _print_table(("path", "frames", "us_per_frame", "speedup"), rows)
+
+    ok = all(_same_projection(a, b) for name in ("per_frame", "bulk")
+             for a, b in zip(results["per_point"], results[name]))
+    print(f"identical results: {'yes' if ok else 'NO'}")
+    return 0 if ok else 1
+
+
+def _same_projection(a, b):
+    return (np.array_equal(np.asarray(a.players, dtype=np.float32).reshape(-1, 2),
+                           np.asarray(b.players, dtype=np.float32).reshape(-1, 2))
+            and _same_array(a.ball, b.ball)
+            and _same_array(a.keypoints, b.keypoints))
+
+
+def bench_render(args):
+    import cv2
+    from process_video import VideoProcessor
+
+    if not args.cold:
+        VideoProcessor(args.video, {}).process_analytics()
+
+    rows, videos = [], []
+    for cached in (False, True):
+        vp = VideoProcessor(args.video, {}, render_cache=cached)
+        result = vp.process_video(pipelined=True)
+        render = result["metrics"]["pipeline"]["render"]
+        per_frame_ms = render["busy_s"] * 1000 / render["items"] if render["items"] else 0.0
+        bird, kitchen = vp._bird_layer, vp.analytics._kitchen_layer
+        rows.append(["on" if cached else "off", render["items"], f"{per_frame_ms:.2f}", per_frame_ms,
+                     f"{bird.hits}/{bird.hits + bird.misses}" if cached else "-",
+                     f"{kitchen.hits}/{kitchen.hits + kitchen.misses}" if cached else "-"])
+        videos.append(result["video_path"])
+
+    base = rows[0][3]
+    for row in rows:
+        row[3] = f"{base / row[3]:.2f}x" if row[3] > 0 else "-"
+    _print_table(("cache", "frames", "render_ms", "speedup", "bird_hits", "kitchen_hits"), rows)
+
+    caps = [cv2.VideoCapture(v) for v in videos]
+    diffs = []
+    try:
+        while True:
+            reads = [c.read() for c in caps]
+            if not all(ok for ok, _ in reads):
+                break
+            diffs.append(float(np.mean(cv2.absdiff(reads[0][1], reads[1][1]))))
+    finally:
+        for c in caps:
+            c.release()
+    if diffs:
+        print(f"mean abs pixel difference (cache off vs on): {np.mean(diffs):.3f}")
+    return 0
+
+
+def _analytics_grid(analytics, panel_size):
+    import cv2
+
+    top = cv2.hconcat([analytics.panel_player_heatmap(panel_size), analytics.panel_ball_heatmap(panel_size)])
+    bot = cv2.hconcat([analytics.panel_kitchen_intrusion(None, panel_size), analytics.panel_rally_tempo(panel_size)])
+    return cv2.vconcat([top, bot])
+
+
+def bench_heatmap(args):
+    import cv2
+    from analytics import Analytics
+
+    filters = {"player_heatmap": True, "ball_heatmap": True}
+    rng = np.random.default_rng(0)
+    players = rng.uniform((0, 0), (400, 900), size=(args.players, 2))
+    ball = rng.uniform((0, 0), (400, 900))
+    frames = []
+    for _ in range(args.frames):
+        players = np.clip(players + rng.normal(0, 4, size=players.shape), 0, (399, 899))
+        ball = np.clip(ball + rng.normal(0, 15, size=2), 0, (399, 899))
+        frames.append((players.tolist(), tuple(ball) if rng.random() < 0.8 else None))
+
+    configs = [("full", False, 1)] + [(f"incr/{n}", True, n) for n in args.every]
+    runs = []
+    for name, incremental, every in configs:
+        a = Analytics(filters)
+        a.set_canvas_size(1280, 720)
+        a.set_video_context(total_frames=args.frames, fps=30)
+        a.render_cache, a.heat_render_every = incremental, every
+        grids, busy = [], 0.0
+        for idx, (pts, b) in enumerate(frames):
+            a.update_counters(idx, pts, b)
+            t0 = time.perf_counter()
+            grid = _analytics_grid(a, (args.panel_width, args.panel_height))
+            busy += time.perf_counter() - t0
+            grids.append(grid)
+        runs.append((name, busy, grids, a))
+
+    base_busy, base_grids = runs[0][1], runs[0][2]
+    rows = []
+    for name, busy, grids, a in runs:
+        diffs = [float(np.mean(cv2.absdiff(g, ref))) for g, ref in zip(grids, base_grids)]
+        layer = a._player_layer
+        rows.append([name, args.frames, f"{busy * 1000 / args.frames:.2f}",
+                     f"{base_busy / busy:.2f}x" if busy > 0 else "-",
+                     f"{layer.stats['renders']}/{args.frames}" if a.render_cache else "-",
+                     f"{np.mean(diffs):.3f}", f"{np.max(diffs):.3f}"])
+    _print_table(("heatmap", "frames", "grid_ms", "speedup", "player_renders", "mean_diff", "max_diff"), rows)
+    return 0
+
+
+def _percentile_ms(values, q):
+    return f"{np.percentile(values, q) * 1000:.1f}" if values else "-"
+
+
+async def _stream_in_process(args):
+    import asyncio
+    import threading
+
+    from live_preview import LivePreview
+    from stream_broadcast import FrameBroadcaster
+
+    preview = LivePreview(fps=args.fps)
+    broadcaster = FrameBroadcaster()
+    published = {}
+
+    def listener(seq, jpeg):
+        published[seq] = time.perf_counter()
+        broadcaster.listener(seq, jpeg)
+    preview.add_listener(listener)
+
+    n_slow = int(round(args.viewers * args.slow))
+    results = []
+
+    async def viewer(slow):
+        frames, latencies = 0, []
+        with preview.viewer():
+            async for seq, _ in broadcaster.frames():
+                frames += 1
+                if seq in published:
+                    latencies.append(time.perf_counter() - published[seq])
+                if slow:
+                    await asyncio.sleep(args.slow_delay)
+                else:
+                    await asyncio.sleep(0)  # hand the loop to the other viewers, like a socket write
+        results.append((slow, frames, latencies))
+
+    stop = threading.Event()
+
+    def producer():
+        frame = np.random.default_rng(0).integers(0, 255, size=(720, 1280, 3), dtype=np.uint8)
+        while not stop.is_set():
+            preview.publish(frame)
+            time.sleep(1.0 / args.source_fps)
+
+    tasks = [asyncio.ensure_future(viewer(i < n_slow)) for i in range(args.viewers)]
+    thread = threading.Thread(target=producer, daemon=True)
+    thread.start()
+
+    # Event-loop lag: how late a 10 ms timer fires while all viewers are served
+    lags, t_end = [], time.perf_counter() + args.seconds
+    while time.perf_counter() < t_end:
+        t0 = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - t0 - 0.01)
+
+    stop.set()
+    thread.join()
+    await asyncio.get_running_loop().run_in_executor(None, preview.close)
+    await asyncio.gather(*tasks)
+
+    rows = []
+    for label, slow in (("fast", False), ("slow", True)):
+        group = [r for r in results if r[0] == slow]
+        if not group:
+            continue
+        fps = [f / args.seconds for _, f, _ in group]
+        lat = [x for _, _, ls in group for x in ls]
+        rows.append([label, len(group), f"{np.mean(fps):.1f}", f"{np.min(fps):.1f}",
+                     _percentile_ms(lat, 50), _percentile_ms(lat, 95)])
+    _print_table(("viewers", "count", "fps_mean", "fps_min", "latency_p50_ms", "latency_p95_ms"), rows)
+    pv, st = preview.stats(), broadcaster.stats()
+    print(f"encoded {pv['encoded']} frames ({pv['encode_ms_per_frame']} ms each), "
+          f"sent {st['sent']}, dropped for slow viewers {st['dropped']}, "
+          f"event loop lag p95 {_percentile_ms(lags, 95)} ms")
+    return 0
+
+
+async def _stream_http(args):
+    import asyncio
+    from urllib.parse import urlsplit
+
+    url = urlsplit(args.url)
+    path = url.path + (f"?{url.query}" if url.query else "")
+
+    async def client():
+        frames = 0
+        try:
+            reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+        except OSError:
+            return None
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {url.netloc}\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        t_end, tail = time.perf_counter() + args.seconds, b""
+        try:
+            while time.perf_counter() < t_end:
+                try:
+                    chunk = await asyncio.wait_for(reader.read(65536), timeout=t_end - time.perf_counter())
+                except asyncio.TimeoutError:
+                    break
+                if not chunk:
+                    break
+                data = tail + chunk
+                frames += data.count(b"--frame\r\n")
+                tail = data[-9:]
+        finally:
+            writer.close()
+        return frames
+
+    counts = await asyncio.gather(*(client() for _ in range(args.viewers)))
+    ok = [c for c in counts if c is not None]
+    if not ok:
+        print(f"could not connect to {args.url}")
+        return 1
+    fps = [c / args.seconds for c in ok]
+    _print_table(("clients", "connected", "fps_mean", "fps_min", "fps_max"),
+                 [[args.viewers, len(ok), f"{np.mean(fps):.1f}", f"{np.min(fps):.1f}", f"{np.max(fps):.1f}"]])
+    return 0
+
+
+def bench_stream(args):
+    import asyncio
+
+    return asyncio.run(_stream_http(args) if args.url else _stream_in_process(args))
+
+
+def _cut_clips(video_path, out_dir, n, frames):
+    """Write n clips of `frames` frames, clip i starting at frame i (distinct content, distinct cache keys)."""
+    import cv2
+
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    source = []
+    while len(source) < n + frames - 1:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        source.append(frame)
+    cap.release()
+    if len(source) < frames:
+        raise SystemExit(f"{video_path} has fewer than {frames} frames")
+
+    paths = []
+    for i in range(n):
+        start = i % (len(source) - frames + 1)
+        path = os.path.join(out_dir, f"clip_{i:03d}.mp4")
+        h, w = source[0].shape[:2]
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+        for frame in source[start:start + frames]:
+            writer.write(frame)
+        writer.release()
+        paths.append(path)
+    return paths
+
+
+def bench_jobs(args):
+    import tempfile
+    import threading
+
+    import detection_cache
+    import process_video
+    from job_scheduler import JobScheduler
+    from model_registry import ModelRegistry
+
+    tmp = tempfile.mkdtemp(prefix="bench_jobs_")
+    clips = _cut_clips(args.video, tmp, args.jobs, args.frames)
+    process_video.OUTPUT_ROOT = os.path.join(tmp, "outputs")
+
+    def run(label, workers):
+        # Fresh cache per configuration: every job detects from scratch
+        detection_cache.CACHE_ROOT = os.path.join(tmp, f"cache_{label}")
+        lock, done, loads = threading.Lock(), {}, [0]
+        submitted = {}
+
+        def run_job(job_id, path, cancelled=None):
+            if workers is None:
+                # Old behaviour: every job loads and warms its own models
+                models = ModelRegistry().models()
+                with lock:
+                    loads[0] += 1
+            else:
+                models = registry.models()  # one set per scheduler worker thread
+            process_video.VideoProcessor(path, {}, models=models).process_analytics()
+            with lock:
+                done[job_id] = time.perf_counter()
+
+        registry = ModelRegistry()
+        t0 = time.perf_counter()
+        if workers is None:
+            threads = []
+            for i, path in enumerate(clips):
+                submitted[i] = time.perf_counter()
+                threads.append(threading.Thread(target=run_job, args=(i, path)))
+                threads[-1].start()
+            for t in threads:
+                t.join()
+        else:
+            scheduler = JobScheduler(run_job, workers=workers)
+            for i, path in enumerate(clips):
+                submitted[i] = time.perf_counter()
+                scheduler.submit(i, path)
+            while scheduler.stats()["completed"] < len(clips):
+                time.sleep(0.05)
+            scheduler.shutdown()
+            loads[0] = registry.stats()["sets"]
+        elapsed = time.perf_counter() - t0
+
+        latencies = [done[i] - submitted[i] for i in done]
+        return [label, workers or len(clips), len(done), f"{elapsed:.1f}", f"{len(done) / elapsed:.2f}",
+                f"{np.percentile(latencies, 50):.1f}" if latencies else "-",
+                f"{np.percentile(latencies, 95):.1f}" if latencies else "-", loads[0]]
+
+    rows = []
+    if not args.no_baseline:
+        rows.append(run("thread-per-job", None))
+    for workers in args.workers:
+        rows.append(run("scheduler", workers))
+    _print_table(("mode", "workers", "jobs", "time_s", "jobs_per_s", "p50_s", "p95_s", "model_loads"), rows)
+    return 0 if all(r[2] == args.jobs for r in rows) else 1
+
+
+def _iou(a, b):
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _backend_run(kind, args, frames):
+    """Per-model latencies (s) and detections of one backend on `frames`."""
+    from ball_tracker import BallTracker
+    from court_detection import CourtDetector
+    from inference_backend import InferenceBackend
+    from model_registry import ModelRegistry, model_path
+    from player_tracker import PlayerTracker
+
+    backend = InferenceBackend(kind, threads=args.threads, imgsz=args.imgsz)
+    models = ModelRegistry(backend=backend).models()
+    ball = BallTracker(model_path("ball"), model=models["ball"])
+    player = PlayerTracker(model_path("player"), model=models["player"])
+    court = CourtDetector(model_path("court"), model=models["court"])
+
+    times = {"ball": [], "player": [], "court": []}
+    dets = {"ball": [], "player": [], "court": []}
+    for frame in frames:
+        for name, detect in (("ball", lambda f: ball.detect_frames([f])[0]),
+                             ("player", lambda f: player.detect_players_batch([f])[0][0]),
+                             ("court", lambda f: court.get_keypoints_and_homography(f)[0])):
+            t0 = time.perf_counter()
+            dets[name].append(detect(frame))
+            times[name].append(time.perf_counter() - t0)
+    return backend.describe()["models"], times, dets
+
+
+def _detection_parity(name, ref, det, tolerance):
+    """Agreement of `det` with the PyTorch detections `ref` for one model."""
+    if name == "ball":
+        hits = [(r, d) for r, d in zip(ref, det) if 1 in r]
+        if not hits:
+            return None, "no reference detections"
+        recall = sum(1 for r, d in hits if 1 in d and _center_dist(r[1], d[1]) <= tolerance) / len(hits)
+        return recall, f"recall {recall:.3f}"
+    if name == "player":
+        total = matched = 0
+        for r, d in zip(ref, det):
+            total += len(r)
+            matched += sum(1 for box in r if any(_iou(box, other) >= 0.5 for other in d))
+        if not total:
+            return None, "no reference detections"
+        return matched / total, f"matched {matched / total:.3f}"
+    found = [(r, d) for r, d in zip(ref, det) if r is not None]
+    if not found:
+        return None, "no reference keypoints"
+    both = [(r, d) for r, d in found if d is not None]
+    err = float(np.mean([np.linalg.norm(np.asarray(r) - np.asarray(d), axis=1).mean()
+                         for r, d in both])) if both else float("nan")
+    agreement = len(both) / len(found)
+    return agreement, f"found {agreement:.3f}, err {err:.1f}px"
+
+
+def _read_frames(video_path, limit):
+    import cv2
+
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def bench_backends(args):
+    frames = _read_frames(args.video, args.frames)
+    if not frames:
+        print("No frames decoded")
+        return 1
+
+    kinds = ["torch"] + [k for k in args.backends if k != "torch"]
+    runs = {kind: _backend_run(kind, args, frames) for kind in kinds}
+    _, ref_times, ref_dets = runs["torch"]
+
+    rows, ok = [], True
+    for kind in kinds:
+        used, times, dets = runs[kind]
+        for name in ("ball", "player", "court"):
+            ms = np.mean(times[name]) * 1000
+            base = np.mean(ref_times[name]) * 1000
+            parity, detail = (1.0, "reference") if kind == "torch" else \
+                _detection_parity(name, ref_dets[name], dets[name], args.tolerance)
+            fell_back = used.get(name) != kind
+            if fell_back or (parity is not None and parity < args.min_parity):
+                ok = False
+            rows.append([kind, name, used.get(name, "-") + (" (fallback)" if fell_back else ""),
+                         f"{ms:.2f}", f"{1000 / ms:.1f}" if ms else "-",
+                         f"{base / ms:.2f}x" if ms else "-", detail])
+    _print_table(("backend", "model", "runs_on", "ms_per_frame", "fps", "speedup", "parity"), rows)
+    print(f"{len(frames)} frames, threads={args.threads or 'default'}, imgsz={args.imgsz}")
+    return 0 if ok else 1
+
+
+def bench_imgsz(args):
+    from ball_tracker import BallTracker
+    from court_detection import CourtDetector
+    from letterbox import FrameViews
+    from model_registry import model_path, registry
+    from player_tracker import PlayerTracker
+
+    frames = _read_frames(args.video, args.frames)
+    if not frames:
+        print("No frames decoded")
+        return 1
+    models = registry.models()
+    reference = args.reference or max(args.sizes)
+    sizes = sorted(set(args.sizes) | {reference})
+
+    results = {}
+    for size in sizes:
+        ball = BallTracker(model_path("ball"), model=models["ball"], imgsz=size)
+        player = PlayerTracker(model_path("player"), model=models["player"], imgsz=size)
+        court = CourtDetector(model_path("court"), model=models["court"], imgsz=size)
+        times = {"resize": [], "ball": [], "player": [], "court": []}
+        dets = {"ball": [], "player": [], "court": []}
+        for frame in frames:
+            views = FrameViews([frame])
+            t0 = time.perf_counter()
+            views.resized(size)  # once; the three models reuse it
+            times["resize"].append(time.perf_counter() - t0)
+            for name, detect in (("ball", lambda: ball.detect_frames([frame], views)[0]),
+                                 ("player", lambda: player.detect_players_batch([frame], views)[0][0]),
+                                 ("court", lambda: court.get_keypoints_and_homography(frame, views.view(0))[0])):
+                t0 = time.perf_counter()
+                dets[name].append(detect())
+                times[name].append(time.perf_counter() - t0)
+        results[size] = (times, dets)
+
+    rows = []
+    for name in ("ball", "player", "court"):
+        for size in sizes:
+            times, dets = results[size]
+            ms = np.mean(times[name]) * 1000
+            _, detail = (None, "reference") if size == reference else \
+                _detection_parity(name, results[reference][1][name], dets[name], args.tolerance)
+            rows.append([name, size, f"{ms:.2f}", f"{np.percentile(times[name], 95) * 1000:.2f}",
+                         f"{1000 / ms:.1f}" if ms else "-", detail])
+    _print_table(("model", "imgsz", "mean_ms", "p95_ms", "fps", "vs reference"), rows)
+    print("shared resize per frame: " + ", ".join(
+        f"{size}: {np.mean(results[size][0]['resize']) * 1000:.2f} ms" for size in sizes))
+    print(f"{len(frames)} frames, reference size {reference}, ball tolerance {args.tolerance:.0f}px")
+    return 0
+
+
+def bench_decode(args):
+    import json
+    import tempfile
+
+    import detection_cache
+    import process_video
+    from detection_scheduler import analytics_divergence
+
+    tmp = tempfile.mkdtemp(prefix="bench_decode_")
+    process_video.OUTPUT_ROOT = os.path.join(tmp, "outputs")
+    prefetch = process_video.DECODE_PREFETCH
+    # (label, prefetch, reuse buffers, reduced decode); the first one is the reference
+    configs = [("plain", 0, False, False), ("prefetch", prefetch, False, False),
+               ("prefetch+buffers", prefetch, True, False), ("reduced", prefetch, True, True)]
+
+    rows, ref, failed = [], None, False
+    for label, ahead, reuse, reduced in configs:
+        # Fresh cache per configuration: every run decodes and detects
+        detection_cache.CACHE_ROOT = os.path.join(tmp, f"cache_{label}")
+        process_video.DECODE_PREFETCH = ahead
+        process_video.REUSE_DECODE_BUFFERS = reuse
+        vp = process_video.VideoProcessor(args.video, {}, reduced_decode=reduced)
+        result = vp.process_video() if args.mode == "composite" else vp.process_analytics()
+        with open(result["stats_path"]) as f:
+            stats = json.load(f)
+        m, d = result["metrics"], result["metrics"]["decode"]
+
+        if ref is None:
+            ref, ref_fps, vs = (stats, vp), m["fps"], "reference"
+        elif stats == ref[0]:
+            vs = "identical"
+        elif reduced:
+            div = analytics_divergence((ref[1].analytics, ref[1].score_tracker), (vp.analytics, vp.score_tracker))
+            vs = (f"player_tv {div.get('player_heat', 0.0):.4f}, ball_tv {div.get('ball_heat', 0.0):.4f}, "
+                  f"score {'same' if div['score_match'] else 'DIFFERENT'}")
+        else:
+            vs, failed = "DIFFERENT", True
+        rows.append([label, "x".join(map(str, d["size"])), f"{d['buffers_allocated']}/{d['buffers']}",
+                     f"{d['decode_s']:.2f}", f"{d['decode_fps']:.1f}", f"{m['detect_fps']:.1f}",
+                     f"{m['fps']:.1f}", f"{m['fps'] / ref_fps:.2f}x" if ref_fps else "-", vs])
+    process_video.DECODE_PREFETCH = prefetch
+    process_video.REUSE_DECODE_BUFFERS = True
+
+    _print_table(("config", "decoded", "buffers", "decode_s", "decode_fps", "detect_fps", "fps", "speedup",
+                  "outputs vs plain"), rows)
+    print(f"{args.mode} mode, capture backend {d['api']}, hardware acceleration "
+          f"{d['hw_accel'] if d['hw_accel_active'] else 'off'} (PICKLEBALL_DECODE_* to change)")
+    return 1 if failed else 0
+
+
+# Stacks the API and desktop entry points must not import at startup
+HEAVY_IMPORTS = ("torch", "ultralytics", "pandas", "cv2", "numpy")
+LAZY_ENTRY_POINTS = ("app", "main")
+
+
+def _import_profile(module):
+    """
+    (total_us, imports) of a cold `import module`, or (None, error); imports
+    lists (name, depth, cumulative_us) of everything it pulled in, depth 1
+    being its direct imports.
+    """
+    import subprocess
+
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=PROJECT_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        lines = proc.stderr.strip().splitlines()
+        return None, lines[-1] if lines else f"exit {proc.returncode}"
+    # Children are listed before their parent: the module's subtree is the
+    # block of deeper lines right above its own top-level line
+    block = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 0:
+            if name.strip() == module:
+                return int(cumulative), block
+            block = []
+        else:
+            block.append((name.strip(), depth, int(cumulative)))
+    return None, "module not found in -X importtime output"
+
+
+def bench_imports(args):
+    rows, ok = [], True
+    for module in args.modules:
+        best = None
+        for _ in range(max(args.repeat, 1)):
+            total, times = _import_profile(module)
+            if total is None:
+                best = (None, times)
+                break
+            if best is None or total < best[0]:
+                best = (total, times)
+        total, imports = best
+        if total is None:
+            rows.append([module, "-", "-", f"error: {imports}"])
+            ok = False
+            continue
+
+        names = {name for name, _, _ in imports}
+        heavy = [m for m in HEAVY_IMPORTS if m in names]
+        over = args.budget_ms and total / 1000 > args.budget_ms
+        if over or (module in LAZY_ENTRY_POINTS and heavy):
+            ok = False
+        slowest = sorted(((t, name) for name, depth, t in imports if depth == 1), reverse=True)
+        rows.append([module, f"{total / 1000:.1f}" + (" OVER" if over else ""), ",".join(heavy) or "-",
+                     ", ".join(f"{m} {t / 1000:.0f}" for t, m in slowest[:args.top])])
+    _print_table(("module", "import_ms", "heavy", "slowest direct imports (ms)"), rows)
+    return 0 if ok else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pickleball analytics benchmarks")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("shards", help="sharded detection scaling across worker processes")
+    p.add_argument("video")
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--batch-size", type=int, default=8)
+    p.add_argument("--frames", type=int, default=0, help="limit to the first N frames (0 = all)")
+    p.set_defaults(func=bench_shards)
+
+    p = sub.add_parser("headless", help="analytics-only mode vs full composite render")
+    p.add_argument("video")
+    p.add_argument("--cold", action="store_true",
+                   help="do not warm the detection cache first (first mode pays for detection)")
+    p.set_defaults(func=bench_headless)
+
+    p = sub.add_parser("schedule", help="skipped inferences vs analytics divergence per detection schedule")
+    p.add_argument("video")
+    p.add_argument("--player-stride", type=int, nargs="+", default=[1, 2, 3, 5])
+    p.add_argument("--ball-idle-stride", type=int, nargs="+", default=[1, 6])
+    p.set_defaults(func=bench_schedule)
+
+    p = sub.add_parser("roi", help="ROI ball detection latency and recall vs full-frame")
+    p.add_argument("video")
+    p.add_argument("--frames", type=int, default=0, help="limit to the first N frames (0 = all)")
+    p.add_argument("--tolerance", type=float, default=10.0,
+                   help="max center distance (px) for an ROI box to match the full-frame box")
+    p.set_defaults(func=bench_roi)
+
+    p = sub.add_parser("projection", help="per-point vs vectorized vs bulk homography projection")
+    p.add_argument("--frames", type=int, default=9000)
+    p.add_argument("--players", type=int, default=4, help="player boxes per frame")
+    p.set_defaults(func=bench_projection)
+
+    p = sub.add_parser("render", help="render time with the static court layer cache off vs on")
+    p.add_argument("video")
+    p.add_argument("--cold", action="store_true", help="do not warm the detection cache first")
+    p.set_defaults(func=bench_render)
+
+    p = sub.add_parser("heatmap", help="analytics-grid render time with full vs incremental heatmaps")
+    p.add_argument("--frames", type=int, default=1800)
+    p.add_argument("--players", type=int, default=4)
+    p.add_argument("--every", type=int, nargs="+", default=[1, 3, 5], help="incremental render cadences")
+    p.add_argument("--panel-width", type=int, default=320)
+    p.add_argument("--panel-height", type=int, default=360)
+    p.set_defaults(func=bench_heatmap)
+
+    p = sub.add_parser("stream", help="load test of the live MJPEG fan-out (in process, or --url for a running API)")
+    p.add_argument("--viewers", type=int, default=500)
+    p.add_argument("--seconds", type=float, default=5.0)
+    p.add_argument("--url", help="stream URL of a running API job; default: in-process broadcaster")
+    p.add_argument("--fps", type=int, default=15, help="preview fps cap (in process)")
+    p.add_argument("--source-fps", type=float, default=30.0, help="frames published per second (in process)")
+    p.add_argument("--slow", type=float, default=0.1, help="fraction of deliberately slow viewers (in process)")
+    p.add_argument("--slow-delay", type=float, default=0.25, help="seconds a slow viewer spends per frame")
+    p.set_defaults(func=bench_stream)
+
+    p = sub.add_parser("jobs", help="API job scheduler load test: throughput and job latency per worker count")
+    p.add_argument("video")
+    p.add_argument("--jobs", type=int, default=24, help="clips submitted at once")
+    p.add_argument("--frames", type=int, default=60, help="frames per clip")
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--no-baseline", action="store_true", help="skip the thread-per-job reference run")
+    p.set_defaults(func=bench_jobs)
+
+    p = sub.add_parser("imports", help="cold import time per entry module and heavy stacks it pulls in")
+    p.add_argument("modules", nargs="*", default=["app", "main", "process_video"])
+    p.add_argument("--repeat", type=int, default=3, help="fresh interpreters per module (best is kept)")
+    p.add_argument("--top", type=int, default=5, help="slowest imports listed per module")
+    p.add_argument("--budget-ms", type=float, default=0.0, help="fail above this import time (0 = no budget)")
+    p.set_defaults(func=bench_imports)
+
+    p = sub.add_parser("backends", help="inference time and detection parity of exported backends vs PyTorch")
+    p.add_argument("video")
+    p.add_argument("--backends", nargs="+", default=["torch", "onnx", "openvino"])
+    p.add_argument("--frames", type=int, default=200)
+    p.add_argument("--threads", type=int, default=0, help="intra-op threads (0 = runtime default)")
+    p.add_argument("--imgsz", type=int, default=640)
+    p.add_argument("--tolerance", type=float, default=10.0, help="ball center distance (px) counted as a match")
+    p.add_argument("--min-parity", type=float, default=0.95, help="fail below this recall / match rate")
+    p.set_defaults(func=bench_backends)
+
+    p = sub.add_parser("imgsz", help="latency vs recall of each detector per inference size")
+    p.add_argument("video")
+    p.add_argument("--sizes", type=int, nargs="+", default=[480, 640, 960, 1280])
+    p.add_argument("--reference", type=int, default=0, help="size whose detections count as truth (default: largest)")
+    p.add_argument("--frames", type=int, default=200)
+    p.add_argument("--tolerance", type=float, default=10.0, help="ball center distance (px) counted as a match")
+    p.set_defaults(func=bench_imgsz)
+
+    p = sub.add_parser("decode", help="decode fps vs detection fps per decode configuration, and output parity")
+    p.add_argument("video")
+    p.add_argument("--mode", choices=["headless", "composite"], default="headless",
+                   help="composite never decodes at reduced resolution (its output is at source height)")
+    p.set_defaults(func=bench_decode)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,7 +8,9 @@ bird’s-eye plane, and provides utilities to draw/project court geometry.
 
 What it does
 ------------
-- get_keypoints_and_homography(frame): YOLO keypoints → H via RANSAC to fixed dst layout
+- get_keypoints_and_homography(frame, view): YOLO keypoints → H via RANSAC to fixed dst
+  layout; with `imgsz` set, on the frame resized to it (shared through a
+  letterbox.FrameView when given) with keypoints mapped back to frame pixels
 - project_points(points, H): project arbitrary (x, y) points to bird space
 - draw_court_overlay(frame, keypoints): annotate original frame with points/edges
 - draw_homography_overlay(canvas, projected_kpts): draw court in bird space
@@ -32,13 +34,18 @@ Assumptions
 """
 
 
-from ultralytics import YOLO
 import cv2
 import numpy as np
 
+from letterbox import resize_for
+
 class CourtDetector:
-    def __init__(self, model_path, homography_size = (400,900)):
-        self.model = YOLO(model_path)
+    def __init__(self, model_path, homography_size = (400,900), model=None, imgsz=None):
+        if model is None:
+            from ultralytics import YOLO  # heavy (torch); imported only when actually loading
+            model = YOLO(model_path)
+        self.model = model
+        self.imgsz = imgsz  # inference size; None = the model's default
         self.birdseye_size = homography_size
         self.dst_pts = self.get_reference_points()
         self.connect_pairs = self.get_connect_pairs()
@@ -70,15 +77,21 @@ class CourtDetector:
             (2, 5), (5, 8), (8,11)   # right column
         ]
 
-    def get_keypoints_and_homography(self, frame):
+    def get_keypoints_and_homography(self, frame, view=None):
         """Detects court keypoints and computes the homography matrix"""
-        results = self.model(frame, conf=0.9)
+        if self.imgsz is None:
+            results, scale = self.model(frame, conf=0.9), None
+        else:
+            image, scale = view.resized(self.imgsz) if view is not None else resize_for(frame, self.imgsz)
+            results = self.model(image, conf=0.9, imgsz=self.imgsz)
         keypoints = results[0].keypoints
 
         if keypoints is None or keypoints.shape[1] != len(self.dst_pts):
             return None, None
 
         src_pts = keypoints.xy[0].cpu().numpy().astype(np.float32)
+        if scale is not None:
+            src_pts = src_pts * np.array(scale, dtype=np.float32)
         H, _ = cv2.findHomography(src_pts, self.dst_pts, method=cv2.RANSAC)
         return src_pts, H
 
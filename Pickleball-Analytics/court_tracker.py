@@ -0,0 +1,201 @@
+"""
+Court tracking (homography reuse with drift detection)
+
+Purpose
+-------
+Court detection is a full YOLO pass, so the homography is detected once and
+reused.  A reused homography is only valid while the camera stays put, so
+this module keeps watching for camera motion and re-detects the court when
+the view changes (or, rarely, on a timer) instead of trusting the first
+frames for the whole match.
+
+What it does
+------------
+- update(frame, frame_idx) -> (keypoints, H) for every frame, in order
+    - bootstrap: detect on the first `bootstrap_frames` frames until the court
+      is found (the original rule, so a static camera gives the same result)
+    - drift check every DRIFT_CHECK_EVERY frames: corners along the court
+      lines of the reference frame (the frame H was detected on, downscaled to
+      DRIFT_SCALE_WIDTH) are tracked into the current frame with pyramidal
+      Lucas-Kanade flow; a
+      median displacement above `drift_px`, or losing most of the corners,
+      counts as camera motion
+    - re-detect on drift (at most once per DRIFT_COOLDOWN frames) and every
+      `redetect_every` frames; a re-detection whose keypoints are within
+      `drift_px` of the current ones keeps the current H, so a static camera
+      does not churn the homography, but restarts the drift reference from this
+      frame, so a confirmed court is not re-detected again every cooldown; slow
+      drift still adds up, since keypoints are compared with those of the kept H
+    - drift_px is in source pixels; set_pixel_scale(s) tells the tracker that
+      one frame pixel is s source pixels (frames decoded at reduced size)
+    - a failed re-detection keeps the last good H
+- seed(keypoints, H): continue from a known court (e.g. a cached prefix)
+- stats: detections, re-detections (periodic / drift), drift checks and the
+  time spent in court detection and drift checks
+
+Assumptions
+-----------
+- Corners are taken in a band around the court lines drawn from the detected
+  keypoints; players crossing a line are a minority of them, so the median
+  displacement reflects the camera, not the play
+- Frames arrive in order; sharded detection (sharding.py) runs this tracker
+  over the whole video in the parent process rather than per shard
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+# Frames between periodic re-detections (0 = only on drift)
+COURT_REDETECT_EVERY = 900
+# Median corner displacement (source px) treated as camera motion
+DRIFT_PX = 6.0
+# Run the drift check on every Nth frame
+DRIFT_CHECK_EVERY = 3
+# Drift check works on frames downscaled to this width
+DRIFT_SCALE_WIDTH = 320
+# Corners sampled along the court lines (band width in downscaled px); below the
+# minimum the check is skipped
+DRIFT_LINE_BAND = 9
+DRIFT_MAX_FEATURES = 60
+DRIFT_MIN_FEATURES = 8
+# Fraction of corners that must still be tracked, else the view changed
+DRIFT_MIN_TRACKED = 0.5
+# Frames to wait after a drift-triggered re-detection before the next one
+DRIFT_COOLDOWN = 15
+
+
+class CourtTracker:
+    def __init__(self, detector, bootstrap_frames=5, redetect_every=COURT_REDETECT_EVERY,
+                 drift_px=DRIFT_PX):
+        self.detector = detector
+        self.bootstrap_frames = bootstrap_frames
+        self.redetect_every = max(int(redetect_every or 0), 0)
+        self.drift_px = drift_px
+        self.pixel_scale = 1.0      # source px per frame px
+        self.reset()
+
+    def reset(self):
+        self.kps = None
+        self.H = None
+        self._ref_gray = None       # downscaled gray frame H was detected on
+        self._ref_pts = None        # corners in _ref_gray, (N, 1, 2) float32
+        self._scale = 1.0           # downscaled / source size
+        self._detected_at = 0       # frame index of the last detection
+        self._cooldown_until = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {
+            "detections": 0,
+            "redetections": 0,
+            "drift_redetections": 0,
+            "periodic_redetections": 0,
+            "drift_checks": 0,
+            "court_s": 0.0,
+            "drift_check_s": 0.0,
+        }
+
+    def set_pixel_scale(self, scale):
+        """Source pixels per frame pixel, so drift_px keeps its meaning on reduced frames."""
+        self.pixel_scale = float(scale or 1.0)
+
+    def seed(self, kps, H):
+        """Continue from a known court; the next frame becomes the drift reference."""
+        if kps is not None and H is not None:
+            self.kps, self.H = kps, H
+            self._ref_gray = None
+
+    def update(self, frame, frame_idx, view=None):
+        """
+        Return (keypoints, H) for this frame; frames must arrive in order.
+        view: the frame's letterbox.FrameView, shared with the other detectors.
+        """
+        if self.H is None:
+            if frame_idx < self.bootstrap_frames:
+                kps, H = self._detect(frame, view)
+                if kps is not None and H is not None:
+                    self._accept(frame, frame_idx, kps, H)
+                return kps, H
+            if self.redetect_every and frame_idx % self.redetect_every == 0:
+                kps, H = self._detect(frame, view)
+                if kps is not None and H is not None:
+                    self._accept(frame, frame_idx, kps, H)
+            return self.kps, self.H
+
+        if self._ref_gray is None:
+            self._set_reference(frame, frame_idx)
+
+        if self.redetect_every and frame_idx - self._detected_at >= self.redetect_every:
+            self._redetect(frame, frame_idx, "periodic", view)
+        elif (frame_idx % DRIFT_CHECK_EVERY == 0 and frame_idx >= self._cooldown_until
+              and self._drifted(frame)):
+            self._redetect(frame, frame_idx, "drift", view)
+            self._cooldown_until = frame_idx + DRIFT_COOLDOWN
+        return self.kps, self.H
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _detect(self, frame, view=None):
+        t0 = time.perf_counter()
+        kps, H = self.detector.get_keypoints_and_homography(frame, view=view)
+        self.stats["court_s"] += time.perf_counter() - t0
+        self.stats["detections"] += 1
+        return kps, H
+
+    def _redetect(self, frame, frame_idx, reason, view=None):
+        self.stats["redetections"] += 1
+        self.stats[f"{reason}_redetections"] += 1
+        kps, H = self._detect(frame, view)
+        self._detected_at = frame_idx
+        if kps is None or H is None:
+            return  # keep the last good court, retry later
+        moved = float(np.mean(np.linalg.norm(np.asarray(kps) - np.asarray(self.kps), axis=1))) * self.pixel_scale
+        if moved > self.drift_px:
+            print(f"[COURT] {reason} re-detection at frame {frame_idx}: keypoints moved {moved:.1f}px")
+            self._accept(frame, frame_idx, kps, H)
+        else:
+            self._set_reference(frame, frame_idx)  # court confirmed: track from here, keep H
+
+    def _accept(self, frame, frame_idx, kps, H):
+        self.kps, self.H = kps, H
+        self._set_reference(frame, frame_idx)
+
+    def _set_reference(self, frame, frame_idx):
+        self._detected_at = frame_idx
+        self._ref_gray = self._small_gray(frame)
+
+        # Only corners on/near the court lines: static unless the camera moves
+        mask = np.zeros_like(self._ref_gray)
+        kps = np.round(np.asarray(self.kps, dtype=np.float32).reshape(-1, 2) * self._scale).astype(int)
+        for i, j in self.detector.connect_pairs:
+            if i < len(kps) and j < len(kps):
+                cv2.line(mask, tuple(int(v) for v in kps[i]), tuple(int(v) for v in kps[j]), 255, DRIFT_LINE_BAND)
+        self._ref_pts = cv2.goodFeaturesToTrack(self._ref_gray, DRIFT_MAX_FEATURES, 0.01, 5, mask=mask)
+
+    def _small_gray(self, frame):
+        h, w = frame.shape[:2]
+        self._scale = min(1.0, DRIFT_SCALE_WIDTH / float(w))
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self._scale < 1.0:
+            gray = cv2.resize(gray, (int(w * self._scale), int(h * self._scale)), interpolation=cv2.INTER_AREA)
+        return gray
+
+    def _drifted(self, frame):
+        if self._ref_pts is None or len(self._ref_pts) < DRIFT_MIN_FEATURES:
+            return False  # not enough texture to judge; periodic re-detection covers it
+        t0 = time.perf_counter()
+        self.stats["drift_checks"] += 1
+        gray = self._small_gray(frame)
+        pts, status, _ = cv2.calcOpticalFlowPyrLK(self._ref_gray, gray, self._ref_pts, None,
+                                                  winSize=(15, 15), maxLevel=2)
+        ok = status.reshape(-1) == 1
+        if ok.sum() < DRIFT_MIN_TRACKED * len(ok):
+            drifted = True
+        else:
+            shift = np.linalg.norm((pts - self._ref_pts).reshape(-1, 2)[ok], axis=1)
+            drifted = float(np.median(shift)) / self._scale * self.pixel_scale > self.drift_px
+        self.stats["drift_check_s"] += time.perf_counter() - t0
+        return drifted
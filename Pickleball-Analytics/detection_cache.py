@@ -3,15 +3,56 @@ Detection result cache
 
 Purpose
 -------
-Caches per-frame YOLO detection outputs (ball, player, court) keyed by
-video file SHA-256 hash.  On re-upload of the same video the expensive
-model inference is skipped entirely and results are replayed from disk.
+Caches per-frame YOLO detection outputs (ball, player, court) keyed by a
+content fingerprint of the video file.  On re-upload of the same video the
+expensive model inference is skipped entirely and results are replayed from disk.
 
-Storage layout
---------------
-    detection_cache/<sha256>/
-        detections.pkl   – pickled list[dict], one entry per frame
-        meta.json        – original filename, frame count, timestamp
+Cache keys
+----------
+- "fast" (default): SHA-256 over the file size, the head and tail of the file
+  (where MP4/MOV keep the ftyp/moov container metadata) and evenly spaced
+  sampled chunks.  Reads a few MB regardless of file size.
+- "full": SHA-256 of the whole file (the original behaviour).
+Keys are memoized per (path, size, mtime), so a video is fingerprinted at most
+once per job no matter how many cache calls are made.  An optional background
+thread can compute the full SHA-256 afterwards, record it in meta.json, and
+drop a cache whose recorded content hash does not match.  Caches written under
+full-hash keys stay reachable: on a fingerprint miss, while the cache root
+still holds full-hash directories, the video's full hash is computed once and
+its directory (columnar or detections.pkl) is moved to the fingerprint key.
+
+Storage layout (columnar)
+-------------------------
+    detection_cache/<key>/
+        meta.json            – format, row counts, original filename, timestamp
+        ball_bbox.f64        – (N, 4)  ball box per frame (zeros when absent)
+        ball_present.u8      – (N,)    1 if the ball was detected
+        player_offsets.i64   – (N+1,)  frame i owns player rows [off[i], off[i+1])
+        player_boxes.f64     – (M, 4)  all player boxes, frame-major
+        player_confs.f64     – (M,)    matching confidences
+        court_index.i32      – (N,)    row into the court tables, -1 = no court
+        court_kps.f32        – (K, 12, 2) keypoints, one row per *change*
+        court_h.f64          – (K, 3, 3)  homography per court row, NaN = None
+
+Every file is a raw little-endian array opened with np.memmap, so loading is
+constant time regardless of video length and frames are read on demand by
+index.  Boxes and confidences are stored as float64, the type the detectors
+return, so a replayed cache is bit-identical to a fresh run (benchmark.py
+compares stats.json exactly).  Caches written by older versions
+(detections.pkl) are migrated to the columnar layout the first time they are
+loaded; complete "columnar-v1" caches, whose box columns are float32, are still
+read as they are, partial ones are re-run rather than resumed.
+
+Incremental writes & resume
+---------------------------
+While a video is processed, detections are appended through a CacheAppender
+in chunks of CACHE_CHUNK_FRAMES.  Each flush appends rows to the column files
+and then atomically replaces meta.json, whose counts are the source of truth:
+rows past them (from a crash mid-flush) are truncated on resume.  meta.json
+records "complete" and "last_frame", so a restarted job replays the cached
+prefix and resumes inference from the first uncached frame.  While a writer
+is open its directory holds a writing.pid marker; the background full-hash
+verifier never moves, drops or rewrites a directory that has one.
 
 What is cached (per frame)
 --------------------------
@@ -26,6 +67,10 @@ import hashlib
 import json
 import os
 import pickle
+import shutil
+import tempfile
+import threading
+import time
 from datetime import datetime
 from typing import List, Optional
 
@@ -34,6 +79,271 @@ import numpy as np
 PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
 CACHE_ROOT = os.path.join(PROJECT_DIR, "detection_cache")
 
+CACHE_FORMAT = "columnar-v2"
+
+# Cache key settings
+KEY_MODE = "fast"                 # "fast" fingerprint or "full" SHA-256
+VERIFY_FULL_HASH = False          # compute the full SHA-256 in a background thread
+FP_EDGE_BYTES = 1 << 20           # head/tail bytes hashed (container metadata)
+FP_SAMPLES = 16                   # evenly spaced chunks hashed in between
+FP_SAMPLE_BYTES = 64 << 10
+
+CACHE_CHUNK_FRAMES = 300          # frames buffered between incremental flushes
+WRITING_MARKER = "writing.pid"    # present while a writer owns the cache directory
+N_COURT_KPS = 12
+
+# file name -> (dtype, per-row shape)
+_COLUMNS = {
+    "ball_bbox.f64": (np.float64, (4,)),
+    "ball_present.u8": (np.uint8, ()),
+    "player_offsets.i64": (np.int64, ()),
+    "player_boxes.f64": (np.float64, (4,)),
+    "player_confs.f64": (np.float64, ()),
+    "court_index.i32": (np.int32, ()),
+    "court_kps.f32": (np.float32, (N_COURT_KPS, 2)),
+    "court_h.f64": (np.float64, (3, 3)),
+}
+# Columns that "columnar-v1" caches stored as float32, under their old file names
+_V1_FORMAT = "columnar-v1"
+_V1_FLOAT32 = {
+    "ball_bbox.f64": "ball_bbox.f32",
+    "player_boxes.f64": "player_boxes.f32",
+    "player_confs.f64": "player_confs.f32",
+}
+
+
+class CachedDetections:
+    """
+    Read-only, memory-mapped view of a columnar cache.  Behaves like the old
+    list[dict]: len(), indexing and iteration return per-frame dicts, built
+    lazily from the mapped columns.
+    """
+
+    def __init__(self, cache_dir: str, meta: dict):
+        self.cache_dir = cache_dir
+        self.meta = meta
+        n = int(meta["frame_count"])
+        m = int(meta["player_count"])
+        k = int(meta["court_count"])
+
+        self.ball_bbox = self._map("ball_bbox.f64", n)
+        self.ball_present = self._map("ball_present.u8", n)
+        self.player_offsets = self._map("player_offsets.i64", n + 1)
+        self.player_boxes = self._map("player_boxes.f64", m)
+        self.player_confs = self._map("player_confs.f64", m)
+        self.court_index = self._map("court_index.i32", n)
+        self.court_kps = self._map("court_kps.f32", k)
+        self.court_h = self._map("court_h.f64", k)
+
+    def _map(self, name: str, rows: int) -> np.ndarray:
+        dtype, shape = _COLUMNS[name]
+        if self.meta.get("format") == _V1_FORMAT and name in _V1_FLOAT32:
+            name, dtype = _V1_FLOAT32[name], np.float32
+        if rows == 0:
+            return np.zeros((0,) + shape, dtype=dtype)
+        return np.memmap(os.path.join(self.cache_dir, name), dtype=dtype, mode="r", shape=(rows,) + shape)
+
+    @property
+    def complete(self) -> bool:
+        """False for a partial cache left by an interrupted run."""
+        return bool(self.meta.get("complete", True))
+
+    def __len__(self) -> int:
+        return int(self.meta["frame_count"])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, idx: int) -> dict:
+        n = len(self)
+        if idx < 0:
+            idx += n
+        if not 0 <= idx < n:
+            raise IndexError(idx)
+
+        ci = int(self.court_index[idx])
+        if ci < 0:
+            kps, Hmg = None, None
+        else:
+            kps = np.array(self.court_kps[ci])
+            Hmg = np.array(self.court_h[ci])
+            if np.isnan(Hmg).any():
+                Hmg = None
+
+        lo, hi = int(self.player_offsets[idx]), int(self.player_offsets[idx + 1])
+        boxes = self.player_boxes[lo:hi].tolist()
+        confs = self.player_confs[lo:hi].tolist()
+
+        ball = {1: self.ball_bbox[idx].tolist()} if self.ball_present[idx] else {}
+        return DetectionCache.make_entry(kps, Hmg, boxes, confs, ball)
+
+
+class _ColumnarWriter:
+    """Serialize per-frame dicts into the columnar files of one cache directory."""
+
+    def __init__(self, cache_dir: str, resume_meta: Optional[dict] = None):
+        self.cache_dir = cache_dir
+        self.frame_count = 0
+        self.player_count = 0
+        self.court_count = 0
+        self._last_court = None  # (kps, H) of the newest court row
+        os.makedirs(cache_dir, exist_ok=True)
+        if resume_meta is not None:
+            self._resume(resume_meta)
+            return
+        for name in _COLUMNS:
+            open(os.path.join(cache_dir, name), "wb").close()
+        for name in _V1_FLOAT32.values():
+            if os.path.exists(os.path.join(cache_dir, name)):
+                os.remove(os.path.join(cache_dir, name))
+        self._write("player_offsets.i64", np.zeros(1, dtype=np.int64))
+
+    def _resume(self, meta: dict) -> None:
+        """Continue after the rows recorded in meta; drop anything written past them."""
+        self.frame_count = int(meta["frame_count"])
+        self.player_count = int(meta["player_count"])
+        self.court_count = int(meta["court_count"])
+        rows = {
+            "ball_bbox.f64": self.frame_count,
+            "ball_present.u8": self.frame_count,
+            "player_offsets.i64": self.frame_count + 1,
+            "player_boxes.f64": self.player_count,
+            "player_confs.f64": self.player_count,
+            "court_index.i32": self.frame_count,
+            "court_kps.f32": self.court_count,
+            "court_h.f64": self.court_count,
+        }
+        for name, n in rows.items():
+            dtype, shape = _COLUMNS[name]
+            row_bytes = np.dtype(dtype).itemsize * int(np.prod(shape, dtype=np.int64))
+            with open(os.path.join(self.cache_dir, name), "ab") as f:
+                f.truncate(n * row_bytes)
+
+        if self.court_count:
+            last = self.court_count - 1
+            kps = np.fromfile(os.path.join(self.cache_dir, "court_kps.f32"), dtype="<f4",
+                              count=N_COURT_KPS * 2, offset=last * N_COURT_KPS * 2 * 4).reshape(N_COURT_KPS, 2)
+            Hmg = np.fromfile(os.path.join(self.cache_dir, "court_h.f64"), dtype="<f8",
+                              count=9, offset=last * 9 * 8).reshape(3, 3)
+            self._last_court = (kps, None if np.isnan(Hmg).any() else Hmg)
+
+    def append(self, entries: List[dict]) -> None:
+        if not entries:
+            return
+        n = len(entries)
+        ball_bbox = np.zeros((n, 4), dtype=np.float64)
+        ball_present = np.zeros(n, dtype=np.uint8)
+        offsets = np.zeros(n, dtype=np.int64)
+        court_index = np.full(n, -1, dtype=np.int32)
+        boxes, confs, new_kps, new_h = [], [], [], []
+
+        for i, entry in enumerate(entries):
+            bbox = entry["ball"]["bbox_dict"].get(1)
+            if bbox is not None:
+                ball_bbox[i] = bbox
+                ball_present[i] = 1
+
+            frame_boxes = entry["players"]["boxes"] or []
+            boxes.extend(list(b) for b in frame_boxes)
+            confs.extend(entry["players"]["confs"] or [])
+            offsets[i] = self.player_count + len(boxes)
+
+            kps = entry["court"]["keypoints"]
+            Hmg = entry["court"]["homography"]
+            if kps is None:
+                continue
+            if not self._same_court(kps, Hmg):
+                self._last_court = (kps, Hmg)
+                new_kps.append(np.asarray(kps, dtype=np.float32).reshape(N_COURT_KPS, 2))
+                new_h.append(np.full((3, 3), np.nan) if Hmg is None else np.asarray(Hmg, dtype=np.float64))
+                self.court_count += 1
+            court_index[i] = self.court_count - 1
+
+        self._write("ball_bbox.f64", ball_bbox)
+        self._write("ball_present.u8", ball_present)
+        self._write("player_offsets.i64", offsets)
+        self._write("player_boxes.f64", np.asarray(boxes, dtype=np.float64).reshape(-1, 4))
+        self._write("player_confs.f64", np.asarray(confs, dtype=np.float64))
+        self._write("court_index.i32", court_index)
+        if new_kps:
+            self._write("court_kps.f32", np.stack(new_kps))
+            self._write("court_h.f64", np.stack(new_h))
+
+        self.frame_count += n
+        self.player_count += len(boxes)
+
+    def _same_court(self, kps, Hmg) -> bool:
+        if self._last_court is None:
+            return False
+        last_kps, last_h = self._last_court
+        if (Hmg is None) != (last_h is None):
+            return False
+        return np.array_equal(kps, last_kps) and (Hmg is None or np.array_equal(Hmg, last_h))
+
+    def _write(self, name: str, arr: np.ndarray) -> None:
+        dtype, _ = _COLUMNS[name]
+        with open(os.path.join(self.cache_dir, name), "ab") as f:
+            f.write(np.ascontiguousarray(arr, dtype=np.dtype(dtype).newbyteorder("<")).tobytes())
+
+    def counts(self) -> dict:
+        return {
+            "format": CACHE_FORMAT,
+            "frame_count": self.frame_count,
+            "player_count": self.player_count,
+            "court_count": self.court_count,
+        }
+
+
+class CacheAppender:
+    """
+    Chunked, crash-safe cache writer used while a video is being processed.
+    Buffers entries and flushes every `chunk_frames`; close(complete=True)
+    marks the cache as covering the whole video.
+    """
+
+    def __init__(self, cache_dir: str, key: str, filename: str,
+                 resume_meta: Optional[dict] = None, chunk_frames: int = CACHE_CHUNK_FRAMES):
+        self.cache_dir = cache_dir
+        self._key = key
+        self._filename = filename
+        self._chunk_frames = max(int(chunk_frames), 1)
+        DetectionCache._claim(cache_dir)
+        self._writer = _ColumnarWriter(cache_dir, resume_meta=resume_meta)
+        self._pending: List[dict] = []
+        self._lock = threading.Lock()
+
+    @property
+    def frame_count(self) -> int:
+        """Frames persisted so far plus frames waiting for the next flush."""
+        return self._writer.frame_count + len(self._pending)
+
+    def extend(self, entries: List[dict]) -> None:
+        with self._lock:
+            self._pending.extend(entries)
+            if len(self._pending) >= self._chunk_frames:
+                self._flush_locked(complete=False)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked(complete=False)
+
+    def close(self, complete: bool) -> None:
+        with self._lock:
+            self._flush_locked(complete=complete)
+        self.release()
+        state = "complete" if complete else f"partial, resumes at frame {self._writer.frame_count}"
+        print(f"[CACHE] {self._writer.frame_count} frames in {self.cache_dir} ({state})")
+
+    def release(self) -> None:
+        """Give the directory back without flushing (close() does this too)."""
+        DetectionCache._release(self.cache_dir)
+
+    def _flush_locked(self, complete: bool) -> None:
+        self._writer.append(self._pending)
+        self._pending = []
+        DetectionCache._write_meta(self.cache_dir, self._writer, self._filename, self._key, complete=complete)
+
 
 class DetectionCache:
     """Load / save per-frame detection results for a given video file."""
@@ -41,11 +351,89 @@ class DetectionCache:
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
+    _key_memo: dict = {}    # (abspath, size, mtime_ns, mode) -> key
+    _key_stats: dict = {}   # abspath -> timing / verification report
+    _key_lock = threading.Lock()
+    _dir_lock = threading.Lock()  # writer claims vs. the background verifier
+
+    @classmethod
+    def get_cache_key(cls, video_path: str, mode: Optional[str] = None) -> str:
+        """Return the cache key for the video file (memoized per path and file stat)."""
+        mode = mode or KEY_MODE
+        path = os.path.abspath(video_path)
+        st = os.stat(path)
+        memo_key = (path, st.st_size, st.st_mtime_ns, mode)
+
+        with cls._key_lock:
+            stats = cls._key_stats.setdefault(path, {"lookups": 0})
+            stats["lookups"] += 1
+            if memo_key in cls._key_memo:
+                return cls._key_memo[memo_key]
+
+        t0 = time.perf_counter()
+        if mode == "full":
+            key, bytes_read = cls._full_hash(path), st.st_size
+        else:
+            key, bytes_read = cls._fingerprint(path, st.st_size)
+        key_s = time.perf_counter() - t0
+
+        with cls._key_lock:
+            cls._key_memo[memo_key] = key
+            stats.update({
+                "mode": mode,
+                "key": key,
+                "size": st.st_size,
+                "bytes_read": bytes_read,
+                "key_s": key_s,
+            })
+            if mode == "full":
+                stats["full_hash_s"] = key_s
+                stats["sha256"] = key
+
+        if mode != "full" and VERIFY_FULL_HASH:
+            cls.verify_in_background(path)
+        return key
+
+    @classmethod
+    def key_report(cls, video_path: str) -> dict:
+        """
+        Timing report for the video's cache key: time spent fingerprinting,
+        how many lookups the memo served, and the estimated time saved versus
+        hashing the whole file on every lookup (measured when the background
+        full hash has run, otherwise extrapolated from the fingerprint read rate).
+        """
+        with cls._key_lock:
+            stats = dict(cls._key_stats.get(os.path.abspath(video_path), {}))
+        if "key_s" not in stats:
+            return stats
+
+        full_s = stats.get("full_hash_s")
+        estimated = full_s is None
+        if estimated:
+            rate = stats["bytes_read"] / max(stats["key_s"], 1e-9)
+            full_s = stats["size"] / max(rate, 1.0)
+        saved = stats["lookups"] * full_s - stats["key_s"]
+        return {
+            "mode": stats["mode"],
+            "lookups": stats["lookups"],
+            "key_s": round(stats["key_s"], 4),
+            "full_hash_s": round(full_s, 4),
+            "full_hash_estimated": estimated,
+            "saved_s": round(max(saved, 0.0), 4),
+            "verified": stats.get("verified"),
+        }
+
+    @classmethod
+    def verify_in_background(cls, video_path: str) -> threading.Thread:
+        """Compute the full SHA-256 off-thread and reconcile it with the cache (see _verify)."""
+        t = threading.Thread(target=cls._verify, args=(os.path.abspath(video_path),), daemon=True)
+        t.start()
+        return t
+
     @staticmethod
-    def get_cache_key(video_path: str) -> str:
-        """Return SHA-256 hex digest of the video file."""
+    def _full_hash(path: str) -> str:
         h = hashlib.sha256()
-        with open(video_path, "rb") as f:
+        with open(path, "rb") as f:
             while True:
                 chunk = f.read(1 << 20)  # 1 MB chunks
                 if not chunk:
@@ -53,6 +441,88 @@ class DetectionCache:
                 h.update(chunk)
         return h.hexdigest()
 
+    @staticmethod
+    def _fingerprint(path: str, size: int):
+        """Return (key, bytes_read) for the sampled-content fingerprint."""
+        h = hashlib.sha256()
+        h.update(f"fp1:{size}:".encode())
+        bytes_read = 0
+        with open(path, "rb") as f:
+            if size <= 2 * FP_EDGE_BYTES + FP_SAMPLES * FP_SAMPLE_BYTES:
+                data = f.read()
+                h.update(data)
+                return "fp1-" + h.hexdigest(), len(data)
+
+            offsets = [0, size - FP_EDGE_BYTES]
+            span = size - 2 * FP_EDGE_BYTES - FP_SAMPLE_BYTES
+            offsets += [FP_EDGE_BYTES + (span * i) // max(FP_SAMPLES - 1, 1) for i in range(FP_SAMPLES)]
+            for off in offsets:
+                f.seek(off)
+                data = f.read(FP_EDGE_BYTES if off in (0, size - FP_EDGE_BYTES) else FP_SAMPLE_BYTES)
+                h.update(data)
+                bytes_read += len(data)
+        return "fp1-" + h.hexdigest(), bytes_read
+
+    @classmethod
+    def _verify(cls, path: str) -> None:
+        """
+        Full-hash verification: record the content hash in meta.json, adopt a
+        legacy full-hash cache directory for this video, or drop a cache whose
+        recorded content hash differs (fingerprint collision).
+        """
+        with cls._key_lock:
+            key = cls._key_stats.get(path, {}).get("key")
+        if key is None:
+            key = cls.get_cache_key(path)
+        t0 = time.perf_counter()
+        sha = cls._full_hash(path)
+        full_s = time.perf_counter() - t0
+
+        cache_dir = cls._cache_dir(key)
+        legacy_dir = cls._cache_dir(sha)
+        verified = True
+        with cls._dir_lock:
+            if cls._in_progress(cache_dir) or cls._in_progress(legacy_dir):
+                # A run is writing there; its own meta.json records the hash once known
+                print(f"[CACHE] Cache of {os.path.basename(path)} is being written; verification skipped")
+            else:
+                if not os.path.isdir(cache_dir) and os.path.isdir(legacy_dir):
+                    os.replace(legacy_dir, cache_dir)
+                    print(f"[CACHE] Adopted legacy cache {sha[:12]} as {key[:16]}")
+
+                meta = cls._read_meta(cache_dir)
+                if meta is not None:
+                    recorded = meta.get("sha256")
+                    if recorded and recorded != sha:
+                        verified = False
+                        shutil.rmtree(cache_dir, ignore_errors=True)
+                        print(f"[CACHE] Fingerprint collision for {os.path.basename(path)}; dropped {cache_dir}")
+                    elif not recorded:
+                        meta["sha256"] = sha
+                        cls._replace_json(os.path.join(cache_dir, "meta.json"), meta)
+
+        with cls._key_lock:
+            cls._key_stats.setdefault(path, {"lookups": 0}).update(
+                {"full_hash_s": full_s, "sha256": sha, "verified": verified}
+            )
+
+    @staticmethod
+    def make_entry(keypoints, homography, boxes, confs, ball_dict) -> dict:
+        """Build one per-frame record in the cached format."""
+        return {
+            "court": {
+                "keypoints": keypoints,
+                "homography": homography,
+            },
+            "players": {
+                "boxes": boxes,
+                "confs": confs,
+            },
+            "ball": {
+                "bbox_dict": ball_dict,
+            },
+        }
+
     @staticmethod
     def _cache_dir(cache_key: str) -> str:
         return os.path.join(CACHE_ROOT, cache_key)
@@ -61,40 +531,191 @@ class DetectionCache:
     def has_cache(cls, video_path: str) -> bool:
         """True if a complete detection cache exists for this video."""
         key = cls.get_cache_key(video_path)
-        pkl = os.path.join(cls._cache_dir(key), "detections.pkl")
-        return os.path.isfile(pkl)
+        cache_dir = cls._cache_dir(key)
+        if not os.path.isdir(cache_dir):
+            cls._adopt_legacy(video_path, key)
+        meta = cls._read_meta(cache_dir)
+        if meta is not None:
+            return bool(meta.get("complete", True))
+        return os.path.isfile(os.path.join(cache_dir, "detections.pkl"))
 
     @classmethod
-    def load(cls, video_path: str) -> Optional[List[dict]]:
-        """Load cached detections.  Returns None if no cache."""
+    def load(cls, video_path: str) -> Optional[CachedDetections]:
+        """Open cached detections (memory-mapped).  Returns None if no cache."""
         key = cls.get_cache_key(video_path)
-        pkl_path = os.path.join(cls._cache_dir(key), "detections.pkl")
-        if not os.path.isfile(pkl_path):
-            return None
-        with open(pkl_path, "rb") as f:
-            data = pickle.load(f)
-        print(f"[CACHE] Loaded {len(data)} cached frames for {os.path.basename(video_path)}")
+        cache_dir = cls._cache_dir(key)
+        if not os.path.isdir(cache_dir):
+            cls._adopt_legacy(video_path, key)
+        meta = cls._read_meta(cache_dir)
+        if meta is None:
+            meta = cls._migrate_pickle(cache_dir, key)
+            if meta is None:
+                return None
+        data = CachedDetections(cache_dir, meta)
+        state = "" if data.complete else " (partial)"
+        print(f"[CACHE] Opened {len(data)} cached frames{state} for {os.path.basename(video_path)}")
         return data
 
+    @classmethod
+    def open_appender(cls, video_path: str, cached: Optional[CachedDetections] = None) -> CacheAppender:
+        """
+        Writer for detections produced by this run.  Passing the partial cache
+        returned by load() continues it; otherwise a fresh cache is started.
+        """
+        key = cls.get_cache_key(video_path)
+        resume_meta = cached.meta if cached is not None else None
+        return CacheAppender(cls._cache_dir(key), key, os.path.basename(video_path), resume_meta=resume_meta)
+
     @classmethod
     def save(cls, video_path: str, frames_data: List[dict]) -> None:
         """Persist detection results for future runs."""
         key = cls.get_cache_key(video_path)
         cache_dir = cls._cache_dir(key)
-        os.makedirs(cache_dir, exist_ok=True)
 
-        pkl_path = os.path.join(cache_dir, "detections.pkl")
-        with open(pkl_path, "wb") as f:
-            pickle.dump(frames_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        cls._claim(cache_dir)
+        try:
+            writer = _ColumnarWriter(cache_dir)
+            writer.append(frames_data)
+            cls._write_meta(cache_dir, writer, os.path.basename(video_path), key, complete=True)
+        finally:
+            cls._release(cache_dir)
 
-        meta = {
-            "original_filename": os.path.basename(video_path),
-            "frame_count": len(frames_data),
-            "cached_at": datetime.now().isoformat(),
-            "sha256": key,
-        }
+        print(f"[CACHE] Saved {len(frames_data)} frames to {cache_dir}")
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    @classmethod
+    def _adopt_legacy(cls, video_path: str, key: str) -> bool:
+        """
+        Fingerprint-key miss: move this video's cache written under its full
+        SHA-256 key (before fingerprint keys) to `key`.  The full hash is only
+        computed while full-hash directories exist, and once per video.
+        """
+        if not key.startswith("fp1-") or not cls._has_legacy_dirs():
+            return False
+        path = os.path.abspath(video_path)
+        sha = cls._known_sha256(key)
+        if sha is None:
+            t0 = time.perf_counter()
+            sha = cls._full_hash(path)
+            with cls._key_lock:
+                cls._key_stats.setdefault(path, {"lookups": 0}).update(
+                    {"full_hash_s": time.perf_counter() - t0, "sha256": sha}
+                )
+        legacy_dir = cls._cache_dir(sha)
+        with cls._dir_lock:
+            if not os.path.isdir(legacy_dir) or cls._in_progress(legacy_dir):
+                return False
+            try:
+                os.replace(legacy_dir, cls._cache_dir(key))
+            except OSError:
+                return False  # adopted concurrently, or the key directory appeared meanwhile
+        print(f"[CACHE] Adopted legacy cache {sha[:12]} as {key[:16]}")
+        return True
+
+    @staticmethod
+    def _has_legacy_dirs() -> bool:
+        """True if the cache root holds directories named by a full SHA-256 (64 hex digits)."""
+        try:
+            names = os.listdir(CACHE_ROOT)
+        except OSError:
+            return False
+        return any(len(name) == 64 and all(c in "0123456789abcdef" for c in name) for name in names)
+
+    @staticmethod
+    def _read_meta(cache_dir: str) -> Optional[dict]:
         meta_path = os.path.join(cache_dir, "meta.json")
-        with open(meta_path, "w") as f:
-            json.dump(meta, f, indent=2)
+        if not os.path.isfile(meta_path):
+            return None
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+        if meta.get("format") == CACHE_FORMAT:
+            return meta
+        # A complete v1 cache is read-only; a partial one cannot be resumed in float64
+        if meta.get("format") == _V1_FORMAT and meta.get("complete", True):
+            return meta
+        return None
 
-        print(f"[CACHE] Saved {len(frames_data)} frames to {cache_dir}")
+    @staticmethod
+    def _write_meta(cache_dir: str, writer: _ColumnarWriter, filename: str, key: str,
+                    complete: bool = True) -> dict:
+        meta = writer.counts()
+        meta.update({
+            "complete": complete,
+            "last_frame": writer.frame_count - 1,
+            "original_filename": filename,
+            "cached_at": datetime.now().isoformat(),
+            "key": key,
+            "sha256": DetectionCache._known_sha256(key),
+        })
+        DetectionCache._replace_json(os.path.join(cache_dir, "meta.json"), meta)
+        return meta
+
+    @classmethod
+    def _known_sha256(cls, key: str) -> Optional[str]:
+        """Full content hash for a key, if one has been computed this process."""
+        if not key.startswith("fp1-"):
+            return key
+        with cls._key_lock:
+            for stats in cls._key_stats.values():
+                if stats.get("key") == key and stats.get("sha256"):
+                    return stats["sha256"]
+        return None
+
+    @staticmethod
+    def _replace_json(path: str, obj: dict) -> None:
+        # Write-then-rename so a reader never sees a half-written file; the
+        # temp name is unique, so concurrent writers never share one
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".meta-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(obj, f, indent=2)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def _claim(cls, cache_dir: str) -> None:
+        """Mark the directory as owned by a writer (see WRITING_MARKER)."""
+        with cls._dir_lock:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(os.path.join(cache_dir, WRITING_MARKER), "w") as f:
+                f.write(str(os.getpid()))
+
+    @classmethod
+    def _release(cls, cache_dir: str) -> None:
+        with cls._dir_lock:
+            try:
+                os.remove(os.path.join(cache_dir, WRITING_MARKER))
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _in_progress(cache_dir: str) -> bool:
+        # A marker left by a crashed run stays until a resumed run closes the cache
+        return os.path.isfile(os.path.join(cache_dir, WRITING_MARKER))
+
+    @classmethod
+    def _migrate_pickle(cls, cache_dir: str, key: str) -> Optional[dict]:
+        """Convert a legacy detections.pkl cache to the columnar layout."""
+        pkl_path = os.path.join(cache_dir, "detections.pkl")
+        if not os.path.isfile(pkl_path):
+            return None
+        with open(pkl_path, "rb") as f:
+            frames_data = pickle.load(f)
+
+        old_meta_path = os.path.join(cache_dir, "meta.json")
+        filename = ""
+        if os.path.isfile(old_meta_path):
+            with open(old_meta_path, "r") as f:
+                filename = json.load(f).get("original_filename", "")
+
+        writer = _ColumnarWriter(cache_dir)
+        writer.append(frames_data)
+        meta = cls._write_meta(cache_dir, writer, filename, key)
+        os.remove(pkl_path)
+        print(f"[CACHE] Migrated {len(frames_data)} pickled frames to columnar format in {cache_dir}")
+        return meta
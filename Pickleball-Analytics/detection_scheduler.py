@@ -0,0 +1,184 @@
+"""
+Detection scheduling (frame stride / adaptive inference)
+
+Purpose
+-------
+Players move slowly relative to 30/60 fps, and the ball does not matter while
+Analytics holds the rally inactive after a point.  The scheduler decides per
+frame whether the player and ball models actually run, and fills the skipped
+frames with motion-predicted detections so the tracking pass still sees one
+detection record per frame.
+
+What it does
+------------
+- plan(frame_idx, idle): (run_player, run_ball) for a frame
+    - player model every `player_stride` frames
+    - ball model on every frame during play, every `ball_idle_stride` frames
+      while the rally is held inactive (Analytics._rally_hold_frames > 0)
+- resolve(frame_idx, players, ball): record real detections, or return
+  predictions for a skipped model (pass None)
+    - players: constant-velocity extrapolation of each box from the last two
+      player keyframes (boxes matched by nearest center)
+    - ball: constant-velocity extrapolation while the ball was seen on the last
+      two ball keyframes, otherwise no ball
+- stats(): inferences run/skipped per model
+- analytics_divergence(reference, candidate): how far heatmaps, zone usage,
+  rally history and score of a scheduled run are from a full-rate run
+
+Assumptions
+-----------
+- Frames are resolved strictly in order
+- The idle flag comes from the tracking stage, which may lag detection by up
+  to one batch; the schedule is a throughput knob, not an exact replica
+- Scheduled detections differ from full-rate ones, so they are never written
+  to the detection cache; a cached full-rate run can instead be replayed
+  through the scheduler to measure divergence without decoding
+"""
+
+import numpy as np
+
+# Defaults used when scheduling is enabled without explicit strides
+PLAYER_STRIDE = 3
+BALL_IDLE_STRIDE = 6
+
+
+class DetectionScheduler:
+    def __init__(self, player_stride=PLAYER_STRIDE, ball_idle_stride=BALL_IDLE_STRIDE):
+        self.player_stride = max(int(player_stride or 1), 1)
+        self.ball_idle_stride = max(int(ball_idle_stride or 1), 1)
+        self.reset()
+
+    @property
+    def enabled(self):
+        return self.player_stride > 1 or self.ball_idle_stride > 1
+
+    def reset(self):
+        self._player_keys = []    # last two (frame_idx, boxes, confs) player keyframes
+        self._ball_keys = []      # last two (frame_idx, bbox) ball keyframes with a ball
+        self._ball_seen = False   # ball present on the most recent ball keyframe
+        self._counts = {"player_run": 0, "player_skipped": 0, "ball_run": 0, "ball_skipped": 0}
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+    def plan(self, frame_idx, idle=False):
+        """Return (run_player, run_ball) for this frame."""
+        run_player = frame_idx % self.player_stride == 0
+        run_ball = not idle or frame_idx % self.ball_idle_stride == 0
+        return run_player, run_ball
+
+    def resolve(self, frame_idx, players=None, ball=None):
+        """
+        players: (boxes, confs) if the player model ran on this frame, else None
+        ball: ball dict ({1: bbox} or {}) if the ball model ran, else None
+        Returns ((boxes, confs), ball_dict) for the frame.
+        """
+        if players is None:
+            self._counts["player_skipped"] += 1
+            players = self._predict_players(frame_idx)
+        else:
+            self._counts["player_run"] += 1
+            self._player_keys = (self._player_keys + [(frame_idx, players[0], players[1])])[-2:]
+
+        if ball is None:
+            self._counts["ball_skipped"] += 1
+            ball = self._predict_ball(frame_idx)
+        else:
+            self._counts["ball_run"] += 1
+            self._ball_seen = 1 in ball
+            if self._ball_seen:
+                self._ball_keys = (self._ball_keys + [(frame_idx, ball[1])])[-2:]
+            else:
+                self._ball_keys = []
+        return players, ball
+
+    def stats(self):
+        c = dict(self._counts)
+        total = c["player_run"] + c["player_skipped"] + c["ball_run"] + c["ball_skipped"]
+        skipped = c["player_skipped"] + c["ball_skipped"]
+        c["player_stride"] = self.player_stride
+        c["ball_idle_stride"] = self.ball_idle_stride
+        c["skipped_pct"] = round(100.0 * skipped / total, 1) if total else 0.0
+        return c
+
+    # ------------------------------------------------------------------
+    # Motion prediction
+    # ------------------------------------------------------------------
+    def _predict_players(self, frame_idx):
+        if not self._player_keys:
+            return [], []
+        f1, boxes1, confs1 = self._player_keys[-1]
+        if len(self._player_keys) < 2 or not boxes1:
+            return [list(b) for b in boxes1], list(confs1)
+
+        f0, boxes0, _ = self._player_keys[0]
+        cur = np.asarray(boxes1, dtype=np.float64).reshape(-1, 4)
+        prev = np.asarray(boxes0, dtype=np.float64).reshape(-1, 4)
+        velocity = np.zeros_like(cur)
+        if len(prev):
+            # Greedy nearest-center matching between the two keyframes
+            c_cur = (cur[:, :2] + cur[:, 2:]) / 2
+            c_prev = (prev[:, :2] + prev[:, 2:]) / 2
+            dist = np.linalg.norm(c_cur[:, None, :] - c_prev[None, :, :], axis=2)
+            used = set()
+            for i in np.argsort(dist.min(axis=1)):
+                for j in np.argsort(dist[i]):
+                    if j not in used:
+                        used.add(j)
+                        velocity[i] = (cur[i] - prev[j]) / (f1 - f0)
+                        break
+        pred = cur + velocity * (frame_idx - f1)
+        return pred.tolist(), list(confs1)
+
+    def _predict_ball(self, frame_idx):
+        if not self._ball_seen or len(self._ball_keys) < 2:
+            return {}
+        (f0, b0), (f1, b1) = self._ball_keys
+        b0, b1 = np.asarray(b0, dtype=np.float64), np.asarray(b1, dtype=np.float64)
+        pred = b1 + (b1 - b0) / (f1 - f0) * (frame_idx - f1)
+        return {1: pred.tolist()}
+
+
+def analytics_divergence(reference, candidate):
+    """
+    Compare two finished runs.  reference/candidate: (Analytics, ScoreTracker).
+
+    Heatmap and zone figures are total-variation distances between the
+    normalized distributions (0 = identical, 1 = disjoint).
+    """
+    ref_a, ref_s = reference
+    cand_a, cand_s = candidate
+    out = {}
+
+    for name in ("player_heat_accum", "ball_heat_accum"):
+        a, b = getattr(ref_a, name, None), getattr(cand_a, name, None)
+        if a is None or b is None:
+            continue
+        out[name.replace("_accum", "")] = round(_tv_distance(a, b), 4)
+
+    zones = sorted(set(ref_a.zone_counts) | set(cand_a.zone_counts))
+    out["zone_counts"] = round(_tv_distance(
+        np.array([ref_a.zone_counts.get(z, 0) for z in zones], dtype=np.float64),
+        np.array([cand_a.zone_counts.get(z, 0) for z in zones], dtype=np.float64),
+    ), 4)
+
+    ref_r, cand_r = list(ref_a._rallies), list(cand_a._rallies)
+    n = min(len(ref_r), len(cand_r))
+    out["rallies"] = {
+        "reference": len(ref_r),
+        "candidate": len(cand_r),
+        "mean_abs_diff_frames": round(float(np.mean(np.abs(np.subtract(ref_r[:n], cand_r[:n])))), 2) if n else 0.0,
+    }
+
+    out["score_match"] = ref_s.score == cand_s.score
+    out["score"] = {"reference": dict(ref_s.score), "candidate": dict(cand_s.score)}
+    return out
+
+
+def _tv_distance(a, b):
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    sa, sb = a.sum(), b.sum()
+    if sa <= 0 or sb <= 0:
+        return 0.0 if sa == sb else 1.0
+    return 0.5 * float(np.abs(a / sa - b / sb).sum())
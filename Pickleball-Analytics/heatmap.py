@@ -0,0 +1,235 @@
+"""
+Incremental heatmap rendering
+
+Purpose
+-------
+The heatmap panels used to blur the whole 900×400 accumulator, sort every
+non-zero pixel for the contrast percentiles, gamma-correct with a float pow
+and colormap the result for both panels on every frame, although a frame
+only stamps a few small Gaussians.  HeatLayer keeps the blurred accumulator
+and its value histogram between frames and only redoes the work around the
+stamps.
+
+What it does
+------------
+- DirtyRegions: rectangles touched by Analytics._stamp since they were last
+  collected, plus the accumulator version (stamps so far); collapses to their
+  bounding box past HEATMAP_MAX_DIRTY entries so memory stays bounded when
+  nothing renders (headless runs)
+- HeatLayer: the one place an accumulator becomes an image; every product is
+  keyed by (accumulator version, parameter generation) and built once
+    - colored(accum, dirty, params): full-size colored heatmap
+    - panel(accum, dirty, params, size): colored() resized for the dashboard,
+      refreshed at most every `render_every` calls while stamps keep coming
+    - encoded(accum, dirty, params, ext): (bytes, etag) for the live API
+      (.jpg) and the saved heatmaps (.png)
+- colored() only re-blurs the dirty rectangles grown by the blur radius (with
+  one more radius of context, so the result matches the full-image blur),
+  keeps a log-binned histogram of the non-zero blurred values up to date and
+  reads the contrast percentiles from it (HIST_BINS_PER_OCTAVE bins per
+  doubling, ~2% value resolution) instead of np.percentile, and applies gamma
+  and COLORMAP_JET through one 256-entry color LUT
+- stats: colored renders, reused panels, encodes and re-blurred pixels
+
+Assumptions
+-----------
+- One HeatLayer per accumulator, used by one thread at a time (like
+  render_cache.LayerCache); rectangles are handed over with the snapshot that
+  contains their stamps, so the layer always blurs the accumulator it is given
+- Returned images and bytes are shared with the cache and must not be modified
+- Accumulators only grow by stamping; anything else (a new canvas) gets a new
+  layer
+"""
+
+from typing import NamedTuple, Tuple
+
+import cv2
+import numpy as np
+
+# Default: re-render a changing heatmap panel every Nth frame (1 = every frame)
+HEATMAP_RENDER_EVERY = 3
+# Pending dirty rectangles kept before collapsing them into their bounding box
+HEATMAP_MAX_DIRTY = 64
+# Histogram resolution and range (log2 of the blurred heat values)
+HIST_BINS_PER_OCTAVE = 32
+HIST_MIN_EXP = -24
+HIST_MAX_EXP = 16
+HIST_BINS = (HIST_MAX_EXP - HIST_MIN_EXP) * HIST_BINS_PER_OCTAVE
+
+
+class HeatParams(NamedTuple):
+    blur_kernel: int                         # odd; 1 = no blur
+    clip_percentiles: Tuple[float, float]
+    gamma: float
+
+
+class DirtyRegions:
+    def __init__(self, version=0):
+        self.rects = []          # (y0, y1, x0, x1) in accumulator pixels
+        self.version = version   # stamps recorded so far: the accumulator version
+
+    def add(self, y0, y1, x0, x1):
+        self.version += 1
+        self.rects.append((y0, y1, x0, x1))
+        if len(self.rects) > HEATMAP_MAX_DIRTY:
+            self.rects = [_bounding(self.rects)]
+
+    def take(self):
+        rects, self.rects = self.rects, []
+        return rects
+
+
+class HeatLayer:
+    def __init__(self, name, render_every=HEATMAP_RENDER_EVERY):
+        self.name = name
+        self.render_every = render_every
+        self._blurred = None      # blurred accumulator, float32
+        self._kernel = None       # blur kernel size _blurred was made with
+        self._hist = None         # counts of non-zero _blurred values per log bin
+        self._pending = []        # dirty rects not yet re-blurred
+        self._colored = None      # (key, full-size BGR image)
+        self._encoded = {}        # ext -> (key, bytes, etag)
+        self._panel = None        # (key, resized panel)
+        self._params = None       # HeatParams of the products, and how often they changed
+        self._generation = 0
+        self._since_render = 0
+        self._luts = {}           # gamma -> (256, 1, 3) color LUT
+        self.stats = {"renders": 0, "reused": 0, "encodes": 0, "blurred_px": 0}
+
+    # ------------------------------------------------------------------
+    # Products
+    # ------------------------------------------------------------------
+    def colored(self, accum, dirty, params):
+        """Full-size colored heatmap of the accumulator's current version."""
+        key = self._key(dirty, params)
+        if self._colored is None or self._colored[0] != key:
+            self._update_blur(accum, params.blur_kernel)
+            heat8 = self._normalize(params.clip_percentiles)
+            self._colored = (key, cv2.applyColorMap(heat8, self._color_lut(params.gamma)))
+            self.stats["renders"] += 1
+        return self._colored[1]
+
+    def panel(self, accum, dirty, params, size):
+        """
+        colored() resized to size=(w, h), refreshed at most every `render_every`
+        calls while the accumulator keeps changing.  Must not be drawn on.
+        """
+        self._since_render += 1
+        size = tuple(size)
+        if self._panel is not None:
+            (version, gen), panel_size = self._panel[0]
+            fresh = self._key(dirty, params) == (version, gen)
+            if panel_size == size and (fresh or (gen == self._generation and self._since_render
+                                                 < max(int(self.render_every or 1), 1))):
+                self.stats["reused"] += 1
+                return self._panel[1]
+
+        color = self.colored(accum, dirty, params)
+        self._panel = ((self._colored[0], size), cv2.resize(color, size, interpolation=cv2.INTER_LINEAR))
+        self._since_render = 0
+        return self._panel[1]
+
+    def encoded(self, accum, dirty, params, ext=".jpg"):
+        """(bytes, etag) of colored() encoded as `ext`; re-encoded only when the version changes."""
+        key = self._key(dirty, params)
+        cached = self._encoded.get(ext)
+        if cached is None or cached[0] != key:
+            ok, buf = cv2.imencode(ext, self.colored(accum, dirty, params))
+            if not ok:
+                return None, None
+            version, gen = key
+            cached = (key, buf.tobytes(), f'"{self.name}-{gen}.{version}{ext}"')
+            self._encoded[ext] = cached
+            self.stats["encodes"] += 1
+        return cached[1], cached[2]
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _key(self, dirty, params):
+        """(accumulator version, parameter generation); collects the dirty rects."""
+        self._pending.extend(dirty.take())
+        if len(self._pending) > HEATMAP_MAX_DIRTY:
+            self._pending = [_bounding(self._pending)]
+        if params != self._params:
+            self._params = params
+            self._generation += 1
+        return dirty.version, self._generation
+
+    def _update_blur(self, accum, k):
+        if self._blurred is None or self._blurred.shape != accum.shape or self._kernel != k:
+            self._blurred = cv2.GaussianBlur(accum, (k, k), 0) if k > 1 else accum.copy()
+            self._kernel = k
+            self._hist = _histogram(self._blurred)
+            self._pending = []
+            self.stats["blurred_px"] += accum.size
+            return
+
+        h, w = accum.shape
+        r = k // 2 if k > 1 else 0
+        for y0, y1, x0, x1 in self._pending:
+            # Pixels whose blur sees the stamp, and the input those pixels read
+            oy0, oy1, ox0, ox1 = max(y0 - r, 0), min(y1 + r, h), max(x0 - r, 0), min(x1 + r, w)
+            iy0, iy1, ix0, ix1 = max(oy0 - r, 0), min(oy1 + r, h), max(ox0 - r, 0), min(ox1 + r, w)
+            src = accum[iy0:iy1, ix0:ix1]
+            region = cv2.GaussianBlur(src, (k, k), 0) if k > 1 else src
+            region = region[oy0 - iy0:oy1 - iy0, ox0 - ix0:ox1 - ix0]
+
+            old = self._blurred[oy0:oy1, ox0:ox1]
+            self._hist -= _histogram(old)
+            self._hist += _histogram(region)
+            old[...] = region
+            self.stats["blurred_px"] += region.size
+        self._pending = []
+
+    def _normalize(self, clip_percentiles):
+        n = int(self._hist.sum())
+        if n == 0:
+            return np.zeros(self._blurred.shape, dtype=np.uint8)
+        lo_p, hi_p = clip_percentiles
+        lo, hi = _hist_percentile(self._hist, n, lo_p), _hist_percentile(self._hist, n, hi_p)
+        if hi <= lo:
+            nonempty = np.flatnonzero(self._hist)
+            lo, hi = _bin_value(nonempty[0]), _bin_value(nonempty[-1] + 1)
+        scale = 255.0 / max(hi - lo, 1e-6)
+        return cv2.convertScaleAbs(np.maximum(self._blurred, np.float32(lo)), alpha=scale, beta=-lo * scale)
+
+    def _color_lut(self, gamma):
+        lut = self._luts.get(gamma)
+        if lut is None:
+            levels = np.arange(256, dtype=np.uint8)
+            if gamma and gamma != 1.0:
+                f = (levels.astype(np.float32) / 255.0) ** (1.0 / gamma)
+                levels = np.clip(f * 255.0, 0, 255).astype(np.uint8)
+            lut = cv2.applyColorMap(levels.reshape(256, 1), cv2.COLORMAP_JET)
+            self._luts[gamma] = lut
+        return lut
+
+
+def _bounding(rects):
+    y0s, y1s, x0s, x1s = zip(*rects)
+    return min(y0s), max(y1s), min(x0s), max(x1s)
+
+
+def _histogram(values):
+    nz = values[values > 0]
+    if nz.size == 0:
+        return np.zeros(HIST_BINS, dtype=np.int64)
+    bins = np.floor((np.log2(nz) - HIST_MIN_EXP) * HIST_BINS_PER_OCTAVE).astype(np.int64)
+    return np.bincount(np.clip(bins, 0, HIST_BINS - 1), minlength=HIST_BINS)
+
+
+def _bin_value(pos):
+    """Heat value at a (fractional) bin position."""
+    return float(2.0 ** (HIST_MIN_EXP + pos / HIST_BINS_PER_OCTAVE))
+
+
+def _hist_percentile(hist, n, p):
+    """np.percentile-style (linear rank) percentile, interpolated inside the bin."""
+    rank = p / 100.0 * (n - 1)
+    cum = np.cumsum(hist)
+    b = int(np.searchsorted(cum, rank, side="right"))
+    b = min(b, HIST_BINS - 1)
+    before = cum[b] - hist[b]
+    frac = (rank - before) / hist[b] if hist[b] else 0.0
+    return _bin_value(b + frac)
@@ -0,0 +1,173 @@
+"""
+Inference backends (exported CPU runtimes with a PyTorch fallback)
+
+Purpose
+-------
+On CPU-only hosts, PyTorch eager inference through ultralytics.YOLO is most
+of the per-frame time of the ball, player and court models.  InferenceBackend
+exports each .pt model once to a CPU-optimized runtime (ONNX Runtime or
+OpenVINO), caches the artifact under models/exported/, and loads it through
+ultralytics, so the trackers keep calling model.predict() unchanged.  When
+the runtime or the export is unavailable it falls back to the .pt model.
+
+What it does
+------------
+- InferenceBackend(kind, threads, imgsz): kind is "torch" (the .pt model as
+  before), "onnx" or "openvino"; defaults from PICKLEBALL_INFERENCE_BACKEND /
+  _THREADS / _IMGSZ (no size unless _IMGSZ is set)
+- load(name, pt_path): YOLO model for the backend; the export (dynamic input
+  shape, so ROI crops at other sizes still work) happens the first time and
+  is reused while the .pt file is unchanged (sidecar <artifact>.json records
+  its mtime, task and export time); any failure loads the .pt model instead
+  and is logged once per model
+- imgsz: default inference size of every predict call when configured (a
+  call passing imgsz, like the ROI ball search, still wins); None keeps each
+  checkpoint's own trained size
+- configure(model): after the model's first inference, applies `threads` to
+  its runtime (torch.set_num_threads, a new ONNX Runtime session or a
+  recompiled OpenVINO model); returns True if the runtime was replaced
+- describe(): kind, threads, imgsz and the backend each model actually uses
+
+Assumptions
+-----------
+- ultralytics' export and AutoBackend are available (the registry only builds
+  backends when it loads models); onnxruntime / openvino are optional
+- Exported models are loaded through ultralytics, so results have the same
+  structure as the PyTorch path; numbers differ slightly (benchmark.py
+  backends measures the parity)
+- Thread settings on ONNX Runtime / OpenVINO rebuild the runtime object
+  ultralytics created; on versions that name it differently the runtime
+  default is kept and a note is printed
+"""
+
+import json
+import os
+import shutil
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Exported artifacts, next to the .pt weights
+EXPORT_DIR = os.path.join(PROJECT_DIR, "models", "exported")
+
+BACKENDS = ("torch", "onnx", "openvino")
+# Defaults: runtime, intra-op threads (0 = runtime default) and inference size
+# (None = each checkpoint keeps its trained size)
+INFERENCE_BACKEND = os.environ.get("PICKLEBALL_INFERENCE_BACKEND", "torch")
+INFERENCE_THREADS = int(os.environ.get("PICKLEBALL_INFERENCE_THREADS", "0"))
+INFERENCE_IMGSZ = int(os.environ["PICKLEBALL_INFERENCE_IMGSZ"]) if os.environ.get("PICKLEBALL_INFERENCE_IMGSZ") else None
+
+# Artifact name suffix written by ultralytics' export per format
+_SUFFIX = {"onnx": ".onnx", "openvino": "_openvino_model"}
+
+
+class InferenceBackend:
+    def __init__(self, kind=INFERENCE_BACKEND, threads=INFERENCE_THREADS, imgsz=INFERENCE_IMGSZ,
+                 export_dir=EXPORT_DIR):
+        if kind not in BACKENDS:
+            raise ValueError(f"Unknown inference backend {kind!r} (expected one of {', '.join(BACKENDS)})")
+        self.kind = kind
+        self.threads = max(int(threads or 0), 0)
+        self.imgsz = int(imgsz) if imgsz else None
+        self.export_dir = export_dir
+        self.used = {}        # model name -> backend it actually runs on
+        self.export_s = 0.0   # time spent exporting in this process
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    def load(self, name, pt_path):
+        from ultralytics import YOLO
+
+        model = None
+        if self.kind != "torch":
+            try:
+                artifact, task = self._artifact(pt_path)
+                model = YOLO(artifact, task=task)
+                model.overrides["model"] = artifact  # configure() rebuilds the runtime from it
+                self.used[name] = self.kind
+            except Exception as e:
+                print(f"[BACKEND] {name}: {self.kind} unavailable ({e}); using PyTorch")
+        if model is None:
+            model = YOLO(pt_path)
+            self.used[name] = "torch"
+        if self.imgsz:
+            # Only an explicit size replaces the checkpoint's trained one
+            model.overrides["imgsz"] = self.imgsz
+        return model
+
+    def _artifact(self, pt_path):
+        """(path, task) of the exported model, exporting it if missing or older than the .pt file."""
+        stem = os.path.splitext(os.path.basename(pt_path))[0]
+        target = os.path.join(self.export_dir, f"{stem}-{self.imgsz or 'default'}{_SUFFIX[self.kind]}")
+        meta_path = target + ".json"
+        source_mtime = os.path.getmtime(pt_path)
+        if os.path.exists(target) and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get("source_mtime") == source_mtime:
+                return target, meta["task"]
+
+        from ultralytics import YOLO
+
+        t0 = time.perf_counter()
+        source = YOLO(pt_path)
+        kwargs = {"imgsz": self.imgsz} if self.imgsz else {}
+        exported = source.export(format=self.kind, dynamic=True, **kwargs)
+        elapsed = time.perf_counter() - t0
+        self.export_s += elapsed
+
+        os.makedirs(self.export_dir, exist_ok=True)
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        elif os.path.exists(target):
+            os.remove(target)
+        shutil.move(str(exported), target)
+        with open(meta_path, "w") as f:
+            json.dump({"task": source.task, "format": self.kind, "imgsz": self.imgsz,
+                       "source_mtime": source_mtime, "export_s": round(elapsed, 3)}, f)
+        print(f"[BACKEND] exported {stem} to {self.kind} in {elapsed:.1f}s -> {target}")
+        return target, source.task
+
+    # ------------------------------------------------------------------
+    # Runtime settings
+    # ------------------------------------------------------------------
+    def configure(self, model):
+        if not self.threads:
+            return False
+        runtime = getattr(getattr(model, "predictor", None), "model", None)
+        if runtime is None:
+            print("[BACKEND] model has not run yet; threads not applied")
+            return False
+        if getattr(runtime, "pt", False):
+            import torch
+
+            torch.set_num_threads(self.threads)
+            return False
+        try:
+            if hasattr(runtime, "session"):
+                import onnxruntime as ort
+
+                opts = ort.SessionOptions()
+                opts.intra_op_num_threads = self.threads
+                opts.inter_op_num_threads = 1
+                runtime.session = ort.InferenceSession(model.overrides["model"], opts,
+                                                       providers=runtime.session.get_providers())
+                return True
+            if hasattr(runtime, "ov_compiled_model"):
+                import openvino as ov
+
+                core = ov.Core()
+                folder = model.overrides["model"]
+                xml = next(p for p in os.listdir(folder) if p.endswith(".xml"))
+                ov_model = core.read_model(os.path.join(folder, xml))
+                runtime.ov_compiled_model = core.compile_model(
+                    ov_model, "CPU", {"INFERENCE_NUM_THREADS": self.threads, "PERFORMANCE_HINT": "LATENCY"})
+                return True
+        except Exception as e:
+            print(f"[BACKEND] could not set {self.threads} threads on {self.kind}: {e}")
+            return False
+        print(f"[BACKEND] {self.kind} runtime not recognized; keeping its default threads")
+        return False
+
+    def describe(self):
+        return {"backend": self.kind, "threads": self.threads, "imgsz": self.imgsz, "models": dict(self.used)}
@@ -0,0 +1,167 @@
+"""
+Job scheduler (bounded worker pool with a priority queue)
+
+Purpose
+-------
+The API started a new thread with a fresh VideoProcessor, and so three freshly
+loaded YOLO models, for every upload: ten uploads meant ten jobs fighting over
+the same CPU/GPU and ten copies of the weights.  JobScheduler runs jobs on a
+fixed number of worker threads and queues the rest; each worker thread keeps
+its set of models from one job to the next (bound to the thread by
+model_registry.py).
+
+What it does
+------------
+- JobScheduler(run_job, workers): starts `workers` threads; each calls
+  run_job(job_id, *args, cancelled=event) for one job at a time, where `event`
+  is set when the job is cancelled; models are not passed in, run_job gets the
+  thread's set from model_registry.registry
+- submit(job_id, *args, priority=0): queue a job; higher priority first, FIFO
+  within a priority; returns its queue position
+- position(job_id): 1-based position among queued jobs, None once it started
+- cancel(job_id): "queued" if the job was removed from the queue (it never
+  runs), "running" if it is running (its cancel event is set; run_job decides
+  where to stop), None if the scheduler does not know it
+- stats(): workers, queued / running jobs and counters, mean wait and run time
+- shutdown(wait): stop taking jobs; queued jobs are dropped, running ones end
+
+Assumptions
+-----------
+- run_job handles its own errors and status updates; an exception escaping it
+  is only logged, the worker carries on
+- Cancelled queued jobs are removed lazily from the heap (skipped when popped)
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+
+# Jobs processed at the same time (each worker holds its own set of models)
+JOB_WORKERS = max(int(os.environ.get("PICKLEBALL_JOB_WORKERS", "1")), 1)
+
+
+class JobScheduler:
+    def __init__(self, run_job, workers=JOB_WORKERS, name="job-worker"):
+        self._run_job = run_job
+        self.workers = max(int(workers or 1), 1)
+        self._cond = threading.Condition()
+        self._heap = []               # (-priority, seq, job_id)
+        self._seq = itertools.count()
+        self._queued = {}             # job_id -> (args, submitted_at)
+        self._running = {}            # job_id -> cancel event
+        self._closed = False
+        self._counts = {"submitted": 0, "completed": 0, "cancelled": 0, "errors": 0}
+        self._wait_s = 0.0
+        self._run_s = 0.0
+
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"{name}-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    # ------------------------------------------------------------------
+    # Queue
+    # ------------------------------------------------------------------
+    def submit(self, job_id, *args, priority=0):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("JobScheduler is shut down")
+            if job_id in self._queued or job_id in self._running:
+                raise ValueError(f"Job already scheduled: {job_id}")
+            self._queued[job_id] = (args, time.perf_counter())
+            heapq.heappush(self._heap, (-priority, next(self._seq), job_id))
+            self._counts["submitted"] += 1
+            self._cond.notify()
+            return self._position(job_id)
+
+    def position(self, job_id):
+        with self._cond:
+            return self._position(job_id)
+
+    def cancel(self, job_id):
+        with self._cond:
+            if self._queued.pop(job_id, None) is not None:
+                self._counts["cancelled"] += 1
+                return "queued"
+            event = self._running.get(job_id)
+            if event is not None:
+                if not event.is_set():
+                    event.set()
+                    self._counts["cancelled"] += 1
+                return "running"
+            return None
+
+    def shutdown(self, wait=True):
+        with self._cond:
+            self._closed = True
+            self._counts["cancelled"] += len(self._queued)
+            self._queued.clear()
+            self._heap.clear()
+            for event in self._running.values():
+                event.set()
+            self._cond.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join()
+
+    def stats(self):
+        with self._cond:
+            done = self._counts["completed"]
+            started = done + len(self._running)
+            return dict(
+                self._counts,
+                workers=self.workers,
+                queued=len(self._queued),
+                running=len(self._running),
+                mean_wait_s=round(self._wait_s / started, 3) if started else 0.0,
+                mean_run_s=round(self._run_s / done, 3) if done else 0.0,
+            )
+
+    def _position(self, job_id):
+        if job_id not in self._queued:
+            return None
+        mine = next(entry for entry in self._heap if entry[2] == job_id)
+        return 1 + sum(1 for entry in self._heap if entry < mine and entry[2] in self._queued)
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+    def _next_job(self):
+        with self._cond:
+            while True:
+                while self._heap:
+                    _, _, job_id = heapq.heappop(self._heap)
+                    item = self._queued.pop(job_id, None)
+                    if item is None:
+                        continue  # cancelled while queued
+                    args, submitted_at = item
+                    event = threading.Event()
+                    self._running[job_id] = event
+                    self._wait_s += time.perf_counter() - submitted_at
+                    return job_id, args, event
+                if self._closed:
+                    return None
+                self._cond.wait()
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            job_id, args, event = job
+            t0 = time.perf_counter()
+            try:
+                self._run_job(job_id, *args, cancelled=event)
+            except Exception as e:
+                with self._cond:
+                    self._counts["errors"] += 1
+                print(f"[JOBS] {job_id} raised: {e}")
+            finally:
+                with self._cond:
+                    self._running.pop(job_id, None)
+                    self._counts["completed"] += 1
+                    self._run_s += time.perf_counter() - t0
@@ -0,0 +1,284 @@
+"""
+Job store (SQLite-backed status, bounded in-memory blobs)
+
+Purpose
+-------
+The API kept every job in a plain dict: status, the full live stats and both
+heatmap blobs, forever, and lost all of it on restart.  JobStore keeps the
+small durable part of a job (status, progress, result, error, metrics, cache
+key, final stats) in SQLite, and the large hot part (latest live stats,
+encoded heatmaps) in memory under an LRU + TTL budget, so the process stays
+flat however many jobs it has seen.
+
+What it does
+------------
+- create(job_id, **fields) / update(job_id, **fields): durable fields; writes
+  go straight to SQLite, except progress-only updates, which are written at
+  most every JOB_PROGRESS_FLUSH_S seconds
+- get(job_id): the job as a dict (durable fields + live stats if still hot),
+  or None; `job_id in store`
+- set_live(job_id, latest_stats=...): hot per-frame state of a running job;
+  finish(job_id) persists the final stats and lets the hot copy age out
+- put_blob(job_id, name, data, etag) / get_blob(job_id, name) -> (data, etag):
+  BlobCache, evicting least recently used blobs past `max_bytes` and blobs
+  older than `ttl_s` (all of them, whatever their LRU position; the age
+  counts from put, so a second dict in put order finds them from its head)
+- memory_usage(job_id): bytes held in memory for the job (blobs + live stats)
+- stats(): jobs in memory, blob bytes / count / evictions
+- jobs still "processing" when the store is opened were interrupted by a
+  restart and are marked failed
+
+Assumptions
+-----------
+- One API process owns the database file; calls may come from the event loop
+  and from worker threads, so every method takes the store lock
+- Durable fields are JSON-serializable; blobs are bytes
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Default database file, next to the uploads
+JOB_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads", "jobs.sqlite3")
+# In-memory budget for encoded blobs (heatmaps) and their maximum age
+BLOB_CACHE_BYTES = 64 * 1024 * 1024
+BLOB_TTL_S = 30 * 60
+# Finished jobs whose live stats stay in memory (running jobs always do)
+LIVE_FINISHED_JOBS = 32
+# Minimum seconds between progress writes to the database
+JOB_PROGRESS_FLUSH_S = 2.0
+
+# Durable columns besides job_id; JSON-encoded ones marked True
+_FIELDS = {
+    "status": False, "progress": False, "error": False, "video_path": False,
+    "cache_key": True, "result": True, "metrics": True, "final_stats": True,
+    "created_at": False, "updated_at": False,
+}
+
+
+class BlobCache:
+    def __init__(self, max_bytes=BLOB_CACHE_BYTES, ttl_s=BLOB_TTL_S):
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._items = OrderedDict()   # (job_id, name) -> (data, etag, stored_at), LRU order
+        self._stored = OrderedDict()  # same keys -> stored_at, oldest first (expiry order)
+        self._bytes = 0
+        self.evictions = 0
+
+    def put(self, job_id, name, data, etag=None):
+        key = (job_id, name)
+        self._discard(key)
+        if data is None:
+            return
+        stored_at = time.monotonic()
+        self._items[key] = (data, etag, stored_at)
+        self._stored[key] = stored_at
+        self._bytes += len(data)
+        self._evict()
+
+    def get(self, job_id, name):
+        key = (job_id, name)
+        item = self._items.get(key)
+        if item is None:
+            return None, None
+        if self.ttl_s and time.monotonic() - item[2] > self.ttl_s:
+            self._discard(key)
+            self.evictions += 1
+            return None, None
+        self._items.move_to_end(key)
+        return item[0], item[1]
+
+    def drop_job(self, job_id):
+        for key in [k for k in self._items if k[0] == job_id]:
+            self._discard(key)
+
+    def usage(self, job_id):
+        self._expire()
+        return sum(len(item[0]) for key, item in self._items.items() if key[0] == job_id)
+
+    def _discard(self, key):
+        item = self._items.pop(key, None)
+        self._stored.pop(key, None)
+        if item is not None:
+            self._bytes -= len(item[0])
+
+    def _expire(self):
+        if not self.ttl_s:
+            return
+        now = time.monotonic()
+        while self._stored:
+            key, stored_at = next(iter(self._stored.items()))
+            if now - stored_at <= self.ttl_s:
+                break
+            self._discard(key)
+            self.evictions += 1
+
+    def _evict(self):
+        self._expire()
+        while self._items and self._bytes > self.max_bytes:
+            self._discard(next(iter(self._items)))
+            self.evictions += 1
+
+    def stats(self):
+        self._expire()
+        return {"blobs": len(self._items), "blob_bytes": self._bytes, "blob_evictions": self.evictions}
+
+
+class JobStore:
+    def __init__(self, path=JOB_DB_PATH, blob_bytes=BLOB_CACHE_BYTES, blob_ttl_s=BLOB_TTL_S):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, "
+            + ", ".join(f"{name} TEXT" for name in _FIELDS) + ")"
+        )
+        self._db.execute(
+            "UPDATE jobs SET status = 'failed', error = 'interrupted by a server restart' "
+            "WHERE status IN ('queued', 'processing')"
+        )
+        self._db.commit()
+
+        self._rows = {}               # job_id -> durable fields of jobs touched since start (small)
+        self._live = OrderedDict()    # job_id -> latest live stats
+        self._finished = OrderedDict()  # finished job ids whose live stats are still in memory
+        self._flushed_at = {}         # job_id -> time of the last progress write
+        self.blobs = BlobCache(blob_bytes, blob_ttl_s)
+
+    # ------------------------------------------------------------------
+    # Durable fields
+    # ------------------------------------------------------------------
+    def create(self, job_id, **fields):
+        now = time.time()
+        row = {name: None for name in _FIELDS}
+        row.update(fields, created_at=now, updated_at=now)
+        with self._lock:
+            self._rows[job_id] = row
+            self._write(job_id, row, insert=True)
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            row = self._row(job_id)
+            if row is None:
+                raise KeyError(job_id)
+            row.update(fields)
+            now = time.time()
+            if set(fields) == {"progress"} and now - self._flushed_at.get(job_id, 0.0) < JOB_PROGRESS_FLUSH_S:
+                return
+            row["updated_at"] = now
+            self._write(job_id, row)
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._row(job_id)
+            if row is None:
+                return None
+            job = dict(row, job_id=job_id)
+            job["latest_stats"] = self._live.get(job_id, job.pop("final_stats"))
+            return job
+
+    def __contains__(self, job_id):
+        with self._lock:
+            return self._row(job_id) is not None
+
+    def finish(self, job_id):
+        """Persist the final live stats; the in-memory copy then ages out with other finished jobs."""
+        with self._lock:
+            if job_id in self._live:
+                self.update(job_id, final_stats=self._live[job_id])
+            self._finished[job_id] = True
+            while len(self._finished) > LIVE_FINISHED_JOBS:
+                old, _ = self._finished.popitem(last=False)
+                self._live.pop(old, None)
+                self._rows.pop(old, None)
+                self._flushed_at.pop(old, None)
+
+    # ------------------------------------------------------------------
+    # Hot state
+    # ------------------------------------------------------------------
+    def set_live(self, job_id, latest_stats):
+        with self._lock:
+            self._live[job_id] = latest_stats
+
+    def put_blob(self, job_id, name, data, etag=None):
+        with self._lock:
+            self.blobs.put(job_id, name, data, etag)
+
+    def get_blob(self, job_id, name):
+        with self._lock:
+            return self.blobs.get(job_id, name)
+
+    def memory_usage(self, job_id):
+        with self._lock:
+            live = self._live.get(job_id)
+            return self.blobs.usage(job_id) + (_approx_size(live) if live is not None else 0)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.blobs.stats(), jobs_in_memory=len(self._rows), live_jobs=len(self._live))
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _row(self, job_id):
+        row = self._rows.get(job_id)
+        if row is None:
+            cur = self._db.execute(f"SELECT {', '.join(_FIELDS)} FROM jobs WHERE job_id = ?", (job_id,))
+            found = cur.fetchone()
+            if found is None:
+                return None
+            row = {name: _decode(value, _FIELDS[name], name) for name, value in zip(_FIELDS, found)}
+        return row
+
+    def _write(self, job_id, row, insert=False):
+        values = [_encode(row.get(name), _FIELDS[name]) for name in _FIELDS]
+        if insert:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO jobs (job_id, {', '.join(_FIELDS)}) VALUES (?{', ?' * len(_FIELDS)})",
+                [job_id] + values,
+            )
+        else:
+            self._db.execute(
+                f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in _FIELDS)} WHERE job_id = ?",
+                values + [job_id],
+            )
+        self._db.commit()
+        self._flushed_at[job_id] = time.time()
+
+
+def _encode(value, is_json):
+    if value is None:
+        return None
+    return json.dumps(value, default=_json_default) if is_json else str(value)
+
+
+def _json_default(obj):
+    # numpy scalars/arrays in metrics and stats
+    return obj.tolist() if hasattr(obj, "tolist") else str(obj)
+
+
+def _decode(value, is_json, name):
+    if value is None:
+        return None
+    if is_json:
+        return json.loads(value)
+    if name in ("progress", "created_at", "updated_at"):
+        return float(value)
+    return value
+
+
+def _approx_size(obj):
+    """Rough deep size in bytes of a JSON-like object."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_approx_size(k) + _approx_size(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_approx_size(v) for v in obj)
+    return size
@@ -0,0 +1,97 @@
+"""
+Shared inference-size resize (letterbox reuse)
+
+Purpose
+-------
+Every detector used to receive the full decoded frame and let ultralytics
+letterbox it to its own default size, so each frame was resized once per
+model even when two models ran at the same size.  With per-model input sizes
+(BallTracker / PlayerTracker / CourtDetector `imgsz`), the frame is resized
+once per distinct size here and every model of that size gets the same
+image; detections are scaled back to frame pixels by the tracker.
+
+What it does
+------------
+- fit_size(w, h, imgsz): (w, h) with the long side at imgsz, aspect kept,
+  rounded like ultralytics' LetterBox, so ultralytics only pads the image we
+  hand it (no second resize)
+- resize_for(frame, imgsz) -> (image, (sx, sy)): one resized frame and the
+  factors mapping its pixels back to the frame
+- FrameViews(frames): resized copies of a batch, made on first request per
+  (frame, size) and reused by later models
+    - resized(imgsz, idx=None) -> (images, scales) for all frames or the
+      positions in idx
+    - view(i): the same for one frame (FrameView.resized(imgsz))
+    - subset(idx): views of some of the frames sharing the same copies (for
+      models that skip frames, see detection_scheduler.py)
+    - stats: resizes done and reuses
+- scale_box(box, scale): [x1, y1, x2, y2] from resized to frame pixels
+
+Assumptions
+-----------
+- Frames are not modified while their views are in use
+- Padding to the model stride is left to ultralytics (cheap compared with the
+  resize); scale factors are per axis, so rounding of the resized size does
+  not bias the mapped-back coordinates
+"""
+
+import cv2
+
+
+def fit_size(w, h, imgsz):
+    r = imgsz / max(w, h)
+    return max(int(round(w * r)), 1), max(int(round(h * r)), 1)
+
+
+def resize_for(frame, imgsz):
+    h, w = frame.shape[:2]
+    nw, nh = fit_size(w, h, imgsz)
+    if (nw, nh) == (w, h):
+        return frame, (1.0, 1.0)
+    return cv2.resize(frame, (nw, nh), interpolation=cv2.INTER_LINEAR), (w / nw, h / nh)
+
+
+class FrameViews:
+    def __init__(self, frames, _shared=None):
+        self.frames = list(frames)
+        # (imgsz, id(frame)) -> (image, (sx, sy)); ids are stable while self.frames holds the frames
+        self._cache, self.stats = _shared or ({}, {"resizes": 0, "reused": 0})
+
+    def resized(self, imgsz, idx=None):
+        images, scales = [], []
+        for i in range(len(self.frames)) if idx is None else idx:
+            image, scale = self._get(imgsz, i)
+            images.append(image)
+            scales.append(scale)
+        return images, scales
+
+    def view(self, i):
+        return FrameView(self, i)
+
+    def subset(self, idx):
+        return FrameViews([self.frames[i] for i in idx], _shared=(self._cache, self.stats))
+
+    def _get(self, imgsz, i):
+        key = (imgsz, id(self.frames[i]))
+        item = self._cache.get(key)
+        if item is None:
+            item = self._cache[key] = resize_for(self.frames[i], imgsz)
+            self.stats["resizes"] += 1
+        else:
+            self.stats["reused"] += 1
+        return item
+
+
+class FrameView:
+    def __init__(self, views, i):
+        self._views = views
+        self._i = i
+
+    def resized(self, imgsz):
+        return self._views._get(imgsz, self._i)
+
+
+def scale_box(box, scale):
+    sx, sy = scale
+    x1, y1, x2, y2 = box
+    return [x1 * sx, y1 * sy, x2 * sx, y2 * sy]
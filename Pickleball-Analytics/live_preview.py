@@ -0,0 +1,186 @@
+"""
+Live preview encoder
+
+Purpose
+-------
+The API used to JPEG-encode every processed frame on the processing thread,
+whether or not anybody was watching /api/stream.  LivePreview moves encoding
+to its own thread, encodes only while viewers are subscribed, caps the
+preview at PREVIEW_FPS / PREVIEW_MAX_WIDTH, and hands the same encoded
+buffer to every viewer.
+
+What it does
+------------
+- publish(frame): called by the processing loop for every frame; with no
+  viewers it returns at once, otherwise it replaces the pending frame (older
+  unencoded frames are dropped) and wakes the encoder
+- encoder thread: downscales the newest pending frame to at most `max_width`,
+  encodes it as JPEG and publishes it as (seq, bytes); at most `fps` encodes
+  per second of wall time
+- subscribe() / unsubscribe() (or `with preview.viewer():`): viewer count that
+  drives the encoder
+- latest() -> (seq, bytes or None); wait_for(seq, timeout): block until a
+  frame newer than `seq` is encoded
+- add_listener(callback): callback(seq, bytes) on the encoder thread for each
+  encoded frame, and callback(seq, None) once on close (e.g. the async
+  FrameBroadcaster behind /api/stream, see stream_broadcast.py)
+- stats(): viewers, frames published / encoded / skipped (no viewers) /
+  dropped (superseded), and encode time per frame
+- close(): stop the encoder thread and wake all waiters
+
+Assumptions
+-----------
+- Published frames are not modified afterwards (process_video_stream yields a
+  fresh image per frame), so publish() keeps a reference instead of a copy
+- One LivePreview per job; it lives as long as the job, viewers come and go
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+# Preview defaults: encodes per second, max width (px, keeps aspect) and JPEG quality
+PREVIEW_FPS = 15
+PREVIEW_MAX_WIDTH = 960
+PREVIEW_JPEG_QUALITY = 80
+
+
+class LivePreview:
+    def __init__(self, fps=PREVIEW_FPS, max_width=PREVIEW_MAX_WIDTH, quality=PREVIEW_JPEG_QUALITY):
+        self.fps = fps
+        self.max_width = max_width
+        self.quality = quality
+
+        self._cond = threading.Condition()
+        self._viewers = 0
+        self._pending = None      # newest frame not yet encoded
+        self._seq = 0             # number of the latest encoded frame
+        self._jpeg = None
+        self._closed = False
+        self._counts = {"published": 0, "encoded": 0, "skipped_no_viewers": 0, "dropped": 0}
+        self._encode_s = 0.0
+        self._last_encode_ms = 0.0
+        self._listeners = []
+
+        self._thread = threading.Thread(target=self._run, name="live-preview", daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+    def publish(self, frame):
+        with self._cond:
+            self._counts["published"] += 1
+            if self._viewers == 0 or self._closed:
+                self._counts["skipped_no_viewers"] += 1
+                return
+            if self._pending is not None:
+                self._counts["dropped"] += 1
+            self._pending = frame
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._pending = None
+            self._cond.notify_all()
+        self._thread.join(timeout=1.0)
+        for callback in list(self._listeners):
+            callback(self._seq, None)
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    # ------------------------------------------------------------------
+    # Viewer side
+    # ------------------------------------------------------------------
+    def subscribe(self):
+        with self._cond:
+            self._viewers += 1
+
+    def unsubscribe(self):
+        with self._cond:
+            self._viewers = max(self._viewers - 1, 0)
+            if self._viewers == 0:
+                self._pending = None
+
+    @contextmanager
+    def viewer(self):
+        self.subscribe()
+        try:
+            yield self
+        finally:
+            self.unsubscribe()
+
+    def latest(self):
+        with self._cond:
+            return self._seq, self._jpeg
+
+    def wait_for(self, seq, timeout=None):
+        """(seq, bytes) of the first frame newer than `seq`, or the current one on timeout/close."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > seq or self._closed, timeout)
+            return self._seq, self._jpeg
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def stats(self):
+        with self._cond:
+            s = dict(self._counts)
+            s["viewers"] = self._viewers
+            s["fps_cap"] = self.fps
+            s["max_width"] = self.max_width
+            s["encode_ms_per_frame"] = round(self._encode_s * 1000 / s["encoded"], 2) if s["encoded"] else 0.0
+            s["last_encode_ms"] = round(self._last_encode_ms, 2)
+            return s
+
+    # ------------------------------------------------------------------
+    # Encoder thread
+    # ------------------------------------------------------------------
+    def _run(self):
+        next_slot = 0.0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or self._closed)
+                if self._closed:
+                    return
+            # Respect the preview fps; frames published meanwhile replace the pending one
+            delay = next_slot - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            with self._cond:
+                frame, self._pending = self._pending, None
+            if frame is None:
+                continue
+
+            t0 = time.perf_counter()
+            jpeg = self._encode(frame)
+            elapsed = time.perf_counter() - t0
+            next_slot = t0 + 1.0 / max(self.fps or 1, 1)
+
+            with self._cond:
+                if jpeg is not None:
+                    self._seq += 1
+                    self._jpeg = jpeg
+                    self._counts["encoded"] += 1
+                    self._encode_s += elapsed
+                    self._last_encode_ms = elapsed * 1000
+                self._cond.notify_all()
+                seq = self._seq
+            if jpeg is not None:
+                for callback in list(self._listeners):
+                    callback(seq, jpeg)
+
+    def _encode(self, frame):
+        import cv2  # on the encoder thread, so importing the API does not load OpenCV
+
+        h, w = frame.shape[:2]
+        if self.max_width and w > self.max_width:
+            frame = cv2.resize(frame, (self.max_width, int(round(h * self.max_width / w))),
+                               interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, int(self.quality)])
+        return buf.tobytes() if ok else None
@@ -10,6 +10,8 @@ What it does
 ------------
 - Select video (file dialog) → enables “Process Video”
 - Spawns VideoProcessor(video_path, filters) on a thread; wires a progress callback
+- Loads and warms the models once at startup (model_registry.py); every click
+  reuses them instead of reloading the weights
 - Updates a progress bar and status label (orange → green/red)
 - Shows non-interactive badges for the four core analytics included in the composite
 
@@ -21,13 +23,16 @@ Primary entry point
 Assumptions
 -----------
 - The core analytics are “always on” and also enforced in the processing layer
-- process_video.py (VideoProcessor) is on the Python path
+- process_video.py (VideoProcessor) is on the Python path; it is imported on
+  the first "Process Video" click, not at startup
 """
 
 
 import customtkinter as ctk
 from tkinter import filedialog
-from process_video import VideoProcessor
+# process_video (OpenCV, numpy, ultralytics) is imported on the first click, so
+# the window appears before the heavy stack loads
+from model_registry import registry
 import threading
 
 ctk.set_appearance_mode("Dark")
@@ -47,6 +52,8 @@ class App(ctk.CTk):
         self.kitchenIntrusion_var = ctk.BooleanVar(value=True)
 
         self.create_widgets()
+        # Background load + warm-up; the first "Process Video" finds the models ready
+        registry.preload()
 
     def create_widgets(self):
         self.grid_columnconfigure(0, weight=2, uniform="a")
@@ -149,6 +156,8 @@ class App(ctk.CTk):
         def update_progress(value):
             self.after(0, lambda: self.progress_bar.set(value))
         try:
+            from process_video import VideoProcessor
+
             processor = VideoProcessor(self.video_path, filters)
             processor.process_video(progress_callback=update_progress)
             self.status_label.configure(text="Processing completed!", text_color="green")
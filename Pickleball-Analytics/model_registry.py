@@ -0,0 +1,230 @@
+"""
+Model registry (YOLO weights loaded once per process)
+
+Purpose
+-------
+Every VideoProcessor built its own BallTracker, PlayerTracker and
+CourtDetector, and each of them loaded its weights from disk: once per API
+job, once per "Process Video" click in the desktop app, and the first
+inference of every run paid the framework's lazy setup on top.
+ModelRegistry loads each weight file once, keeps it as a template, and hands
+out warmed-up copies, one set per thread, so runs on different threads never
+share a model and runs on the same thread never reload one.
+
+What it does
+------------
+- MODEL_FILES / model_path(name): the weight file of each tracker
+- registry.models(): the ModelSet {"ball", "player", "court"} bound to the
+  calling thread; built on first use (template loaded from disk if needed,
+  deep-copied, warmed up with one dummy inference), reused by every later
+  call on that thread, and returned to the pool when the thread ends, so the
+  next thread picks it up instead of building a new one
+- registry.preload(count): build and warm sets in the background (server /
+  app startup) until `count` exist, counting idle sets, sets bound to threads
+  and builds in flight, so the first job finds them ready; a thread asking
+  while a preload is still building waits for that set instead of building
+  its own
+- ModelSet.claim(): setup cost to report in a run's metrics: load and warm-up
+  seconds the first time the set is used, zero (reused) afterwards
+- stats(): sets built / idle / in use / being preloaded, weight files loaded, total load and warm-up time
+  and the inference backend in use
+- the models are loaded through an InferenceBackend (inference_backend.py):
+  the .pt weights, or an exported ONNX / OpenVINO artifact
+
+Assumptions
+-----------
+- A set is used by one run at a time: VideoProcessor objects created on one
+  thread are run one after another (a pipelined run's stage threads borrow
+  the caller's set while the caller waits)
+- Templates never run inference; each set is a deep copy, so memory is one
+  copy per model plus one per concurrent thread
+- ultralytics (and numpy) are imported on the first load, not with this
+  module, so the API and the desktop app start without them
+"""
+
+import copy
+import os
+import threading
+import time
+import weakref
+
+from inference_backend import InferenceBackend
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(PROJECT_DIR, "models")
+
+# Model weights per tracker, under MODELS_DIR
+MODEL_FILES = {
+    "ball": "ball_tracking.pt",
+    "player": "player_tracking.pt",
+    "court": "court_detection.pt",
+}
+# Side (px) of the black frame used for the warm-up inference
+WARMUP_SIZE = 640
+
+
+def model_path(name):
+    return os.path.join(MODELS_DIR, MODEL_FILES[name])
+
+
+class ModelSet(dict):
+    """One inference handle per model name; used by one thread at a time."""
+
+    def __init__(self, models, load_s, warmup_s, backend=None):
+        super().__init__(models)
+        self.load_s = load_s
+        self.warmup_s = warmup_s
+        self.backend = backend or {}
+        self.runs = 0
+
+    def claim(self):
+        first = self.runs == 0
+        self.runs += 1
+        return {
+            "load_s": round(self.load_s, 3) if first else 0.0,
+            "warmup_s": round(self.warmup_s, 3) if first else 0.0,
+            "reused": not first,
+            "runs_on_set": self.runs,
+            "backend": self.backend,
+        }
+
+
+class _Lease:
+    """Holds a thread's ModelSet; collected with the thread's locals."""
+
+    def __init__(self, models):
+        self.models = models
+
+
+class ModelRegistry:
+    def __init__(self, files=None, warmup=True, backend=None):
+        self.files = dict(files or {name: model_path(name) for name in MODEL_FILES})
+        self.warmup = warmup
+        self.backend = backend or InferenceBackend()
+        self._lock = threading.Lock()        # pool and counters
+        self._ready = threading.Condition(self._lock)  # a preloaded set joined the pool
+        self._load_lock = threading.Lock()   # templates (one disk load per file)
+        self._templates = {}                 # name -> loaded model, never used for inference
+        self._free = []                      # built sets not bound to a thread
+        self._bound = 0                      # sets bound to threads (or being built for one)
+        self._preloading = 0                 # preload builds in flight
+        self._waiting = 0                    # threads in _take waiting on them
+        self._local = threading.local()
+        self._counts = {"sets": 0, "disk_loads": 0, "load_s": 0.0, "warmup_s": 0.0}
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def models(self):
+        """The calling thread's ModelSet (built or taken from the pool on first call)."""
+        lease = getattr(self._local, "lease", None)
+        if lease is None:
+            lease = _Lease(self._take())
+            # Back to the pool once the thread (and so its locals) is gone
+            weakref.finalize(lease, self._give_back, lease.models)
+            self._local.lease = lease
+        return lease.models
+
+    def preload(self, count=1):
+        """Build and warm up to `count` idle sets on a background thread; returns the thread."""
+        with self._lock:
+            missing = max(int(count) - len(self._free) - self._bound - self._preloading, 0)
+            self._preloading += missing
+
+        def run():
+            left = missing
+            try:
+                for _ in range(missing):
+                    models = self._build()
+                    with self._ready:
+                        left -= 1
+                        self._preloading -= 1
+                        self._free.append(models)
+                        self._ready.notify_all()
+            except Exception as e:
+                print(f"[MODELS] preload failed: {e}")
+                with self._ready:
+                    self._preloading -= left
+                    self._ready.notify_all()  # waiters build their own
+
+        thread = threading.Thread(target=run, name="model-preload", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._counts, idle=len(self._free), in_use=self._bound, preloading=self._preloading,
+                     **self.backend.describe())
+        s["load_s"] = round(s["load_s"], 3)
+        s["warmup_s"] = round(s["warmup_s"], 3)
+        return s
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _take(self):
+        with self._ready:
+            # Wait for a preloaded set while there is one in flight per waiting thread
+            self._waiting += 1
+            try:
+                while not self._free and self._preloading >= self._waiting:
+                    self._ready.wait()
+            finally:
+                self._waiting -= 1
+            self._bound += 1
+            if self._free:
+                return self._free.pop()
+        try:
+            return self._build()
+        except BaseException:
+            with self._lock:
+                self._bound -= 1
+            raise
+
+    def _give_back(self, models):
+        with self._ready:
+            self._bound -= 1
+            self._free.append(models)
+            self._ready.notify_all()
+
+    def _build(self):
+        t0 = time.perf_counter()
+        handles = {name: self._clone(name) for name in self.files}
+        load_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        if self.warmup:
+            import numpy as np
+
+            dummy = np.zeros((WARMUP_SIZE, WARMUP_SIZE, 3), dtype=np.uint8)
+            for model in handles.values():
+                model.predict(dummy, verbose=False)
+                if self.backend.configure(model):
+                    model.predict(dummy, verbose=False)  # warm the re-created runtime too
+        warmup_s = time.perf_counter() - t0
+
+        with self._lock:
+            self._counts["sets"] += 1
+            self._counts["load_s"] += load_s
+            self._counts["warmup_s"] += warmup_s
+        print(f"[MODELS] set {self._counts['sets']} ready: load {load_s:.2f}s, warm-up {warmup_s:.2f}s")
+        return ModelSet(handles, load_s, warmup_s, self.backend.describe())
+
+    def _clone(self, name):
+        with self._load_lock:
+            template = self._templates.get(name)
+            if template is None:
+                template = self._templates[name] = self.backend.load(name, self.files[name])
+                with self._lock:
+                    self._counts["disk_loads"] += 1
+        try:
+            return copy.deepcopy(template)
+        except Exception:
+            # Not copyable: load another instance instead
+            with self._lock:
+                self._counts["disk_loads"] += 1
+            return self.backend.load(name, self.files[name])
+
+
+# Process-wide registry used by VideoProcessor, the API and the desktop app
+registry = ModelRegistry()
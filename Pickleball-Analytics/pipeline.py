@@ -0,0 +1,155 @@
+"""
+Threaded stage pipeline
+
+Purpose
+-------
+Runs a chain of generator stages on separate threads connected by bounded
+queues, so decoding, inference, tracking, rendering and encoding overlap
+instead of running strictly one after another.
+
+What it does
+------------
+- Pipeline(source, stages, maxsize): source is an iterable, each stage is a
+  callable taking an iterable and returning an iterable (usually a generator)
+- Iterating the pipeline starts one thread per stage and yields the outputs of
+  the last stage in the caller's thread
+- Bounded queues give backpressure: a fast stage blocks once its output queue
+  holds `maxsize` items
+- stats(): per-stage item counts, busy/wait timings and queue depths
+
+Assumptions
+-----------
+- Every stage consumes its input in order and keeps its own state; a stage
+  is never run on more than one thread, so frame order is preserved
+- The same stage callables can be chained directly (serial mode) with
+  identical results, since the queues only add buffering
+"""
+
+import queue
+import threading
+import time
+
+PIPELINE_QUEUE_SIZE = 8
+_POLL_SEC = 0.1
+_END = object()
+
+
+class _StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy_s = 0.0       # time spent producing outputs (excl. waiting for input)
+        self.in_wait_s = 0.0    # time blocked on an empty input queue
+        self.out_wait_s = 0.0   # time blocked on a full output queue (backpressure)
+        self.depth_max = 0      # output queue depth samples
+        self.depth_sum = 0
+
+    def as_dict(self):
+        return {
+            "items": self.items,
+            "busy_s": round(self.busy_s, 3),
+            "in_wait_s": round(self.in_wait_s, 3),
+            "out_wait_s": round(self.out_wait_s, 3),
+            "queue_depth_max": self.depth_max,
+            "queue_depth_mean": round(self.depth_sum / self.items, 2) if self.items else 0.0,
+        }
+
+
+class Pipeline:
+    def __init__(self, source, stages, maxsize=PIPELINE_QUEUE_SIZE):
+        """
+        source: (name, iterable) producing the first items (e.g. decoded frames)
+        stages: list of (name, fn) where fn(iterable) -> iterable
+        """
+        self._source = source
+        self._stages = list(stages)
+        self._maxsize = max(int(maxsize or 1), 1)
+        self._stop = threading.Event()
+        self._error = None
+        self._stats = [_StageStats(name) for name, _ in [source] + self._stages]
+
+    def __iter__(self):
+        queues = [queue.Queue(maxsize=self._maxsize) for _ in self._stats]
+        threads = []
+
+        src_name, src_iter = self._source
+        threads.append(threading.Thread(
+            target=self._run_stage, args=(self._stats[0], lambda _: src_iter, None, queues[0]),
+            name=f"pipeline-{src_name}", daemon=True,
+        ))
+        for i, (name, fn) in enumerate(self._stages, start=1):
+            threads.append(threading.Thread(
+                target=self._run_stage, args=(self._stats[i], fn, queues[i - 1], queues[i]),
+                name=f"pipeline-{name}", daemon=True,
+            ))
+
+        for t in threads:
+            t.start()
+        try:
+            for item in self._drain(queues[-1], None):
+                yield item
+        finally:
+            self._stop.set()
+            for t in threads:
+                t.join()
+        if self._error is not None:
+            raise self._error
+
+    def stats(self):
+        return {s.name: s.as_dict() for s in self._stats}
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _run_stage(self, stats, fn, in_q, out_q):
+        try:
+            inputs = self._drain(in_q, stats) if in_q is not None else None
+            outputs = iter(fn(inputs))
+            while not self._stop.is_set():
+                t0 = time.perf_counter()
+                wait_before = stats.in_wait_s
+                try:
+                    item = next(outputs)
+                except StopIteration:
+                    break
+                stats.busy_s += (time.perf_counter() - t0) - (stats.in_wait_s - wait_before)
+                stats.items += 1
+                self._put(out_q, item, stats)
+        except BaseException as e:  # surfaced to the caller from __iter__
+            if self._error is None:
+                self._error = e
+            self._stop.set()
+        finally:
+            self._put(out_q, _END, None)
+
+    def _put(self, q, item, stats):
+        t0 = time.perf_counter()
+        while True:
+            try:
+                q.put(item, timeout=_POLL_SEC)
+                break
+            except queue.Full:
+                if self._stop.is_set():
+                    return
+        if stats is not None:
+            stats.out_wait_s += time.perf_counter() - t0
+            depth = q.qsize()
+            stats.depth_sum += depth
+            stats.depth_max = max(stats.depth_max, depth)
+
+    def _drain(self, q, stats):
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = q.get(timeout=_POLL_SEC)
+            except queue.Empty:
+                if stats is not None:
+                    stats.in_wait_s += time.perf_counter() - t0
+                if self._stop.is_set():
+                    return
+                continue
+            if stats is not None:
+                stats.in_wait_s += time.perf_counter() - t0
+            if item is _END:
+                return
+            yield item
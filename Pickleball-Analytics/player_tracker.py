@@ -9,6 +9,8 @@ point into bird’s-eye space for analytics and overlays.
 What it does
 ------------
 - detect_players(frame): YOLO inference → list of [x1, y1, x2, y2] boxes
+- detect_players_batch(frames, views): one batched YOLO call → (boxes, confs) per
+  frame; with `imgsz` set, on the frames resized to it (letterbox.FrameViews)
 - project_player_positions(boxes, H): bottom-center of each box → perspectiveTransform
 - detect_and_project(frame, H): convenience returning (boxes, projected_points)
 
@@ -27,14 +29,17 @@ Assumptions
 """
 
 
-import cv2
-import numpy as np
-from ultralytics import YOLO
+import projection
+from letterbox import FrameViews, scale_box
 
 class PlayerTracker:
-    def __init__(self, model_path, conf_threshold=0.5):
-        self.model = YOLO(model_path)
+    def __init__(self, model_path, conf_threshold=0.5, model=None, imgsz=None):
+        if model is None:
+            from ultralytics import YOLO  # heavy (torch); imported only when actually loading
+            model = YOLO(model_path)
+        self.model = model
         self.conf_threshold = conf_threshold
+        self.imgsz = imgsz  # inference size; None = the model's default
 
     def detect_players(self, frame):
         """
@@ -42,6 +47,29 @@ class PlayerTracker:
         Returns list of bounding boxes in format [x1, y1, x2, y2].
         """
         results = self.model.predict(frame, conf=self.conf_threshold, verbose=False)[0]
+        return self._boxes_and_confs(results)
+
+    def detect_players_batch(self, frames, views=None):
+        """
+        Run YOLO player detection on a batch of frames with a single predict call.
+        Returns list of (boxes, confs) tuples, one per frame in input order.
+        views: FrameViews of these frames, to share their resized copies.
+        """
+        if not frames:
+            return []
+        if self.imgsz is None:
+            results = self.model.predict(list(frames), conf=self.conf_threshold, verbose=False)
+            return [self._boxes_and_confs(r) for r in results]
+        images, scales = (views or FrameViews(frames)).resized(self.imgsz)
+        results = self.model.predict(images, conf=self.conf_threshold, verbose=False, imgsz=self.imgsz)
+        out = []
+        for r, scale in zip(results, scales):
+            boxes, confs = self._boxes_and_confs(r)
+            out.append(([scale_box(b, scale) for b in boxes], confs))
+        return out
+
+    @staticmethod
+    def _boxes_and_confs(results):
         boxes = []
         confs = []
         for box in results.boxes:
@@ -57,18 +85,10 @@ class PlayerTracker:
         Given bounding boxes and homography H, project player bottom-center points.
         Returns list of projected (x, y) tuples in bird's eye space.
         """
-        projected_pts = []
         if H is None:
-            return projected_pts
-
-        for box in boxes:
-            x1, y1, x2, y2 = box
-            cx = (x1 + x2) / 2
-            cy = y2  # bottom center of bbox
-            pt = np.array([[[cx, cy]]], dtype=np.float32)
-            proj = cv2.perspectiveTransform(pt, H)[0][0]
-            projected_pts.append(tuple(proj))
-        return projected_pts
+            return []
+        # Bottom center of each bbox, all boxes in one transform
+        return [tuple(p) for p in projection.project_points(projection.foot_points(boxes), H)]
 
     def detect_and_project(self, frame, H):
         """
@@ -81,7 +101,16 @@ class PlayerTracker:
         YOLO detection order changes.
         """
         boxes, confs = self.detect_players(frame)
-        projected_pts = self.project_player_positions(boxes, H)
+        return self.project_and_sort(boxes, confs, H)
+
+    def project_and_sort(self, boxes, confs, H, projected=None):
+        """
+        Project boxes with H and sort (boxes, projected points, confs) by
+        bird's-eye Y so index 0 is the top-side player.  Used both for fresh
+        detections and for detections replayed from the cache.  Pass
+        `projected` (one point per box) when the caller already projected them.
+        """
+        projected_pts = self.project_player_positions(boxes, H) if projected is None else projected
 
         # Sort all three lists together by projected Y (top-side first)
         if projected_pts and len(projected_pts) == len(boxes):
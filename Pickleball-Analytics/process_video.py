@@ -7,6 +7,7 @@ High-level orchestration of the pickleball video pipeline:
 - Projects detections into bird's-eye space via homography
 - Updates analytics (heatmaps, kitchen intrusion, rally tempo)
 - Renders a composite output with: Main View | Bird's-eye | 2×2 Analytics
+  (or, in headless analytics mode, only writes stats.json and the heatmaps)
 
 Dependencies:
     - OpenCV (cv2)
@@ -16,10 +17,11 @@ Dependencies:
 
 from __future__ import annotations
 
+import itertools
 import os
 import time
 from datetime import datetime
-from typing import Iterable, Optional, Tuple
+from typing import Any, Iterable, List, NamedTuple, Optional, Tuple
 
 import cv2
 import numpy as np
@@ -29,13 +31,21 @@ from player_tracker import PlayerTracker
 from court_detection import CourtDetector
 from analytics import Analytics
 from score_tracker import ScoreTracker
-from detection_cache import DetectionCache
+from court_tracker import CourtTracker
+from detection_cache import CachedDetections, DetectionCache
+from pipeline import Pipeline, PIPELINE_QUEUE_SIZE
+from detection_scheduler import DetectionScheduler
+import projection
+import sharding
+from render_cache import LayerCache, draw_dot
+from model_registry import model_path, registry
+from letterbox import FrameViews, fit_size, scale_box
+from video_decode import DECODE_PREFETCH, VideoDecoder, open_capture
 
 # ==============================================================================
 # Module‑level constants (easy to tweak and reuse)
 # ==============================================================================
 PROJECT_DIR: str = os.path.dirname(os.path.abspath(__file__))
-MODELS_DIR: str = os.path.join(PROJECT_DIR, "models")
 OUTPUT_ROOT: str = os.path.join(PROJECT_DIR, "video_outputs")
 
 # Default analytics that should always be ON unless explicitly disabled
@@ -66,6 +76,21 @@ FONT = cv2.FONT_HERSHEY_SIMPLEX
 FONT_SCALE: float = 0.7
 FONT_THICKNESS: int = 2
 
+# Detection: frames per batched model.predict call (tune per host)
+DETECT_BATCH_SIZE: int = 8
+# Inference size per detector (long side, px); None = the model's default
+# (see inference_backend.py).  Models sharing a size share one resize per frame
+DETECT_IMGSZ: dict = {"ball": None, "player": None, "court": None}
+# Court keypoints are detected on the first N frames until found, then tracked
+# (re-detected on camera drift, see court_tracker.py)
+COURT_BOOTSTRAP_FRAMES: int = 5
+
+# Decode: frames go into a ring of reused buffers instead of a new array each
+# (see video_decode.py); reduced-resolution decode (reduced_decode=True) only
+# when it drops at least this much of the source resolution
+REUSE_DECODE_BUFFERS: bool = True
+REDUCED_DECODE_MAX_RATIO: float = 0.9
+
 # Video
 FOURCC = cv2.VideoWriter_fourcc(*"mp4v")
 FRAME_SLEEP_SEC: float = 0.001  # UI breathing room
@@ -82,30 +107,95 @@ CONNECTIONS: Tuple[Tuple[int, int], ...] = (
 )
 
 
+
+class TrackedFrame(NamedTuple):
+    """Per-frame output of the tracking stage, consumed by the render stage."""
+    frame_idx: int
+    frame: Optional[np.ndarray]  # None in headless analytics mode
+    kps: Optional[np.ndarray]
+    Hmg: Optional[np.ndarray]
+    players: List[List[float]]
+    proj_players: List[Tuple[float, float]]
+    confs: List[float]
+    ball_bbox: Optional[List[float]]
+    ball_proj: Optional[Tuple[float, float]]
+    proj_kps: Optional[np.ndarray]
+    analytics: Any  # Analytics (or a snapshot of it) to render panels from
+
+
 # ==============================================================================
 # Video Processor
 # ==============================================================================
 class VideoProcessor:
-    def __init__(self, video_path: str, filters: dict):
+    def __init__(
+        self,
+        video_path: str,
+        filters: dict,
+        batch_size: int = DETECT_BATCH_SIZE,
+        workers: int = 1,
+        player_stride: int = 1,
+        ball_idle_stride: int = 1,
+        ball_roi: bool = False,
+        render_cache: bool = True,
+        models: Optional[dict] = None,
+        imgsz: Optional[dict] = None,
+        reduced_decode: bool = False,
+    ):
         self.video_path = video_path
         self.filters = self._apply_default_filters(filters)
-
-        self.ball_tracker = BallTracker(os.path.join(MODELS_DIR, "ball_tracking.pt"))
-        self.player_tracker = PlayerTracker(os.path.join(MODELS_DIR, "player_tracking.pt"))
-        self.court_mapper = CourtDetector(os.path.join(MODELS_DIR, "court_detection.pt"))
+        self.batch_size = max(int(batch_size or 1), 1)
+        self.workers = max(int(workers or 1), 1)  # >1: sharded detection in worker processes
+
+        # Strides > 1: skip player/ball inferences and predict the gaps (see detection_scheduler.py)
+        scheduler = DetectionScheduler(player_stride, ball_idle_stride)
+        self.scheduler: Optional[DetectionScheduler] = scheduler if scheduler.enabled else None
+        self.ball_roi = bool(ball_roi)  # ball detection on a window around the predicted position
+
+        # Trackers are per video (they carry state); the models are loaded once per
+        # thread and reused across videos (see model_registry.py)
+        if models is None:
+            models = registry.models()
+        claim = getattr(models, "claim", None)
+        self.model_setup: dict = claim() if claim is not None else {}
+        # Per-detector inference sizes, e.g. {"ball": 960, "court": 480}
+        self.imgsz = {**DETECT_IMGSZ, **(imgsz or {})}
+        self.ball_tracker = BallTracker(model_path("ball"), model=models.get("ball"), imgsz=self.imgsz["ball"])
+        self.player_tracker = PlayerTracker(model_path("player"), model=models.get("player"),
+                                            imgsz=self.imgsz["player"])
+        self.court_mapper = CourtDetector(model_path("court"), model=models.get("court"), imgsz=self.imgsz["court"])
+        self.court_tracker = CourtTracker(self.court_mapper, bootstrap_frames=COURT_BOOTSTRAP_FRAMES)
+        # Decode below source resolution where the output allows it (headless
+        # analytics, a width-capped stream); detections are mapped back to source pixels
+        self.reduced_decode = bool(reduced_decode)
+        self._decode_scale: Optional[Tuple[float, float]] = None  # decoded -> source pixels
         self.analytics = Analytics(self.filters)
+        # Static court layers drawn once per homography (see render_cache.py)
+        self.render_cache = bool(render_cache)
+        self.analytics.render_cache = self.render_cache
+        self._bird_layer = LayerCache()
         self.score_tracker = ScoreTracker()
 
         self.output_dir = self._make_output_dir()
         self._prev_rally_active = False  # for rally-end detection
+        self._detections_complete = False  # detection stage reached end of video
+        self.metrics: dict = {}  # throughput figures for the last run
 
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
-    def process_video(self, progress_callback=None) -> str:
-        cap = self._open_capture(self.video_path)
-        total_frames, src_w, src_h, fps = self._read_video_meta(cap)
-        out_w, out_h, main_w, be_w, grid_w, panel_w, panel_h = self._compute_layout(src_w, src_h)
+    def process_video(self, progress_callback=None, pipelined: bool = False) -> str:
+        """
+        Render the composite video, heatmaps and stats.json.
+
+        pipelined=True runs decode, detection, tracking, rendering and encoding
+        on separate threads connected by bounded queues (see pipeline.py).  The
+        stages are the same generators the serial path chains together, so the
+        outputs are identical; per-stage timings land in metrics["pipeline"].
+        """
+        decoder = self._open_decoder(pipelined)  # the composite is rendered at source height: full resolution
+        total_frames, src_w, src_h, fps = decoder.meta()
+        layout = self._compute_layout(src_w, src_h)
+        out_w, out_h = layout[:2]
 
         # Init analytics context
         self.analytics.set_canvas_size(src_w, src_h)
@@ -114,214 +204,170 @@ class VideoProcessor:
         out_path, writer = self._create_writer(out_w, out_h, fps)
 
         # --- Detection cache ---
-        cache_data = DetectionCache.load(self.video_path)
-        using_cache = cache_data is not None
-        frame_cache = []  # collect detections on first run
+        self._reset_metrics()
+        cache_data, appender = self._open_detection_cache(total_frames)
 
-        frame_idx = 0
+        pipe = None
         try:
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-
-                # --- Detection & projection ---
-                if using_cache and frame_idx < len(cache_data):
-                    cached = cache_data[frame_idx]
-                    kps = cached["court"]["keypoints"]
-                    Hmg = cached["court"]["homography"]
-                    players = cached["players"]["boxes"]
-                    confs = cached["players"]["confs"]
-                    proj_players = self.player_tracker.project_player_positions(players, Hmg)
-                    # Sort by bird's-eye Y (top-side = Player A, bottom = Player B)
-                    if proj_players and len(proj_players) == len(players):
-                        combined = list(zip(players, proj_players, confs))
-                        combined.sort(key=lambda t: t[1][1])
-                        players = [c[0] for c in combined]
-                        proj_players = [c[1] for c in combined]
-                        confs = [c[2] for c in combined]
-                    ball_det = cached["ball"]["bbox_dict"]
-                else:
-                    # Court detection (first few frames or use cached)
-                    if frame_idx < 5 and (not hasattr(self, '_cached_kps') or self._cached_Hmg is None):
-                        kps, Hmg = self.court_mapper.get_keypoints_and_homography(frame)
-                        if kps is not None and Hmg is not None:
-                            self._cached_kps = kps
-                            self._cached_Hmg = Hmg
-                    else:
-                        kps = getattr(self, '_cached_kps', None)
-                        Hmg = getattr(self, '_cached_Hmg', None)
-
-                    players, proj_players, confs = self.player_tracker.detect_and_project(frame, Hmg)
-                    ball_det = self.ball_tracker.detect_frame(frame)
-
-                    # Collect for cache
-                    frame_cache.append({
-                        "court": {
-                            "keypoints": kps,
-                            "homography": Hmg,
-                        },
-                        "players": {
-                            "boxes": players,
-                            "confs": confs,
-                        },
-                        "ball": {
-                            "bbox_dict": ball_det,
-                        },
-                    })
-
-                self.ball_tracker.detect_bounce(ball_det)
-                ball_bbox, ball_proj = self.ball_tracker.process_and_project(ball_det, frame, Hmg)
-                self.ball_tracker.draw_bounce(frame)
-                self.ball_tracker.update_speed(ball_proj, fps)
-
-                # Score tracking: side + bounce + rally-end
-                kitchen_mid = self.analytics.get_kitchen_midline()
-                ball_side = self.ball_tracker.get_ball_side(ball_proj, kitchen_mid)
-                self.ball_tracker.update_side_bounce()
-                ball_in_bounds = self.analytics._ball_in_bounds(ball_proj)
-                self.score_tracker.update(ball_proj, ball_in_bounds, ball_side)
-
-                # Analytics update (must happen before rally-end check)
-                self.analytics.update_counters(frame_idx, proj_players, ball_proj)
-
-                # Check for rally end
-                if self._prev_rally_active and not self.analytics._rally_active:
-                    self.score_tracker.on_rally_end(frame_idx, self.ball_tracker)
-                self._prev_rally_active = self.analytics._rally_active
-
-                self.score_tracker.draw_score(frame)
-
-                # Columns
-                main_col = self._render_main_view(frame, players, confs, ball_bbox, kps, (main_w, out_h))
-                bird_col = self._render_birdseye(src_w, src_h, kps, Hmg, proj_players, ball_proj, (be_w, out_h))
-                grid_col = self._render_analytics_grid((panel_w, panel_h), (grid_w, out_h), bird_reference=bird_col)
-
-                # Compose & write
-                composite = cv2.hconcat([main_col, bird_col, grid_col])
-                writer.write(composite)
+            frames = decoder.frames()
+            detect = lambda items: self._detect_stage(items, cache_data, appender)
+            track = lambda items: self._track_stage(items, fps, snapshot=pipelined)
+            render = lambda items: self._render_stage(items, src_w, src_h, layout)
+            encode = lambda items: self._encode_stage(items, writer)
+
+            if pipelined:
+                pipe = Pipeline(
+                    ("decode", frames),
+                    [("detect", detect), ("track", track), ("render", render), ("encode", encode)],
+                    maxsize=PIPELINE_QUEUE_SIZE,
+                )
+                written = iter(pipe)
+            else:
+                written = encode(render(track(detect(frames))))
 
-                frame_idx += 1
-                self._report_progress(progress_callback, frame_idx, total_frames)
+            for frame_idx in written:
+                self._report_progress(progress_callback, frame_idx + 1, total_frames)
         finally:
-            cap.release()
+            decoder.release()
             writer.release()
             self.analytics.save_outputs(self.output_dir)
             self._report_progress(progress_callback, total_frames, total_frames)
+            if pipe is not None:
+                self.metrics["pipeline"] = pipe.stats()
+            self._finish_metrics(decoder)
 
-            # Save detection cache on first run
-            if not using_cache and frame_cache:
-                DetectionCache.save(self.video_path, frame_cache)
+            # Persist the detections of this run (partial if we stopped early)
+            self._close_detection_cache(appender)
 
             # Export final JSON stats
-            import json
-            stats_path = os.path.join(self.output_dir, "stats.json")
-            combined_stats = self.analytics.export_stats()
-            combined_stats["score"] = self.score_tracker.export_stats()
-            with open(stats_path, "w") as f:
-                json.dump(combined_stats, f, indent=4)
+            stats_path = self._write_stats()
 
         print(f"Saved: {out_path}")
         return {
             "video_path": out_path,
             "stats_path": stats_path,
-            "output_dir": self.output_dir
+            "output_dir": self.output_dir,
+            "metrics": self.metrics,
+        }
+
+    def process_analytics(self, progress_callback=None) -> dict:
+        """
+        Headless analytics: stats.json and heatmap PNGs only.
+
+        Runs detection, ball/score tracking, the analytics counters and the
+        court-geometry learning exactly like process_video, but skips every
+        drawing call, the bird's-eye/grid panels and the encoder.  The stats
+        are identical to a full render of the same video.  When the detection
+        cache already covers the whole video, nothing is decoded (see
+        replay_analytics).
+        """
+        decoder = self._open_decoder()
+        self._reduce_decode(decoder, 0.0)  # no image output: the detectors' input size is enough
+        total_frames, src_w, src_h, fps = decoder.meta()
+
+        self.analytics.set_canvas_size(src_w, src_h)
+        self.analytics.set_video_context(total_frames=total_frames, fps=fps)
+
+        self._reset_metrics()
+        cache_data, appender = self._open_detection_cache(total_frames)
+
+        try:
+            if appender is None and getattr(cache_data, "complete", cache_data is not None):
+                # Everything is cached: replay detections without decoding
+                decoder.release()
+                detections = self._replay_stage(cache_data)
+            else:
+                detections = self._detect_stage(decoder.frames(), cache_data, appender)
+            for t in self._track_stage(detections, fps, render=False):
+                self._report_progress(progress_callback, t.frame_idx + 1, total_frames)
+        finally:
+            decoder.release()
+            self.analytics.save_outputs(self.output_dir)
+            self._report_progress(progress_callback, total_frames, total_frames)
+            self._finish_metrics(decoder)
+            self._close_detection_cache(appender)
+            stats_path = self._write_stats()
+
+        print(f"Saved: {stats_path}")
+        return {
+            "video_path": None,
+            "stats_path": stats_path,
+            "output_dir": self.output_dir,
+            "metrics": self.metrics,
         }
 
-    def process_video_stream(self, progress_callback=None):
+    def replay_analytics(self, progress_callback=None, save_outputs: bool = True) -> dict:
+        """
+        Re-run ball/score tracking and analytics purely from the detection cache.
+
+        No frame is decoded and no model is called, so re-scoring a match after
+        tweaking tracker or analytics heuristics costs only the sequential
+        tracking pass.  Use a fresh VideoProcessor per replay (tracker state
+        accumulates).  Returns the combined stats dict written to stats.json
+        (Analytics.export_stats() plus "score"); with save_outputs=False nothing
+        is written to disk.
+
+        Raises RuntimeError if the video has no complete detection cache.
+        """
+        cache_data = DetectionCache.load(self.video_path)
+        if cache_data is None or not cache_data.complete:
+            raise RuntimeError(f"No complete detection cache for: {self.video_path}")
+
+        # Container metadata only; reading it does not decode any frame
         cap = self._open_capture(self.video_path)
-        total_frames, src_w, src_h, fps = self._read_video_meta(cap)
+        try:
+            total_frames, src_w, src_h, fps = self._read_video_meta(cap)
+        finally:
+            cap.release()
+
+        self.analytics.set_canvas_size(src_w, src_h)
+        self.analytics.set_video_context(total_frames=total_frames, fps=fps)
+
+        self._reset_metrics()
+        try:
+            for t in self._track_stage(self._replay_stage(cache_data), fps, render=False):
+                self._report_progress(progress_callback, t.frame_idx + 1, total_frames)
+        finally:
+            self._finish_metrics()
+
+        if save_outputs:
+            self.analytics.save_outputs(self.output_dir)
+            self._write_stats()
+        return self._combined_stats()
+
+    def process_video_stream(self, progress_callback=None, max_width: Optional[int] = None):
+        """
+        Yield (main view, live stats) per frame.  max_width caps the width of
+        the yielded main view (e.g. the live preview width); the view is then
+        rendered at that size directly, and with reduced_decode the video is
+        decoded at no more than the resolution it needs.
+        """
+        decoder = self._open_decoder()
+        total_frames, src_w, src_h, fps = decoder.meta()
         out_w, out_h, main_w, be_w, grid_w, panel_w, panel_h = self._compute_layout(src_w, src_h)
+        main_size = (main_w, out_h)
+        if max_width and max_width < main_w:
+            main_size = (int(max_width), max(int(round(out_h * max_width / main_w)), 1))
+            self._reduce_decode(decoder, main_size[1] / out_h)
 
         self.analytics.set_canvas_size(src_w, src_h)
         self.analytics.set_video_context(total_frames=total_frames, fps=fps)
 
         # --- Detection cache ---
-        cache_data = DetectionCache.load(self.video_path)
-        using_cache = cache_data is not None
-        frame_cache = []  # collect detections on first run
+        self._reset_metrics()
+        cache_data, appender = self._open_detection_cache(total_frames)
 
-        frame_idx = 0
         try:
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-
-                # --- Detection & projection ---
-                if using_cache and frame_idx < len(cache_data):
-                    cached = cache_data[frame_idx]
-                    kps = cached["court"]["keypoints"]
-                    Hmg = cached["court"]["homography"]
-                    players = cached["players"]["boxes"]
-                    confs = cached["players"]["confs"]
-                    proj_players = self.player_tracker.project_player_positions(players, Hmg)
-                    # Sort by bird's-eye Y (top-side = Player A, bottom = Player B)
-                    if proj_players and len(proj_players) == len(players):
-                        combined = list(zip(players, proj_players, confs))
-                        combined.sort(key=lambda t: t[1][1])
-                        players = [c[0] for c in combined]
-                        proj_players = [c[1] for c in combined]
-                        confs = [c[2] for c in combined]
-                    ball_det = cached["ball"]["bbox_dict"]
-                else:
-                    # Court detection (first few frames or use cached)
-                    if frame_idx < 5 and (not hasattr(self, '_cached_kps') or self._cached_Hmg is None):
-                        kps, Hmg = self.court_mapper.get_keypoints_and_homography(frame)
-                        if kps is not None and Hmg is not None:
-                            self._cached_kps = kps
-                            self._cached_Hmg = Hmg
-                    else:
-                        kps = getattr(self, '_cached_kps', None)
-                        Hmg = getattr(self, '_cached_Hmg', None)
-
-                    players, proj_players, confs = self.player_tracker.detect_and_project(frame, Hmg)
-                    ball_det = self.ball_tracker.detect_frame(frame)
-
-                    # Collect for cache
-                    frame_cache.append({
-                        "court": {
-                            "keypoints": kps,
-                            "homography": Hmg,
-                        },
-                        "players": {
-                            "boxes": players,
-                            "confs": confs,
-                        },
-                        "ball": {
-                            "bbox_dict": ball_det,
-                        },
-                    })
-
-                self.ball_tracker.detect_bounce(ball_det)
-                ball_bbox, ball_proj = self.ball_tracker.process_and_project(ball_det, frame, Hmg)
-                self.ball_tracker.draw_bounce(frame)
-                self.ball_tracker.update_speed(ball_proj, fps)
-
-                # Score tracking: side + bounce + rally-end
-                kitchen_mid = self.analytics.get_kitchen_midline()
-                ball_side = self.ball_tracker.get_ball_side(ball_proj, kitchen_mid)
-                self.ball_tracker.update_side_bounce()
-                ball_in_bounds = self.analytics._ball_in_bounds(ball_proj)
-                self.score_tracker.update(ball_proj, ball_in_bounds, ball_side)
-
-                # Analytics update (must happen before rally-end check)
-                self.analytics.update_counters(frame_idx, proj_players, ball_proj)
-
-                # Check for rally end
-                if self._prev_rally_active and not self.analytics._rally_active:
-                    self.score_tracker.on_rally_end(frame_idx, self.ball_tracker)
-                self._prev_rally_active = self.analytics._rally_active
-
-                self.score_tracker.draw_score(frame)
+            detections = self._detect_stage(decoder.frames(), cache_data, appender)
+            for t in self._track_stage(detections, fps):
+                kps, Hmg, players, proj_players = t.kps, t.Hmg, t.players, t.proj_players
+                ball_bbox, ball_proj = t.ball_bbox, t.ball_proj
 
                 # For live preview, we yield just the main annotated video
-                main_col = self._render_main_view(frame, players, confs, ball_bbox, kps, (main_w, out_h))
-                
-                # Also render birdseye secretly so analytics zones update
-                bird_col = self._render_birdseye(src_w, src_h, kps, Hmg, proj_players, ball_proj, (be_w, out_h))
+                # (court zones are learned in the tracking stage, no bird's-eye render needed)
+                main_col = self._render_main_view(t.frame, players, t.confs, ball_bbox, kps, main_size)
 
-                frame_idx += 1
+                frame_idx = t.frame_idx + 1
                 self._report_progress(progress_callback, frame_idx, total_frames)
                 
                 # Convert tracking data to JSON primitives
@@ -370,12 +416,409 @@ class VideoProcessor:
                 
                 yield main_col, stats
         finally:
-            cap.release()
+            decoder.release()
             self._report_progress(progress_callback, total_frames, total_frames)
+            self._finish_metrics(decoder)
+
+            # Persist the detections of this run (partial if we stopped early)
+            self._close_detection_cache(appender)
+
+    # ------------------------------------------------------------------
+    # Helpers — detection & tracking
+    # ------------------------------------------------------------------
+    def _open_detection_cache(self, total_frames: int):
+        """
+        Return (cache_data, appender).
+
+        cache_data replays already-detected frames (None if nothing is cached).
+        appender persists fresh detections in chunks as they are produced, so
+        an interrupted run leaves a partial cache that the next run resumes
+        from; it is None when the cache already covers the whole video.  With
+        workers > 1 and no cache on disk, detection is sharded across processes
+        up front and saved, and the sequential pass replays it like a cache.
+        With a detection schedule, ROI ball detection or custom inference
+        sizes, cached frames are still replayed (through the scheduler) but
+        the approximate detections are never written back.  Reduced-resolution
+        decoding uses a complete cache only (a partial one would seed the court
+        tracker with source-pixel keypoints) and writes nothing back.
+        """
+        cache_data = DetectionCache.load(self.video_path)
+        if cache_data is not None and cache_data.complete:
+            return cache_data, None
+        if self._decode_scale is not None:
+            return None, None
+        if self.scheduler is not None or self.ball_roi or any(self.imgsz.values()):
+            return cache_data, None
+        if cache_data is None and self.workers > 1:
+            entries = self._detect_sharded(total_frames)
+            DetectionCache.save(self.video_path, entries)
+            return entries, None
+        return cache_data, DetectionCache.open_appender(self.video_path, cached=cache_data)
+
+    def _close_detection_cache(self, appender) -> None:
+        if appender is None:
+            return
+        if appender.frame_count == 0:
+            appender.release()
+            return
+        appender.close(complete=self._detections_complete)
+
+    def _detect_sharded(self, total_frames: int) -> list:
+        # Workers detect ball/players with this processor's backend and sizes; the
+        # court is tracked here, in frame order, while they run
+        model_paths = {name: model_path(name) for name in ("ball", "player")}
+        entries, stats = sharding.detect_video(
+            self.video_path, total_frames, model_paths,
+            workers=self.workers, batch_size=self.batch_size,
+            imgsz={name: self.imgsz[name] for name in model_paths},
+            backend=registry.backend, court_pass=self._track_court,
+        )
+        self.metrics["sharding"] = stats
+        self.metrics["detect_s"] += stats["elapsed_s"]
+        self.metrics["detected_frames"] += len(entries)
+        return entries
+
+    def _track_court(self) -> list:
+        """(keypoints, H) of every frame from the same in-order CourtTracker pass the serial path makes."""
+        court = []
+        cap = self._open_capture(self.video_path)
+        try:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                court.append(self._detect_court(frame, len(court)))
+        finally:
+            cap.release()
+        return court
+
+    def _detect_stage(self, frames: Iterable[np.ndarray], cache_data, appender):
+        """
+        Detection stage: yield (frame_idx, frame, entry) for every frame, where
+        entry is a detection record in the DetectionCache per-frame format.
+
+        Frames covered by ``cache_data`` are replayed from it; the rest are
+        grouped into batches of ``self.batch_size`` and run through the ball and
+        player models with one predict call per model per batch.  Freshly
+        detected entries go to ``appender`` (if any), which persists them in
+        chunks.
+        """
+        n_cached = len(cache_data) if cache_data is not None else 0
+        self._detections_complete = False
+        frames = iter(frames)
+        frame_idx = 0
+        while True:
+            batch = list(itertools.islice(frames, self.batch_size))
+            if not batch:
+                self._detections_complete = True
+                break
+
+            n_hit = max(0, min(len(batch), n_cached - frame_idx))
+            entries = [cache_data[frame_idx + i] for i in range(n_hit)]
+            if self.scheduler is not None and entries:
+                entries = self._schedule_cached(entries, frame_idx)
+            if n_hit < len(batch):
+                if frame_idx + n_hit == n_cached and n_cached > 0:
+                    # Resuming after a cached prefix: carry its court result forward
+                    self._seed_court(cache_data[n_cached - 1])
+                fresh = self._detect_batch(batch[n_hit:], frame_idx + n_hit)
+                if appender is not None:
+                    appender.extend(fresh)
+                entries.extend(fresh)
+
+            for frame, entry in zip(batch, entries):
+                yield frame_idx, frame, entry
+                frame_idx += 1
 
-            # Save detection cache on first run
-            if not using_cache and frame_cache:
-                DetectionCache.save(self.video_path, frame_cache)
+    def _replay_stage(self, cache_data):
+        """Detection stage for a fully cached video: yield (frame_idx, None, entry)."""
+        if self.scheduler is None:
+            # Project the whole video up front: one transform per distinct homography
+            bulk = projection.project_cached(cache_data) if isinstance(cache_data, CachedDetections) else None
+            for frame_idx, entry in enumerate(cache_data):
+                if bulk is not None:
+                    entry["projection"] = bulk.frame(frame_idx)
+                yield frame_idx, None, entry
+        else:
+            # Same batch boundaries as live detection, so the schedule matches
+            for start in range(0, len(cache_data), self.batch_size):
+                stop = min(start + self.batch_size, len(cache_data))
+                entries = self._schedule_cached([cache_data[i] for i in range(start, stop)], start)
+                for i, entry in enumerate(entries):
+                    yield start + i, None, entry
+        self._detections_complete = True
+
+    def _detect_batch(self, frames: list, start_idx: int) -> list:
+        """Run court/player/ball detection on consecutive frames starting at start_idx."""
+        t0 = time.perf_counter()
+        views = FrameViews(frames)  # one resize per frame and inference size, shared by the models
+        courts = [self._detect_court(frame, start_idx + i, views.view(i)) for i, frame in enumerate(frames)]
+        if self.scheduler is None:
+            player_dets = self.player_tracker.detect_players_batch(frames, views)
+            ball_dets = self._detect_balls(frames, range(start_idx, start_idx + len(frames)), views)
+        else:
+            player_dets, ball_dets = self._schedule_batch(
+                start_idx, len(frames),
+                lambda pos: self.player_tracker.detect_players_batch([frames[i] for i in pos], views.subset(pos)),
+                lambda pos: self._detect_balls([frames[i] for i in pos], [start_idx + i for i in pos],
+                                               views.subset(pos)),
+            )
+
+        if self._decode_scale is not None:
+            courts, player_dets, ball_dets = self._to_source_pixels(courts, player_dets, ball_dets)
+
+        entries = [
+            DetectionCache.make_entry(kps, Hmg, players, confs, ball_det)
+            for (kps, Hmg), (players, confs), ball_det in zip(courts, player_dets, ball_dets)
+        ]
+
+        self.metrics["detect_s"] += time.perf_counter() - t0
+        self.metrics["detected_frames"] += len(frames)
+        self.metrics["batches"] += 1
+        self.metrics["resizes"] += views.stats["resizes"]
+        self.metrics["resizes_shared"] += views.stats["reused"]
+        return entries
+
+    def _to_source_pixels(self, courts: list, player_dets: list, ball_dets: list):
+        """Detections on reduced-resolution frames, in source pixels (the homography maps source pixels)."""
+        sx, sy = self._decode_scale
+        to_decoded = np.diag([1.0 / sx, 1.0 / sy, 1.0])
+        courts = [
+            (None if kps is None else kps * np.array((sx, sy), dtype=np.float32),
+             None if Hmg is None else Hmg @ to_decoded)
+            for kps, Hmg in courts
+        ]
+        player_dets = [([scale_box(box, (sx, sy)) for box in boxes], confs) for boxes, confs in player_dets]
+        ball_dets = [{k: scale_box(box, (sx, sy)) for k, box in ball.items()} for ball in ball_dets]
+        return courts, player_dets, ball_dets
+
+    def _detect_balls(self, frames: list, frame_ids, views: Optional[FrameViews] = None) -> list:
+        if self.ball_roi:
+            return self.ball_tracker.detect_frames_roi(frames, frame_ids, views)
+        return self.ball_tracker.detect_frames(frames, views)
+
+    def _schedule_batch(self, start_idx: int, n: int, run_players, run_balls):
+        """
+        Run only the scheduled inferences for frames [start_idx, start_idx + n)
+        and let the scheduler predict the rest.  run_players/run_balls take the
+        in-batch positions to infer and return one detection per position.
+        Returns (player_dets, ball_dets), one per frame.
+        """
+        idle = self.analytics._rally_hold_frames > 0
+        plan = [self.scheduler.plan(start_idx + i, idle) for i in range(n)]
+        players = iter(run_players([i for i, (p, _) in enumerate(plan) if p]))
+        balls = iter(run_balls([i for i, (_, b) in enumerate(plan) if b]))
+
+        player_dets, ball_dets = [], []
+        for i, (run_p, run_b) in enumerate(plan):
+            p, b = self.scheduler.resolve(start_idx + i, next(players) if run_p else None,
+                                          next(balls) if run_b else None)
+            player_dets.append(p)
+            ball_dets.append(b)
+        return player_dets, ball_dets
+
+    def _schedule_cached(self, entries: list, start_idx: int) -> list:
+        """Apply the detection schedule to full-rate cached entries (simulated skipping)."""
+        player_dets, ball_dets = self._schedule_batch(
+            start_idx, len(entries),
+            lambda pos: [(entries[i]["players"]["boxes"], entries[i]["players"]["confs"]) for i in pos],
+            lambda pos: [entries[i]["ball"]["bbox_dict"] for i in pos],
+        )
+        return [
+            DetectionCache.make_entry(e["court"]["keypoints"], e["court"]["homography"], boxes, confs, ball)
+            for e, (boxes, confs), ball in zip(entries, player_dets, ball_dets)
+        ]
+
+    def _detect_court(self, frame: np.ndarray, frame_idx: int, view=None):
+        """Court keypoints/homography for this frame: detected once, re-detected on camera drift."""
+        return self.court_tracker.update(frame, frame_idx, view)
+
+    def _seed_court(self, entry: dict) -> None:
+        self.court_tracker.seed(entry["court"]["keypoints"], entry["court"]["homography"])
+
+    def _track_stage(self, items: Iterable[tuple], fps: int, snapshot: bool = False, render: bool = True):
+        """
+        Tracking stage: stateful, strictly in frame order.  Yields a
+        TrackedFrame per input; with snapshot=True each carries a frozen copy
+        of the analytics state so a render stage on another thread sees the
+        same panels the serial path would.  render=False skips the overlays
+        and drops the frame (headless analytics).
+        """
+        for frame_idx, frame, entry in items:
+            tracked = self._track_frame(frame_idx, frame if render else None, entry, fps)
+            view = self.analytics.snapshot() if snapshot else self.analytics
+            yield tracked._replace(analytics=view)
+
+    def _track_frame(self, frame_idx: int, frame: Optional[np.ndarray], entry: dict, fps: int) -> "TrackedFrame":
+        """
+        Sequential per-frame state update: ball/score tracking, analytics
+        counters and court-geometry learning.  Must be called in frame order.
+        frame=None updates the same state without drawing any overlays.
+        """
+        kps = entry["court"]["keypoints"]
+        Hmg = entry["court"]["homography"]
+        boxes = entry["players"]["boxes"]
+        ball_det = entry["ball"]["bbox_dict"]
+
+        # Players, ball and keypoints in one transform (precomputed on cache replays)
+        proj = entry.get("projection")
+        if proj is None:
+            proj = projection.project_frame(Hmg, boxes, ball_det.get(1), kps)
+
+        # Sort by bird's-eye Y (top-side = Player A, bottom = Player B)
+        players, proj_players, confs = self.player_tracker.project_and_sort(
+            boxes, entry["players"]["confs"], Hmg, projected=proj.players
+        )
+
+        self.ball_tracker.detect_bounce(ball_det)
+        # Detections are in source pixels; reduced-resolution frames get the ball drawn at their scale
+        scaled = frame is not None and self._decode_scale is not None
+        ball_bbox, ball_proj = self.ball_tracker.process_and_project(ball_det, None if scaled else frame, Hmg,
+                                                                     projected=proj.ball)
+        if scaled and ball_bbox is not None:
+            self.ball_tracker.draw_bbox(frame, self._to_frame_box(ball_bbox))
+        if frame is not None:
+            self.ball_tracker.draw_bounce(frame)
+        self.ball_tracker.update_speed(ball_proj, fps)
+
+        # Score tracking: side + bounce + rally-end
+        kitchen_mid = self.analytics.get_kitchen_midline()
+        ball_side = self.ball_tracker.get_ball_side(ball_proj, kitchen_mid)
+        self.ball_tracker.update_side_bounce()
+        ball_in_bounds = self.analytics._ball_in_bounds(ball_proj)
+        self.score_tracker.update(ball_proj, ball_in_bounds, ball_side)
+
+        # Analytics update (must happen before rally-end check)
+        self.analytics.update_counters(frame_idx, proj_players, ball_proj)
+
+        # Check for rally end
+        if self._prev_rally_active and not self.analytics._rally_active:
+            self.score_tracker.on_rally_end(frame_idx, self.ball_tracker)
+        self._prev_rally_active = self.analytics._rally_active
+
+        if frame is not None:
+            self.score_tracker.draw_score(frame)
+
+        # Teach analytics dynamic zones from the projected keypoints
+        proj_kps = self._learn_court_geometry(kps, Hmg, proj.keypoints)
+
+        self.metrics["frames"] += 1
+        return TrackedFrame(frame_idx, frame, kps, Hmg, players, proj_players, confs,
+                            ball_bbox, ball_proj, proj_kps, self.analytics)
+
+    def _learn_court_geometry(self, keypoints: Optional[np.ndarray], Hmg: Optional[np.ndarray],
+                              proj_kps: Optional[np.ndarray] = None):
+        """Update kitchen/bounds/zones from the keypoints in bird space. Returns the projection."""
+        if keypoints is None or Hmg is None:
+            return None
+        if proj_kps is None:
+            proj_kps = projection.project_points(keypoints, Hmg)
+
+        self.analytics.update_kitchen_from_keypoints(proj_kps)
+        self.analytics.update_court_bounds_from_keypoints(proj_kps)
+        self.analytics.update_zones_from_keypoints(proj_kps)
+        return proj_kps
+
+    def _render_stage(self, items: Iterable["TrackedFrame"], src_w: int, src_h: int, layout: tuple):
+        """Render stage: yield (frame_idx, composite) for each tracked frame."""
+        out_w, out_h, main_w, be_w, grid_w, panel_w, panel_h = layout
+        for t in items:
+            # Columns
+            main_col = self._render_main_view(t.frame, t.players, t.confs, t.ball_bbox, t.kps, (main_w, out_h))
+            bird_col = self._render_birdseye(src_w, src_h, t.proj_kps, t.proj_players, t.ball_proj, (be_w, out_h))
+            grid_col = self._render_analytics_grid(
+                (panel_w, panel_h), (grid_w, out_h), bird_reference=bird_col, analytics=t.analytics
+            )
+
+            # Compose
+            yield t.frame_idx, cv2.hconcat([main_col, bird_col, grid_col])
+
+    @staticmethod
+    def _encode_stage(items: Iterable[tuple], writer: cv2.VideoWriter):
+        """Encode stage: write composites in order, yield the written frame index."""
+        for frame_idx, composite in items:
+            writer.write(composite)
+            yield frame_idx
+
+    def _write_stats(self) -> str:
+        """Write analytics + score stats to stats.json in the output dir."""
+        import json
+        stats_path = os.path.join(self.output_dir, "stats.json")
+        with open(stats_path, "w") as f:
+            json.dump(self._combined_stats(), f, indent=4)
+        return stats_path
+
+    def _combined_stats(self) -> dict:
+        combined_stats = self.analytics.export_stats()
+        combined_stats["score"] = self.score_tracker.export_stats()
+        return combined_stats
+
+    def _reset_metrics(self) -> None:
+        self.metrics = {
+            "batch_size": self.batch_size,
+            "frames": 0,
+            "detected_frames": 0,
+            "batches": 0,
+            "detect_s": 0.0,
+            "imgsz": dict(self.imgsz),
+            "resizes": 0,         # frames resized for a custom inference size
+            "resizes_shared": 0,  # ... reused by another model of the same size
+            "_t0": time.perf_counter(),
+        }
+        if self.scheduler is not None:
+            self.scheduler.reset()
+        if self.ball_roi:
+            self.ball_tracker.roi_stats = dict.fromkeys(self.ball_tracker.roi_stats, 0)
+        self.court_tracker.reset_stats()
+
+    def _finish_metrics(self, decoder: Optional[VideoDecoder] = None) -> None:
+        m = self.metrics
+        elapsed = time.perf_counter() - m.pop("_t0", time.perf_counter())
+        m["elapsed_s"] = round(elapsed, 3)
+        m["detect_s"] = round(m["detect_s"], 3)
+        m["fps"] = round(m["frames"] / elapsed, 2) if elapsed > 0 else 0.0
+        m["detect_fps"] = round(m["detected_frames"] / m["detect_s"], 2) if m["detect_s"] > 0 else 0.0
+        m["inference_ms_per_frame"] = round(m["detect_s"] * 1000 / m["detected_frames"], 2) if m["detected_frames"] else 0.0
+        # One-off model setup of this run, kept apart from the per-frame inference time
+        m["models"] = dict(self.model_setup)
+        print(
+            f"[PERF] {m['frames']} frames in {m['elapsed_s']:.1f}s ({m['fps']:.1f} fps) | "
+            f"detection {m['detected_frames']} frames, batch={m['batch_size']}, "
+            f"{m['detect_fps']:.1f} fps"
+        )
+        if decoder is not None:
+            # Decode (+ reduce) time on its own, so decode and inference throughput can be told apart
+            d = m["decode"] = decoder.stats()
+            m["decode_s"] = d["decode_s"]
+            m["decode_fps"] = d["decode_fps"]
+            size = "x".join(map(str, d["size"])) + (" (reduced)" if d["reduced"] else "")
+            print(f"[DECODE] {d['frames']} frames in {d['decode_s']:.2f}s ({d['decode_fps']:.1f} fps) | "
+                  f"{d['api']}, hw {d['hw_accel'] if d['hw_accel_active'] else 'off'}, {size}, "
+                  f"prefetch {d['prefetch']}, {d['buffers_allocated']}/{d['buffers']} buffers")
+        if self.model_setup:
+            ms = self.model_setup
+            print(f"[MODELS] {'reused' if ms['reused'] else 'loaded'} models: load {ms['load_s']:.2f}s, "
+                  f"warm-up {ms['warmup_s']:.2f}s (not in detection time)")
+        court = dict(self.court_tracker.stats)
+        court["court_s"] = round(court["court_s"], 3)
+        court["drift_check_s"] = round(court["drift_check_s"], 3)
+        m["court"] = court
+        print(f"[COURT] {court['detections']} detections ({court['redetections']} re-detections: "
+              f"{court['drift_redetections']} drift, {court['periodic_redetections']} periodic) | "
+              f"{court['court_s']:.2f}s detecting, {court['drift_check_s']:.2f}s drift checks")
+        if self.ball_roi:
+            m["ball_roi"] = dict(self.ball_tracker.roi_stats)
+            r = m["ball_roi"]
+            print(f"[ROI] ball: {r['roi_hits']}/{r['roi_frames']} ROI hits, "
+                  f"{r['full_frames']} full-frame searches, {r['fallbacks']} fallbacks")
+        if self.scheduler is not None:
+            m["schedule"] = self.scheduler.stats()
+            s = m["schedule"]
+            print(
+                f"[SCHEDULE] player stride {s['player_stride']}, ball idle stride {s['ball_idle_stride']} | "
+                f"skipped {s['player_skipped']} player / {s['ball_skipped']} ball inferences "
+                f"({s['skipped_pct']:.1f}%)"
+            )
 
     # ------------------------------------------------------------------
     # Helpers — configuration & IO
@@ -389,10 +832,56 @@ class VideoProcessor:
 
     @staticmethod
     def _open_capture(path: str) -> cv2.VideoCapture:
-        cap = cv2.VideoCapture(path)
-        if not cap.isOpened():
-            raise RuntimeError(f"Could not open video: {path}")
-        return cap
+        return open_capture(path)
+
+    def _open_decoder(self, pipelined: bool = False) -> VideoDecoder:
+        """Decoder at source resolution; serial runs decode ahead on its own thread, the pipeline has a decode stage."""
+        buffers = self._decode_buffers(pipelined) if REUSE_DECODE_BUFFERS else 0
+        decoder = VideoDecoder(self.video_path, prefetch=0 if pipelined else DECODE_PREFETCH, buffers=buffers)
+        self._decode_scale = None
+        self.court_tracker.set_pixel_scale(1.0)
+        return decoder
+
+    def _decode_buffers(self, pipelined: bool) -> int:
+        """
+        Ring size above the most decoded frames alive at once: the batch being
+        detected and the one being filled, the prefetched (or queued) frames and
+        one per stage holding a frame.
+        """
+        if pipelined:
+            return 2 * self.batch_size + 3 * PIPELINE_QUEUE_SIZE + 8
+        return 2 * self.batch_size + DECODE_PREFETCH + 4
+
+    def _reduce_decode(self, decoder: VideoDecoder, out_scale: float) -> None:
+        """
+        With reduced_decode, decode at the resolution both the output (out_scale
+        of the source, 0 = no image output) and the detectors need: the long
+        side at their largest input size, which is what each model would
+        letterbox the frame to anyway.  Not with ROI ball detection, whose
+        crops need source resolution, nor when a detector's input size is
+        unknown.
+        """
+        if not self.reduced_decode or self.ball_roi:
+            return
+        sizes = self._detector_input_sizes()
+        if None in sizes:
+            return
+        src_w, src_h = decoder.src_size
+        ratio = max(max(sizes) / max(src_w, src_h), out_scale)
+        if ratio > REDUCED_DECODE_MAX_RATIO:
+            return
+        decoder.reduce_to(*fit_size(src_w, src_h, int(round(max(src_w, src_h) * ratio))))
+        self._decode_scale = decoder.scale()
+        self.court_tracker.set_pixel_scale(max(self._decode_scale) if self._decode_scale else 1.0)
+
+    def _detector_input_sizes(self) -> list:
+        """Long side each detector runs at: its configured imgsz, else the model's own (None if unknown)."""
+        sizes = []
+        for name, detector in (("ball", self.ball_tracker), ("player", self.player_tracker),
+                               ("court", self.court_mapper)):
+            size = self.imgsz[name] or getattr(detector.model, "overrides", {}).get("imgsz")
+            sizes.append(max(size) if isinstance(size, (list, tuple)) else size)
+        return sizes
 
     @staticmethod
     def _read_video_meta(cap: cv2.VideoCapture) -> Tuple[int, int, int, int]:
@@ -446,6 +935,12 @@ class VideoProcessor:
         target_size: Tuple[int, int],
     ) -> np.ndarray:
         canvas = frame.copy()
+        if self._decode_scale is not None:
+            # Reduced-resolution frame: detections are in source pixels
+            players = [self._to_frame_box(p) for p in players or []]
+            ball_bbox = self._to_frame_box(ball_bbox) if ball_bbox else ball_bbox
+            if keypoints is not None:
+                keypoints = np.asarray(keypoints) / np.array(self._decode_scale)
 
         # Players
         player_list = list(players or [])
@@ -480,28 +975,39 @@ class VideoProcessor:
         w, h = target_size
         return cv2.resize(canvas, (w, h), interpolation=cv2.INTER_AREA)
 
+    def _to_frame_box(self, box):
+        sx, sy = self._decode_scale
+        return scale_box(box, (1.0 / sx, 1.0 / sy))
+
     def _render_birdseye(
         self,
         src_w: int,
         src_h: int,
-        keypoints: Optional[np.ndarray],
-        Hmg: Optional[np.ndarray],
+        proj_kps: Optional[np.ndarray],
         projected_players: Optional[Iterable[Tuple[float, float]]],
         ball_proj: Optional[Tuple[float, float]],
         target_size: Tuple[int, int],
     ) -> np.ndarray:
+        w, h = target_size
+        if not self.render_cache:
+            bird = self._draw_bird_court(src_w, src_h, proj_kps)
+            self._draw_bird_dots(bird, src_w, src_h, projected_players, ball_proj)
+            return cv2.resize(bird, (w, h), interpolation=cv2.INTER_AREA)
+
+        # Court layer: drawn at source size and resized once per homography
+        key = (src_w, src_h, w, h, None if proj_kps is None else proj_kps.tobytes())
+        layer = self._bird_layer.get(key, lambda: cv2.resize(
+            self._draw_bird_court(src_w, src_h, proj_kps), (w, h), interpolation=cv2.INTER_AREA))
+        bird = layer.copy()
+        self._draw_bird_dots(bird, src_w, src_h, projected_players, ball_proj, scale=(w / src_w, h / src_h))
+        return bird
+
+    @staticmethod
+    def _draw_bird_court(src_w: int, src_h: int, proj_kps: Optional[np.ndarray]) -> np.ndarray:
         bird = np.zeros((src_h, src_w, 3), dtype=np.uint8)
         bird[:, :] = BIRD_BG
 
-        if keypoints is not None and Hmg is not None:
-            pts = np.array(keypoints, dtype=np.float32).reshape(-1, 1, 2)
-            proj_kps = cv2.perspectiveTransform(pts, Hmg).reshape(-1, 2)
-
-            # Teach analytics dynamic zones based on projected keypoints
-            self.analytics.update_kitchen_from_keypoints(proj_kps)
-            self.analytics.update_court_bounds_from_keypoints(proj_kps)
-            self.analytics.update_zones_from_keypoints(proj_kps)
-
+        if proj_kps is not None:
             for i, pt in enumerate(proj_kps):
                 x, y = map(int, pt)
                 if 0 <= x < src_w and 0 <= y < src_h:
@@ -511,34 +1017,44 @@ class VideoProcessor:
                 pt1 = tuple(map(int, proj_kps[a]))
                 pt2 = tuple(map(int, proj_kps[b]))
                 cv2.line(bird, pt1, pt2, COLOR_COURT_EDGE, 2)
+        return bird
 
-        # Players
-        for pt in projected_players or []:
-            x, y = map(int, pt)
-            if 0 <= x < src_w and 0 <= y < src_h:
-                cv2.circle(bird, (x, y), PLAYER_DOT_RADIUS, COLOR_PLAYER, -1)
-
-        # Ball
+    @staticmethod
+    def _draw_bird_dots(
+        bird: np.ndarray,
+        src_w: int,
+        src_h: int,
+        projected_players: Optional[Iterable[Tuple[float, float]]],
+        ball_proj: Optional[Tuple[float, float]],
+        scale: Optional[Tuple[float, float]] = None,
+    ) -> None:
+        """Players and ball; scale=None draws on the source-size canvas, else on the resized layer."""
+        dots = [(pt, PLAYER_DOT_RADIUS, COLOR_PLAYER) for pt in projected_players or []]
         if ball_proj is not None:
-            x, y = map(int, ball_proj)
-            if 0 <= x < src_w and 0 <= y < src_h:
-                cv2.circle(bird, (x, y), BALL_DOT_RADIUS, COLOR_BALL, -1)
-
-        w, h = target_size
-        return cv2.resize(bird, (w, h), interpolation=cv2.INTER_AREA)
+            dots.append((ball_proj, BALL_DOT_RADIUS, COLOR_BALL))
+        for pt, radius, color in dots:
+            x, y = map(int, pt)
+            if not (0 <= x < src_w and 0 <= y < src_h):
+                continue
+            if scale is None:
+                cv2.circle(bird, (x, y), radius, color, -1)
+            else:
+                draw_dot(bird, pt, radius, color, scale)
 
     def _render_analytics_grid(
         self,
         panel_size: Tuple[int, int],
         target_size: Tuple[int, int],
         bird_reference: Optional[np.ndarray] = None,
+        analytics: Optional[Analytics] = None,
     ) -> np.ndarray:
         panel_w, panel_h = panel_size
+        analytics = analytics or self.analytics
 
-        ph = self.analytics.panel_player_heatmap((panel_w, panel_h), bird_reference=bird_reference)
-        bh = self.analytics.panel_ball_heatmap((panel_w, panel_h), bird_reference=bird_reference)
-        kd = self.analytics.panel_kitchen_intrusion(None, (panel_w, panel_h))  # players provided via update_counters
-        rl = self.analytics.panel_rally_tempo((panel_w, panel_h))
+        ph = analytics.panel_player_heatmap((panel_w, panel_h), bird_reference=bird_reference)
+        bh = analytics.panel_ball_heatmap((panel_w, panel_h), bird_reference=bird_reference)
+        kd = analytics.panel_kitchen_intrusion(None, (panel_w, panel_h))  # players provided via update_counters
+        rl = analytics.panel_rally_tempo((panel_w, panel_h))
 
         top = cv2.hconcat([ph, bh])
         bot = cv2.hconcat([kd, rl])
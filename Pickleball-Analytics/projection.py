@@ -0,0 +1,132 @@
+"""
+Homography projection layer
+
+Purpose
+-------
+Projects everything a frame needs in bird's-eye space — player feet, the ball
+center and the court keypoints — with one cv2.perspectiveTransform call per
+frame, and whole cached videos with one call per distinct homography.
+
+What it does
+------------
+- foot_points(boxes): bottom-center of each [x1, y1, x2, y2] box
+- ball_center(bbox): center of the ball box
+- project_points(points, H): (N, 2) image points → (N, 2) bird points
+- project_frame(H, boxes, ball_bbox, keypoints): FrameProjection with the
+  players, ball and keypoints of one frame from a single transform
+- project_cached(cached): bulk projection of a CachedDetections video; frames
+  are grouped by court row, so a constant H costs one transform in total
+- CachedProjection.frame(idx): the FrameProjection of one cached frame
+
+Assumptions
+-----------
+- Points are formed in float64 and rounded to float32 before the transform,
+  exactly as the old per-point code did, so results are bit-identical to
+  projecting each point on its own
+- H is None (or NaN in the cache) when the court was not found; nothing is
+  projected for those frames
+"""
+
+from typing import List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class FrameProjection(NamedTuple):
+    players: List[Tuple[float, float]]    # one per box, input order
+    ball: Optional[Tuple[float, float]]   # None if no ball or no H
+    keypoints: Optional[np.ndarray]       # (K, 2) float32, None if no keypoints or no H
+
+
+def foot_points(boxes) -> np.ndarray:
+    b = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    return np.stack([(b[:, 0] + b[:, 2]) / 2, b[:, 3]], axis=1)
+
+
+def ball_center(bbox) -> np.ndarray:
+    b = np.asarray(bbox, dtype=np.float64).reshape(-1, 4)
+    return np.stack([(b[:, 0] + b[:, 2]) / 2, (b[:, 1] + b[:, 3]) / 2], axis=1)
+
+
+def project_points(points, H) -> np.ndarray:
+    pts = np.asarray(points, dtype=np.float32).reshape(-1, 1, 2)
+    if len(pts) == 0:
+        return np.zeros((0, 2), dtype=np.float32)
+    return cv2.perspectiveTransform(pts, H).reshape(-1, 2)
+
+
+def project_frame(H, boxes, ball_bbox=None, keypoints=None) -> FrameProjection:
+    """Project player feet, ball center and keypoints of one frame in one call."""
+    if H is None:
+        return FrameProjection([], None, None)
+
+    # A handful of points per frame: plain Python beats numpy setup costs here
+    pts = [((x1 + x2) / 2, y2) for x1, _, x2, y2 in boxes]
+    if ball_bbox is not None:
+        x1, y1, x2, y2 = ball_bbox
+        pts.append(((x1 + x2) / 2, (y1 + y2) / 2))
+    pts = np.array(pts, dtype=np.float32).reshape(-1, 2)
+    if keypoints is not None:
+        pts = np.concatenate([pts, np.asarray(keypoints, dtype=np.float32).reshape(-1, 2)])
+    proj = project_points(pts, H)
+
+    n = len(boxes)
+    players = list(map(tuple, proj[:n]))
+    ball = tuple(proj[n]) if ball_bbox is not None else None
+    kps = proj[n + (ball_bbox is not None):] if keypoints is not None else None
+    return FrameProjection(players, ball, kps)
+
+
+class CachedProjection:
+    """Bird's-eye projections for every frame of a cached video (see project_cached)."""
+
+    def __init__(self, court_index, player_offsets, ball_present, players, ball, keypoints):
+        self._court_index = court_index
+        self._player_offsets = player_offsets
+        self._ball_present = ball_present
+        self.players = players      # (M, 2), aligned with the cached player rows
+        self.ball = ball            # (N, 2), NaN where absent / no H
+        self.keypoints = keypoints  # (K, 12, 2) per court row, NaN where no H
+        self._valid = ~np.isnan(keypoints).any(axis=(1, 2))
+
+    def frame(self, idx: int) -> FrameProjection:
+        ci = self._court_index[idx]
+        if ci < 0 or not self._valid[ci]:
+            return FrameProjection([], None, None)
+        lo, hi = self._player_offsets[idx], self._player_offsets[idx + 1]
+        ball = tuple(self.ball[idx]) if self._ball_present[idx] else None
+        return FrameProjection(list(map(tuple, self.players[lo:hi])), ball, self.keypoints[ci])
+
+
+def project_cached(cached) -> CachedProjection:
+    """Project all players, balls and keypoints of a CachedDetections video."""
+    n = len(cached)
+    offsets = np.asarray(cached.player_offsets, dtype=np.int64)
+    counts = np.diff(offsets)
+    row_frame = np.repeat(np.arange(n), counts)   # frame index of each player row
+    court_index = np.asarray(cached.court_index)
+    present = np.asarray(cached.ball_present).astype(bool)
+
+    players = np.full((len(row_frame), 2), np.nan, dtype=np.float32)
+    ball = np.full((n, 2), np.nan, dtype=np.float32)
+    keypoints = np.full(np.shape(cached.court_kps), np.nan, dtype=np.float32)
+    feet = foot_points(cached.player_boxes).astype(np.float32)
+    centers = ball_center(cached.ball_bbox).astype(np.float32)
+
+    for ci in range(len(cached.court_h)):
+        H = np.array(cached.court_h[ci])
+        if np.isnan(H).any():
+            continue
+        frames = court_index == ci
+        rows = frames[row_frame]
+        balls = frames & present
+        kps = np.asarray(cached.court_kps[ci], dtype=np.float32)
+
+        proj = project_points(np.concatenate([feet[rows], centers[balls], kps]), H)
+        n_rows, n_balls = int(rows.sum()), int(balls.sum())
+        players[rows] = proj[:n_rows]
+        ball[balls] = proj[n_rows:n_rows + n_balls]
+        keypoints[ci] = proj[n_rows + n_balls:]
+
+    return CachedProjection(court_index.tolist(), offsets.tolist(), present.tolist(), players, ball, keypoints)
@@ -0,0 +1,50 @@
+"""
+Render layer cache
+
+Purpose
+-------
+Most of what the bird's-eye column and the kitchen panel draw only changes
+when the homography (and so the projected court) changes, which is rare.
+LayerCache keeps the most recently drawn static layer and rebuilds it only
+when its key changes; callers then composite the moving parts on a copy.
+
+What it does
+------------
+- LayerCache.get(key, build): cached layer for `key`, calling build() on a miss
+- hits / misses counters for benchmarks
+- draw_dot(canvas, pt, radius, color, scale): filled dot drawn directly at the
+  target size, shaped like a source-size circle after a (sx, sy) resize
+
+Assumptions
+-----------
+- Keys are cheap, exact and hashable (e.g. bytes of the int points drawn)
+- A cache instance is used by one rendering thread at a time (Analytics
+  snapshots share it, but only the render stage draws panels)
+- Cached layers are never drawn on; callers copy before compositing
+"""
+
+import cv2
+
+
+class LayerCache:
+    def __init__(self):
+        self._key = None
+        self._layer = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        if self._layer is None or key != self._key:
+            self._layer = build()
+            self._key = key
+            self.misses += 1
+        else:
+            self.hits += 1
+        return self._layer
+
+
+def draw_dot(canvas, pt, radius, color, scale):
+    sx, sy = scale
+    center = (int(pt[0] * sx), int(pt[1] * sy))
+    axes = (max(int(round(radius * sx)), 1), max(int(round(radius * sy)), 1))
+    cv2.ellipse(canvas, center, axes, 0, 0, 360, color, -1)
@@ -0,0 +1,192 @@
+"""
+Sharded detection across worker processes
+
+Purpose
+-------
+Splits a long video into contiguous frame ranges and runs ball/player YOLO
+detection for each range in a separate worker process, so detection scales
+with the number of cores.  The merged per-frame detections are returned in
+frame order, in the DetectionCache per-frame format, ready to be replayed
+through the sequential BallTracker/ScoreTracker/Analytics pass.
+
+What it does
+------------
+- plan_shards(total_frames, shards): split [0, total_frames) into contiguous ranges
+- detect_video(video_path, total_frames, model_paths, workers, imgsz, backend,
+  court_pass): fan shards out to a spawn-based process pool and concatenate
+  the results
+- Each worker process builds its models once (pool initializer) through a
+  ModelRegistry with the caller's InferenceBackend, so the backend, threads
+  and per-detector inference sizes are the ones a serial run uses, and reuses
+  them for every shard it is handed
+
+Court handling
+--------------
+The serial path tracks the court in frame order (court_tracker.py): bootstrap,
+then re-detection on camera drift and on a timer, which depends on every frame
+before it and cannot be split at shard boundaries.  Workers therefore leave
+the court empty; the caller passes court_pass, which runs that in-order
+CourtTracker pass in the parent while the workers detect (court detection only
+runs on the few re-detection frames, the rest is decoding and cheap drift
+checks) and returns one (keypoints, H) per frame.  The merged entries are then
+exactly what a serial run would produce.
+
+Assumptions
+-----------
+- Workers seek with CAP_PROP_POS_FRAMES (OpenCV's FFmpeg backend seeks to the
+  previous keyframe and decodes forward); if the reported position does not
+  land on the requested frame the worker falls back to grab()-ing from the
+  start, so frame indices always match a serial decode
+- The last shard is open-ended by default, so an inaccurate
+  CAP_PROP_FRAME_COUNT never drops frames
+"""
+
+import itertools
+import multiprocessing as mp
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from detection_cache import DetectionCache
+from inference_backend import InferenceBackend
+
+# Minimum frames per shard; smaller shards spend more time loading models than detecting
+MIN_SHARD_FRAMES = 300
+
+_worker = {}  # per-process model handles, filled by _init_worker
+
+
+def plan_shards(total_frames, shards, to_eof=True):
+    """Return [(start, stop), ...] covering [0, total_frames); with to_eof the last stop is None."""
+    total_frames = max(int(total_frames or 0), 0)
+    shards = max(1, min(int(shards or 1), max(total_frames // MIN_SHARD_FRAMES, 1)))
+    bounds = [round(i * total_frames / shards) for i in range(shards + 1)]
+    ranges = [(bounds[i], bounds[i + 1]) for i in range(shards)]
+    if to_eof:
+        ranges[-1] = (ranges[-1][0], None)
+    return ranges
+
+
+def detect_video(video_path, total_frames, model_paths, workers=2, batch_size=8,
+                 shards_per_worker=1, to_eof=True, imgsz=None, backend=None, court_pass=None):
+    """
+    Run detection for the whole video across `workers` processes.
+
+    model_paths: {"ball": path, "player": path}
+    imgsz: {"ball": size, "player": size}, None entries = the model's own size
+    backend: InferenceBackend the workers load models through (default: from env)
+    court_pass: callable run in this process while the workers detect, returning
+        [(kps, H), ...] per frame; without it the entries carry no court
+    Returns (entries, stats) with one entry per decoded frame, in order.
+    """
+    ranges = plan_shards(total_frames, workers * max(int(shards_per_worker), 1), to_eof=to_eof)
+    t0 = time.perf_counter()
+    ctx = mp.get_context("spawn")  # torch is not fork-safe
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(ranges)),
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(model_paths, batch_size, imgsz or {}, backend or InferenceBackend()),
+    ) as pool:
+        futures = [pool.submit(_detect_shard, video_path, start, stop) for start, stop in ranges]
+        court = court_pass() if court_pass is not None else None
+        results = [f.result() for f in futures]  # shard order == frame order
+
+    entries = list(itertools.chain.from_iterable(r["entries"] for r in results))
+    if court is not None:
+        if len(court) != len(entries):
+            print(f"[SHARD] court pass decoded {len(court)} frames, shards {len(entries)}")
+        for entry, (kps, Hmg) in zip(entries, court):
+            entry["court"]["keypoints"], entry["court"]["homography"] = kps, Hmg
+    elapsed = time.perf_counter() - t0
+    stats = {
+        "workers": workers,
+        "shards": len(ranges),
+        "frames": len(entries),
+        "elapsed_s": round(elapsed, 3),
+        "fps": round(len(entries) / elapsed, 2) if elapsed > 0 else 0.0,
+        "shard_timings": [
+            {"start": r["start"], "frames": len(r["entries"]),
+             "load_s": r["load_s"], "seek_s": r["seek_s"], "detect_s": r["detect_s"]}
+            for r in results
+        ],
+    }
+    print(f"[SHARD] {stats['frames']} frames across {stats['shards']} shards / {workers} workers "
+          f"in {elapsed:.1f}s ({stats['fps']:.1f} fps)")
+    return entries, stats
+
+
+# ------------------------------------------------------------------
+# Worker side
+# ------------------------------------------------------------------
+def _init_worker(model_paths, batch_size, imgsz, backend):
+    # Imported here so the parent does not need them just to plan shards
+    from ball_tracker import BallTracker
+    from model_registry import ModelRegistry
+    from player_tracker import PlayerTracker
+
+    t0 = time.perf_counter()
+    _worker["registry"] = ModelRegistry(model_paths, backend=backend)
+    models = _worker["registry"].models()
+    _worker["ball"] = BallTracker(model_paths["ball"], model=models["ball"], imgsz=imgsz.get("ball"))
+    _worker["player"] = PlayerTracker(model_paths["player"], model=models["player"], imgsz=imgsz.get("player"))
+    _worker["batch_size"] = max(int(batch_size or 1), 1)
+    _worker["load_s"] = round(time.perf_counter() - t0, 3)
+
+
+def _detect_shard(video_path, start, stop):
+    ball, player, batch_size = _worker["ball"], _worker["player"], _worker["batch_size"]
+    load_s, _worker["load_s"] = _worker.get("load_s", 0.0), 0.0  # report load once per process
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video: {video_path}")
+
+    entries = []
+    try:
+        t0 = time.perf_counter()
+        _seek(cap, start)
+        seek_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        frame_idx = start
+        while stop is None or frame_idx < stop:
+            n = batch_size if stop is None else min(batch_size, stop - frame_idx)
+            frames = []
+            for _ in range(n):
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frames.append(frame)
+            if not frames:
+                break
+
+            player_dets = player.detect_players_batch(frames)
+            ball_dets = ball.detect_frames(frames)
+            for (boxes, confs), ball_det in zip(player_dets, ball_dets):
+                entries.append(DetectionCache.make_entry(None, None, boxes, confs, ball_det))
+            frame_idx += len(frames)
+        detect_s = time.perf_counter() - t0
+    finally:
+        cap.release()
+
+    return {
+        "start": start,
+        "entries": entries,
+        "load_s": load_s,
+        "seek_s": round(seek_s, 3),
+        "detect_s": round(detect_s, 3),
+    }
+
+
+def _seek(cap, frame_idx):
+    if frame_idx <= 0:
+        return
+    if cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx) and int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == frame_idx:
+        return
+    # Inexact seek: rewind and step forward without converting frames
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    for _ in range(frame_idx):
+        if not cap.grab():
+            break
@@ -0,0 +1,172 @@
+"""
+Live stats push (Server-Sent Events with JSON merge-patch deltas)
+
+Purpose
+-------
+The dashboard polled /api/live_stats once a second and got the whole stats
+document every time, spatial payloads and rally history included, so the
+server re-serialized unchanged state for every poll of every client.
+StatsPublisher samples the live document at a fixed rate, turns each change
+into one RFC 7386 merge patch, serializes it once and pushes the same bytes
+to every subscriber.
+
+What it does
+------------
+- merge_patch(old, new): JSON merge patch that turns `old` into `new` ({} if
+  nothing changed); nested objects are diffed, lists and scalars replaced
+- StatsPublisher(source, emit_hz): per-job publisher on the event loop
+    - every 1/emit_hz seconds, while anybody is subscribed, it calls source()
+      and emits a "patch" event if the document changed; everything that
+      happened in between is coalesced into that one patch
+    - events(): SSE byte chunks for one client: a "snapshot" event with the
+      full document, then "patch" events; a client that falls more than
+      STATS_BACKLOG patches behind gets a fresh snapshot instead
+    - close() / close_threadsafe(): emit the final state, then an "end" event
+- stats(): subscribers, patches emitted, snapshots sent and bytes pushed
+
+Assumptions
+-----------
+- source() returns a fresh JSON-able dict whose nested objects are not
+  mutated later (Analytics.export_stats rebuilds them every frame), so the
+  previous document can be kept by reference for diffing
+- Merge patches cannot express "set to null": a key whose value becomes None
+  is removed on the client, which the dashboard treats the same way
+- Created on the event loop; only close_threadsafe() may be called from
+  other threads
+"""
+
+import asyncio
+import json
+from collections import deque
+
+# Default emit rate (patches per second at most) and patches kept for late readers
+STATS_EMIT_HZ = 5
+STATS_BACKLOG = 64
+# Seconds of silence before a keep-alive comment is sent
+STATS_KEEPALIVE_S = 15.0
+
+
+def merge_patch(old, new):
+    """RFC 7386 merge patch from dict `old` to dict `new`."""
+    patch = {}
+    for key, value in new.items():
+        if key not in old:
+            if value is not None:
+                patch[key] = value
+            continue
+        prev = old[key]
+        if prev is value:
+            continue
+        if isinstance(value, dict) and isinstance(prev, dict):
+            sub = merge_patch(prev, value)
+            if sub:
+                patch[key] = sub
+        elif value != prev:
+            patch[key] = value
+    for key in old:
+        if key not in new:
+            patch[key] = None
+    return patch
+
+
+def _event(name, seq, payload):
+    data = json.dumps(payload, separators=(",", ":"))
+    return f"id: {seq}\nevent: {name}\ndata: {data}\n\n".encode()
+
+
+class StatsPublisher:
+    def __init__(self, source, emit_hz=STATS_EMIT_HZ, loop=None):
+        self._source = source
+        self.emit_hz = emit_hz
+        self._loop = loop or asyncio.get_running_loop()
+        self._doc = None                       # last emitted document
+        self._seq = 0
+        self._patches = deque(maxlen=STATS_BACKLOG)   # (seq, encoded patch event)
+        self._snapshot = None                  # (seq, encoded snapshot event)
+        self._next = self._loop.create_future()
+        self._closed = False
+        self._counts = {"subscribers": 0, "patches": 0, "snapshots": 0, "bytes": 0}
+        self._task = self._loop.create_task(self._run())
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+    async def _run(self):
+        while not self._closed:
+            await asyncio.sleep(1.0 / max(float(self.emit_hz or 1), 0.1))
+            if self._counts["subscribers"] and not self._closed:
+                self._sample()
+
+    def _sample(self):
+        doc = self._source()
+        patch = doc if self._doc is None else merge_patch(self._doc, doc)
+        if not patch:
+            return
+        self._doc = doc
+        self._seq += 1
+        self._patches.append((self._seq, _event("patch", self._seq, patch)))
+        self._counts["patches"] += 1
+        self._wake()
+
+    def _wake(self):
+        waiters, self._next = self._next, self._loop.create_future()
+        waiters.set_result(None)
+
+    def close(self):
+        if self._closed:
+            return
+        self._sample()
+        self._closed = True
+        self._task.cancel()
+        self._wake()
+
+    def close_threadsafe(self):
+        if not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.close)
+
+    # ------------------------------------------------------------------
+    # Subscriber side
+    # ------------------------------------------------------------------
+    async def events(self):
+        """SSE chunks for one client until the job ends (or the client goes away)."""
+        self._counts["subscribers"] += 1
+        try:
+            if not self._closed:
+                self._sample()
+            seq = self._seq
+            yield self._count(self._snapshot_event())
+            while True:
+                if self._seq <= seq:
+                    if self._closed:
+                        yield self._count(b"event: end\ndata: {}\n\n")
+                        return
+                    try:
+                        await asyncio.wait_for(asyncio.shield(self._next), STATS_KEEPALIVE_S)
+                    except asyncio.TimeoutError:
+                        yield b": keep-alive\n\n"
+                    continue
+                if self._patches[0][0] > seq + 1:
+                    chunk = self._snapshot_event()  # fell behind the backlog
+                else:
+                    chunk = b"".join(c for s, c in self._patches if s > seq)
+                seq = self._seq
+                yield self._count(chunk)
+        finally:
+            self._counts["subscribers"] -= 1
+
+    def _snapshot_event(self):
+        if self._snapshot is None or self._snapshot[0] != self._seq:
+            self._snapshot = (self._seq, _event("snapshot", self._seq, self._doc or {}))
+        self._counts["snapshots"] += 1
+        return self._snapshot[1]
+
+    def _count(self, chunk):
+        self._counts["bytes"] += len(chunk)
+        return chunk
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def stats(self):
+        return dict(self._counts, emit_hz=self.emit_hz)
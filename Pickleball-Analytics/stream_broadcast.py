@@ -0,0 +1,96 @@
+"""
+Async frame broadcaster for the MJPEG stream
+
+Purpose
+-------
+/api/stream used a synchronous generator per viewer that slept 30 ms and
+re-sent the latest JPEG whether or not it had changed, holding a threadpool
+worker per viewer.  FrameBroadcaster fans the live preview out on the event
+loop instead: viewers are coroutines that wait for the next frame, so an idle
+viewer costs nothing and hundreds of them fit in one process.
+
+What it does
+------------
+- listener(seq, jpeg): LivePreview listener, called on the encoder thread;
+  schedules publish() (or close() when jpeg is None) on the event loop
+- publish(seq, jpeg): store the newest frame and wake every waiting viewer by
+  resolving one shared future (O(1) per frame, whatever the viewer count)
+- frames(): async iterator of (seq, jpeg) for one viewer, new frames only
+    - a viewer that is still sending when newer frames arrive skips straight
+      to the newest one (slow consumers drop frames instead of queueing them)
+- close(): end every viewer's iterator
+- stats(): viewers, frames published, frames sent and frames dropped for slow
+  viewers
+
+Assumptions
+-----------
+- Created on (and only touched from) the event loop thread, except for
+  listener()
+- seq increases by one per encoded frame (LivePreview's counter), so a gap
+  between two frames a viewer receives is the number it dropped
+"""
+
+import asyncio
+
+
+class FrameBroadcaster:
+    def __init__(self, loop=None):
+        self._loop = loop or asyncio.get_running_loop()
+        self._seq = 0
+        self._jpeg = None
+        self._next = self._loop.create_future()   # resolved when the next frame arrives
+        self._closed = False
+        self._counts = {"viewers": 0, "published": 0, "sent": 0, "dropped": 0}
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+    def listener(self, seq, jpeg):
+        if self._loop.is_closed():
+            return
+        if jpeg is None:
+            self._loop.call_soon_threadsafe(self.close)
+        else:
+            self._loop.call_soon_threadsafe(self.publish, seq, jpeg)
+
+    def publish(self, seq, jpeg):
+        if self._closed or seq <= self._seq:
+            return
+        self._seq, self._jpeg = seq, jpeg
+        self._counts["published"] += 1
+        waiters, self._next = self._next, self._loop.create_future()
+        waiters.set_result(None)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._next.set_result(None)
+
+    # ------------------------------------------------------------------
+    # Viewer side
+    # ------------------------------------------------------------------
+    async def frames(self):
+        """Yield (seq, jpeg) for each new frame until close(); starts with the current one."""
+        self._counts["viewers"] += 1
+        try:
+            last = 0
+            while True:
+                if self._seq <= last:
+                    if self._closed:
+                        return
+                    await asyncio.shield(self._next)
+                    continue
+                if last and self._seq > last + 1:
+                    self._counts["dropped"] += self._seq - last - 1
+                last = self._seq
+                self._counts["sent"] += 1
+                yield last, self._jpeg
+        finally:
+            self._counts["viewers"] -= 1
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def stats(self):
+        return dict(self._counts)
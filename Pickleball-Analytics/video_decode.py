@@ -0,0 +1,239 @@
+"""
+Video decode layer (backend selection, prefetch, reused frame buffers)
+
+Purpose
+-------
+VideoProcessor opened a plain cv2.VideoCapture and decoded every frame, at
+full resolution into a freshly allocated BGR array, on the same thread that
+then ran inference, even on paths whose output never needs full resolution
+(headless analytics, a live preview capped at PREVIEW_MAX_WIDTH).
+VideoDecoder opens the capture with a chosen backend, optional hardware
+acceleration and decoder threads, decodes ahead on its own thread into a
+ring of preallocated buffers, can hand out frames at a reduced size, and
+times decoding separately from inference.
+
+What it does
+------------
+- open_capture(path, backend, hw_accel, threads): cv2.VideoCapture with the
+  requested API preference and open parameters (CAP_PROP_HW_ACCELERATION,
+  CAP_PROP_N_THREADS); if the backend refuses them, the plain capture is
+  opened instead and a note is printed
+- VideoDecoder(path, prefetch, buffers): the capture plus
+    - meta(): (total_frames, width, height, fps) of the source
+    - reduce_to(width, height): frames are resized to this size (INTER_LINEAR,
+      like the detectors' letterbox) right after decoding, on the decode thread;
+      scale() maps them back to source pixels
+    - frames(): generator of BGR frames; with prefetch > 0 a thread decodes up
+      to `prefetch` frames ahead
+    - buffers > 0: frames are decoded (and resized) into a ring of that many
+      arrays, allocated on first use and then reused, instead of a new array
+      per frame
+    - stats(): backend, hardware acceleration, sizes, buffers, decode time and
+      decode fps (decode + resize only, not time spent waiting for consumers)
+- defaults from PICKLEBALL_DECODE_BACKEND / _HW_ACCEL / _THREADS / _PREFETCH
+
+Assumptions
+-----------
+- A buffer is overwritten `buffers` frames after it was handed out: the caller
+  sizes the ring above the number of frames it keeps alive at once (batch,
+  queues, prefetch), see VideoProcessor._decode_buffers
+- OpenCV's FFMPEG backend has no decode-time downscale, so reduced frames are
+  a resize on the decode thread; the savings are in everything downstream
+  (copies, drawing, model letterbox) and in keeping that off the main thread
+- Hardware decoding is opt-in: decoders and colour conversion may differ in
+  the last bit from the software path, and the stats are compared bit for bit
+"""
+
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+# Capture backends by name (cv2 API preference)
+BACKENDS = {"any": cv2.CAP_ANY, "ffmpeg": cv2.CAP_FFMPEG, "gstreamer": cv2.CAP_GSTREAMER}
+# Hardware acceleration modes by name (CAP_PROP_HW_ACCELERATION values)
+HW_ACCEL = {
+    "none": cv2.VIDEO_ACCELERATION_NONE,
+    "any": cv2.VIDEO_ACCELERATION_ANY,
+    "vaapi": cv2.VIDEO_ACCELERATION_VAAPI,
+    "d3d11": cv2.VIDEO_ACCELERATION_D3D11,
+    "mfx": cv2.VIDEO_ACCELERATION_MFX,
+    "drm": cv2.VIDEO_ACCELERATION_DRM,
+}
+# Defaults: backend, hardware acceleration, decoder threads (0 = backend default)
+DECODE_BACKEND = os.environ.get("PICKLEBALL_DECODE_BACKEND", "any")
+DECODE_HW_ACCEL = os.environ.get("PICKLEBALL_DECODE_HW_ACCEL", "none")
+DECODE_THREADS = int(os.environ.get("PICKLEBALL_DECODE_THREADS", "0"))
+# Frames decoded ahead on the decode thread (0 = decode on the consumer's thread)
+DECODE_PREFETCH = int(os.environ.get("PICKLEBALL_DECODE_PREFETCH", "4"))
+
+_END = object()
+
+
+def open_capture(path, backend=DECODE_BACKEND, hw_accel=DECODE_HW_ACCEL, threads=DECODE_THREADS):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown decode backend {backend!r} (expected one of {', '.join(BACKENDS)})")
+    if hw_accel not in HW_ACCEL:
+        raise ValueError(f"Unknown hardware acceleration {hw_accel!r} (expected one of {', '.join(HW_ACCEL)})")
+    params = []
+    if hw_accel != "none":
+        params += [cv2.CAP_PROP_HW_ACCELERATION, HW_ACCEL[hw_accel]]
+    if threads:
+        params += [cv2.CAP_PROP_N_THREADS, int(threads)]
+
+    cap = cv2.VideoCapture(path, BACKENDS[backend], params) if params else cv2.VideoCapture(path, BACKENDS[backend])
+    if not cap.isOpened() and (params or backend != "any"):
+        print(f"[DECODE] {backend} backend with {hw_accel} acceleration could not open {path}; using defaults")
+        cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video: {path}")
+    return cap
+
+
+class VideoDecoder:
+    def __init__(self, path, prefetch=DECODE_PREFETCH, buffers=0, backend=DECODE_BACKEND,
+                 hw_accel=DECODE_HW_ACCEL, threads=DECODE_THREADS):
+        self.cap = open_capture(path, backend, hw_accel, threads)
+        self.prefetch = max(int(prefetch or 0), 0)
+        self.buffers = max(int(buffers or 0), 0)
+        self.requested = {"backend": backend, "hw_accel": hw_accel, "threads": threads}
+        self.src_size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        self.size = None            # (w, h) of handed-out frames; None = source size
+        self._ring = []             # decoded frames (reduced ones when size is set)
+        self._raw_ring = []         # full-size decode targets before the resize
+        self._next = 0
+        self._prefetching = None    # (thread, stop event, queue) while frames() decodes ahead
+        self._error = None          # exception raised on the decode thread
+        self.api = self.cap.getBackendName()
+        self.hw_accel_active = int(self.cap.get(cv2.CAP_PROP_HW_ACCELERATION)) != 0
+        self._counts = {"frames": 0, "decode_s": 0.0, "allocated": 0, "reused": 0}
+
+    def meta(self):
+        total = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = int(self.cap.get(cv2.CAP_PROP_FPS)) or 30
+        return total, self.src_size[0], self.src_size[1], fps
+
+    def reduce_to(self, width, height):
+        size = (int(width), int(height))
+        self.size = None if size == self.src_size else size
+
+    def scale(self):
+        """(sx, sy) from handed-out frame pixels to source pixels, None at source size."""
+        if self.size is None:
+            return None
+        return self.src_size[0] / self.size[0], self.src_size[1] / self.size[1]
+
+    # ------------------------------------------------------------------
+    # Decoding
+    # ------------------------------------------------------------------
+    def frames(self):
+        if not self.prefetch:
+            while True:
+                frame = self._read()
+                if frame is None:
+                    return
+                yield frame
+
+        q = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+
+        def run():
+            try:
+                while not stop.is_set():
+                    frame = self._read()
+                    if frame is None:
+                        break
+                    while not stop.is_set():
+                        try:
+                            q.put(frame, timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+            except Exception as e:
+                self._error = e
+            q.put(_END)
+
+        thread = threading.Thread(target=run, name="video-decode", daemon=True)
+        self._prefetching = (thread, stop, q)
+        thread.start()
+        try:
+            while True:
+                item = q.get()
+                if item is _END:
+                    break
+                yield item
+        finally:
+            self._stop_prefetch()
+        if self._error is not None:
+            raise self._error
+
+    def _stop_prefetch(self):
+        """Stop the decode thread (consumer done or gone) before the capture is touched again."""
+        if self._prefetching is None:
+            return
+        thread, stop, q = self._prefetching
+        stop.set()
+        while thread.is_alive():
+            try:
+                q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self._prefetching = None
+
+    def _read(self):
+        t0 = time.perf_counter()
+        frame_buf, raw_buf = self._slot()
+        if self.size is None:
+            ok, frame = self.cap.read(frame_buf)
+            raw = None
+        else:
+            ok, raw = self.cap.read(raw_buf)
+            frame = cv2.resize(raw, self.size, frame_buf, interpolation=cv2.INTER_LINEAR) if ok else None
+        if not ok:
+            return None
+        if self.buffers:
+            self._keep(frame, raw)
+        self._counts["frames"] += 1
+        self._counts["decode_s"] += time.perf_counter() - t0
+        return frame
+
+    def _slot(self):
+        """(frame buffer, raw buffer) to decode into; (None, None) without a ring or while it fills up."""
+        if not self.buffers or self._next >= len(self._ring):
+            return None, None
+        self._counts["reused"] += 1
+        return self._ring[self._next], self._raw_ring[self._next] if self._raw_ring else None
+
+    def _keep(self, frame, raw):
+        if self._next >= len(self._ring):
+            # First pass over the ring: keep the arrays OpenCV allocated
+            self._ring.append(frame)
+            if raw is not None:
+                self._raw_ring.append(raw)
+            self._counts["allocated"] += 1
+        self._next = (self._next + 1) % self.buffers
+
+    def release(self):
+        self._stop_prefetch()
+        self.cap.release()
+        self._ring, self._raw_ring = [], []
+
+    def stats(self):
+        c = self._counts
+        return {
+            **self.requested,
+            "api": self.api,
+            "hw_accel_active": self.hw_accel_active,
+            "source_size": list(self.src_size),
+            "size": list(self.size or self.src_size),
+            "reduced": self.size is not None,
+            "prefetch": self.prefetch,
+            "buffers": self.buffers,
+            "buffers_allocated": c["allocated"],
+            "buffers_reused": c["reused"],
+            "frames": c["frames"],
+            "decode_s": round(c["decode_s"], 3),
+            "decode_fps": round(c["frames"] / c["decode_s"], 2) if c["decode_s"] > 0 else 0.0,
+        }
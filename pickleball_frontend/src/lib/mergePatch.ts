@@ -0,0 +1,17 @@
+// RFC 7386 JSON merge patch, as sent by /api/live_stats/{job_id}/events.
+// Objects merge recursively, null deletes a key, anything else replaces.
+export function applyMergePatch(target: any, patch: any): any {
+  if (patch === null || typeof patch !== "object" || Array.isArray(patch)) {
+    return patch;
+  }
+  const result: Record<string, any> =
+    target !== null && typeof target === "object" && !Array.isArray(target) ? { ...target } : {};
+  for (const [key, value] of Object.entries(patch)) {
+    if (value === null) {
+      delete result[key];
+    } else {
+      result[key] = applyMergePatch(result[key], value);
+    }
+  }
+  return result;
+}
@@ -6,6 +6,7 @@ import SpatialPanel from "@/components/VerdictPanel"; // Renamed VerdictPanel to
 import SessionAnalytics from "@/components/SessionAnalytics";
 import BirdEyeMap from "@/components/BirdEyeMap";
 import VideoPlayer from "@/components/VideoPlayer";
+import { applyMergePatch } from "@/lib/mergePatch";
 
 interface AnalysisScreenProps {
   jobId: string;
@@ -17,16 +18,18 @@ const AnalysisScreen = ({ jobId, onBack }: AnalysisScreenProps) => {
 
   useEffect(() => {
     if (!jobId) return;
-    const interval = setInterval(async () => {
-      try {
-        const res = await fetch(`http://127.0.0.1:8000/api/live_stats/${jobId}`);
-        const data = await res.json();
-        setLiveData(data);
-      } catch (e) {
-        // ignore network error
-      }
-    }, 1000);
-    return () => clearInterval(interval);
+    // Pushed by the server: a full snapshot, then merge-patch deltas as stats change
+    const events = new EventSource(`http://127.0.0.1:8000/api/live_stats/${jobId}/events`);
+    events.addEventListener("snapshot", (e) => {
+      setLiveData(JSON.parse((e as MessageEvent).data));
+    });
+    events.addEventListener("patch", (e) => {
+      const patch = JSON.parse((e as MessageEvent).data);
+      setLiveData((prev: any) => applyMergePatch(prev, patch));
+    });
+    events.addEventListener("end", () => events.close());
+    // On network errors EventSource reconnects by itself and starts again from a snapshot
+    return () => events.close();
   }, [jobId]);
 
   const stats = liveData?.stats || {};